@@ -13,7 +13,7 @@ if str(repo_root) not in sys.path:
 from core.model_runner_merg import run_gams
 from core.gdx_io_merg import read_gdx_transfer, read_gdx_transfer_full, export_excel
 from core.async_runner import start_async_run, get_run_status, get_run_logs
-from core.provenance_integration import load_provenance_from_run_dir, create_excel_metadata
+from core.provenance_integration import load_provenance_from_run_dir, create_excel_metadata, record_run_phase
 
 st.set_page_config(page_title="GAMS Companion", layout="wide")
 
@@ -369,7 +369,10 @@ def show_results_page():
                             symbols_with_data=symbols_with_data,
                             duration_seconds=duration
                         )
+                        t0 = time.perf_counter()
                         export_excel(symbol_data=data, xlsx_out=xlsx, units=units if units else None, meta=full_meta)
+                        if status.run_dir:
+                            record_run_phase(status.run_dir, "export_excel", time.perf_counter() - t0)
                         with open(xlsx, "rb") as f:
                             st.download_button("📥 Download Excel", data=f.read(), file_name=xlsx.name, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
                         success_msg = f"Excel exported with {symbols_with_data}/{total_symbols} symbols containing data."
@@ -385,7 +388,8 @@ def show_results_page():
                     with st.spinner("Exporting to DuckDB..."):
                         try:
                             from core.gdx_io_merg import to_duckdb
-                            db_path = status.output_gdx.with_suffix(".duckdb")
+                            db_path = status.run_dir / "results.duckdb" if status.run_dir else status.output_gdx.with_suffix(".duckdb")
+                            t0 = time.perf_counter()
                             to_duckdb(
                                 symbol_values=data, 
                                 db_path=db_path,
@@ -393,6 +397,13 @@ def show_results_page():
                                 kinds=kinds,
                                 run_meta={"run_id": run_id, "timestamp": status.start_time.isoformat() if status.start_time else None}
                             )
+                            if status.run_dir:
+                                record_run_phase(status.run_dir, "export_duckdb", time.perf_counter() - t0)
+                                try:
+                                    from core.compare import precompute_diff_summary
+                                    precompute_diff_summary(status.run_dir)
+                                except Exception as e:
+                                    st.warning(f"Could not summarise changes against the baseline run: {e}")
                             st.success(f"Data exported to {db_path}")
                         except Exception as e:
                             st.error(f"DuckDB export failed: {e}")
@@ -257,7 +257,7 @@ if st.session_state.batch_runs:
         ]
         
         if len(completed_runs) >= 2:
-            col1, col2, col3 = st.columns([1, 1, 1])
+            col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
             
             with col1:
                 # Pre-select last two completed runs for comparison
@@ -281,6 +281,12 @@ if st.session_state.batch_runs:
                     st.switch_page("pages/20_Compare_Runs.py")
             
             with col3:
+                # All completed runs pivoted side by side (N-way matrix mode)
+                if st.button("🧮 Compare All Runs"):
+                    st.session_state["compare_runs"] = [Path(r["run_dir"]).name for r in completed_runs]
+                    st.switch_page("pages/20_Compare_Runs.py")
+
+            with col4:
                 # Export results summary
                 if st.button("📊 Export Summary"):
                     summary_data = []
@@ -9,27 +9,65 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-# Prefer duckdb if available
-try:
-    import duckdb  # type: ignore
-except Exception:
-    duckdb = None
-
-# Optional fallback GDX reader
-def _read_gdx(run_dir: Path):
-    try:
-        from core.gdx_io_merg import read_gdx_transfer_full  # project-specific
-        vals, marg, kinds = read_gdx_transfer_full(str(run_dir / "raw.gdx"))
-        return vals or {}, marg or {}, kinds or {}
-    except Exception:
-        return {}, {}, {}
+from core.compare import compare_matrix, compare_symbol, export_comparison, export_matrix, impacted_between, list_symbols, load_diff_summary, load_tolerances
 
 st.set_page_config(page_title="Compare Runs v1.1", layout="wide")
 st.title("🔍 Compare Runs")
 
 runs_root = Path("runs")
-run_dirs = sorted([p for p in runs_root.glob("*") if p.is_dir()], key=lambda p: p.name, reverse=True)
-run_names = [d.name for d in run_dirs]
+try:
+    from core.run_index import distinct_values, list_run_names
+    run_names = list_run_names(runs_root)
+    scenario_ids = distinct_values(runs_root, "scenario_id") if run_names else []
+    scenario_filter = st.selectbox("Scenario filter", ["(all)"] + scenario_ids, index=0)
+    if scenario_filter != "(all)":
+        run_names = list_run_names(runs_root, scenario_id=scenario_filter)
+except Exception:
+    # Index unavailable: fall back to listing folders
+    run_names = sorted([p.name for p in runs_root.glob("*") if p.is_dir()], reverse=True)
+run_dirs = [runs_root / n for n in run_names]
+
+mode = st.radio("Mode", ["Run A vs Run B", "Matrix (N runs)"], horizontal=True,
+                index=1 if "compare_runs" in st.session_state else 0)
+
+if mode == "Matrix (N runs)":
+    # One symbol pivoted across many runs (keys as rows, runs as columns) with deltas vs a baseline
+    preselected = [n for n in st.session_state.pop("compare_runs", []) if n in run_names]
+    picked = st.multiselect("Runs", run_names, default=preselected)
+    if len(picked) < 2:
+        st.info("Select at least two runs for the matrix.")
+        st.stop()
+    baseline = st.selectbox("Baseline", picked, index=0)
+    try:
+        syms = list_symbols([runs_root / n for n in picked])
+    except Exception as e:
+        st.error(f"Could not read run results: {e}")
+        syms = []
+    pick = st.selectbox("Symbol", ["(select)"] + syms, index=0)
+    if pick and pick != "(select)":
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            sort = st.selectbox("Sort by", ["keys", "max_abs_delta"], index=0)
+        with c2:
+            page_size = st.selectbox("Rows per page", [100, 1000, 10000], index=1)
+        with c3:
+            page_no = st.number_input("Page", min_value=1, value=1, step=1)
+        picked_dirs = [runs_root / n for n in picked]
+        matrix, total = compare_matrix(picked_dirs, pick, baseline=baseline,
+                                       offset=(int(page_no) - 1) * page_size, limit=page_size, sort=sort)
+        n_pages = max(1, -(-total // page_size))
+        st.write(f"Rows: {total:,} across {len(picked)} runs (page {int(page_no)} of {n_pages:,})")
+        st.dataframe(matrix, use_container_width=True)
+
+        fmt = st.selectbox("Export format", ["csv", "parquet"], index=0)
+        out_name = f"matrix_{pick}_{len(picked)}runs_vs_{baseline}.{fmt}"
+        out_path = runs_root / out_name
+        if st.button("Export matrix"):
+            export_matrix(picked_dirs, pick, out_path, baseline=baseline, sort=sort)
+            st.success(f"Saved {out_path}")
+            st.download_button("Click to download", data=out_path.read_bytes(), file_name=out_name,
+                               mime="text/csv" if fmt == "csv" else "application/octet-stream")
+    st.stop()
 
 # Check for pre-selected runs from batch scenarios page
 default_run_a_index = 0
@@ -55,55 +93,85 @@ if "compare_run_b" in st.session_state:
 join_type = st.selectbox("Join type", ["inner", "outer"], index=0)
 st.caption("Inner = only matching keys. Outer = keep non-overlapping rows (NaN where missing).")
 
-def _load_values(run_dir: Path) -> dict[str, pd.DataFrame]:
-    db = run_dir / "results.duckdb"
-    if duckdb and db.exists():
-        con = duckdb.connect(str(db))
-        df_vals = con.execute("SELECT * FROM symbol_values").fetchdf()
-        con.close()
-        sym_to_df = {}
-        for name, df in df_vals.groupby("symbol"):
-            # rebuild per-symbol tidy frames
-            cols = [f"key{i}" for i in range(1, 8)] + ["value"]
-            cols = [c for c in df.columns if c in cols]
-            sym_to_df[name] = df[cols].copy()
-        return sym_to_df
-    # fallback to GDX
-    vals, _, _ = _read_gdx(run_dir)
-    return vals
-
-def _norm7(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    for i in range(1, 8):
-        c = f"key{i}"
-        if c not in df.columns:
-            df[c] = None
-    cols = [f"key{i}" for i in range(1, 8)] + ([c for c in df.columns if c == "value"])
-    return df[cols]
+with st.expander("Tolerances", expanded=False):
+    changes_only = st.checkbox("Show only rows outside tolerance", value=False)
+    t1, t2 = st.columns(2)
+    with t1:
+        atol = st.number_input("Absolute tolerance", min_value=0.0, value=0.0, format="%g")
+    with t2:
+        rtol = st.number_input("Relative tolerance", min_value=0.0, value=0.0, format="%g")
+    tol_file = st.text_input("Per-symbol tolerance file (YAML, optional)", value="")
+    tolerances = {"atol": atol, "rtol": rtol, "symbol_tolerances": {}}
+    if tol_file.strip():
+        try:
+            tolerances = load_tolerances(tol_file.strip())
+        except Exception as e:
+            st.error(f"Could not read tolerance file: {e}")
 
 if run_a and run_a != "(select)" and run_b and run_b != "(select)":
-    vals_a = _load_values(runs_root / run_a)
-    vals_b = _load_values(runs_root / run_b)
-    syms = sorted(set(vals_a.keys()) & set(vals_b.keys()))
+    try:
+        from core.provenance_integration import diff_run_models, format_model_diff
+        st.caption(f"Model: {format_model_diff(diff_run_models(runs_root / run_a, runs_root / run_b))}")
+    except Exception:
+        pass
+    with st.expander("What changed (all symbols)", expanded=False):
+        top_k = st.number_input("Top changes", min_value=5, max_value=500, value=20, step=5)
+        impacted = impacted_between(runs_root / run_a, runs_root / run_b)
+        check_impact = impacted is not None and st.checkbox(
+            f"Check changes against the scenarios' impact ({len(impacted):,} symbols)", value=False,
+            help="From the models' symbol dependencies; every symbol is still diffed")
+        try:
+            summary = load_diff_summary(runs_root / run_a, runs_root / run_b, top_k=int(top_k),
+                                        symbols=impacted if check_impact else None, **tolerances)
+            sym_df = summary["symbols"]
+            st.write(f"{(sym_df['status'] != 'identical').sum():,} of {len(sym_df):,} symbols differ "
+                     f"({summary['identical']:,} identical, skipped by content hash)")
+            if summary.get("unexpected"):
+                st.warning(f"{len(summary['unexpected']):,} symbols differ outside the scenarios' impact "
+                           f"(execute_load, embedded code or macros?): {', '.join(summary['unexpected'])}")
+            st.dataframe(sym_df[sym_df["status"] != "identical"], use_container_width=True)
+            st.write("Largest changes")
+            st.dataframe(summary["top"].dropna(axis=1, how="all"), use_container_width=True)
+        except Exception as e:
+            st.error(f"Could not summarise changes: {e}")
+        try:
+            from core.run_index import get_baseline_run, set_baseline_run
+            current = get_baseline_run(runs_root)
+            st.caption(f"Baseline for new runs: {current or '(none)'}")
+            if st.button(f"Use {run_a} as baseline for new runs"):
+                set_baseline_run(runs_root, run_a)
+                st.success(f"New runs will be summarised against {run_a}")
+        except Exception:
+            pass
+    try:
+        syms = list_symbols([runs_root / run_a, runs_root / run_b])
+    except Exception as e:
+        st.error(f"Could not read run results: {e}")
+        syms = []
     pick = st.selectbox("Symbol", ["(select)"] + syms, index=0)
     if pick and pick != "(select)":
-        df_a = _norm7(vals_a[pick]).rename(columns={"value":"value_A"})
-        df_b = _norm7(vals_b[pick]).rename(columns={"value":"value_B"})
-        merged = pd.merge(df_a, df_b, on=[f"key{i}" for i in range(1,8)], how=join_type)
-        if "value_A" in merged.columns and "value_B" in merged.columns:
-            merged["delta"] = merged["value_B"] - merged["value_A"]
-            with pd.option_context('mode.use_inf_as_na', True):
-                merged["pct_delta"] = merged["delta"] / merged["value_A"]
-        st.write(f"Rows: {len(merged):,}")
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            sort = st.selectbox("Sort by", ["keys", "abs_delta"], index=0)
+        with c2:
+            page_size = st.selectbox("Rows per page", [100, 1000, 10000], index=1)
+        with c3:
+            page_no = st.number_input("Page", min_value=1, value=1, step=1)
+        merged, total = compare_symbol(runs_root / run_a, runs_root / run_b, pick, how=join_type,
+                                       changes_only=changes_only, **tolerances,
+                                       offset=(int(page_no) - 1) * page_size, limit=page_size, sort=sort)
+        n_pages = max(1, -(-total // page_size))
+        st.write(f"Rows: {total:,} (page {int(page_no)} of {n_pages:,})")
         st.dataframe(merged, use_container_width=True)
 
-        # CSV export
-        st.download_button(
-            "Download CSV",
-            data=merged.to_csv(index=False).encode("utf-8"),
-            file_name=f"compare_{pick}_{run_a}_vs_{run_b}_{join_type}.csv",
-            mime="text/csv"
-        )
+        # CSV export (streamed by DuckDB, not built in pandas)
+        csv_name = f"compare_{pick}_{run_a}_vs_{run_b}_{join_type}.csv"
+        csv_path = runs_root / csv_name
+        if st.button("Download CSV"):
+            export_comparison(runs_root / run_a, runs_root / run_b, pick, csv_path, how=join_type, sort=sort,
+                              changes_only=changes_only, **tolerances)
+            st.success(f"Saved {csv_path}")
+            st.download_button("Click to download CSV", data=csv_path.read_bytes(), file_name=csv_name, mime="text/csv")
 
         # XLSX export (always create at least one visible sheet)
         def _safe_write_xlsx(df: pd.DataFrame, out_path: Path):
@@ -115,7 +183,9 @@ if run_a and run_a != "(select)" and run_b and run_b != "(select)":
         xlsx_name = f"compare_{pick}_{run_a}_vs_{run_b}_{join_type}.xlsx"
         xlsx_path = runs_root / xlsx_name
         if st.button("Download XLSX"):
-            _safe_write_xlsx(merged, xlsx_path)
+            full, _ = compare_symbol(runs_root / run_a, runs_root / run_b, pick, how=join_type, limit=None, sort=sort,
+                                     changes_only=changes_only, **tolerances)
+            _safe_write_xlsx(full, xlsx_path)
             st.success(f"Saved {xlsx_path}")
             st.download_button("Click to download XLSX", data=xlsx_path.read_bytes(), file_name=xlsx_name, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 else:
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import json
 import shutil
 import tempfile
 from pathlib import Path
@@ -9,8 +10,10 @@ from typing import Optional, Dict, Any
 
 from .core.model_runner_merg import run_gams
 from .core.gdx_io_merg import read_gdx, export_excel
-from .core.patch_builder import build_patch_gdx, get_patch_info
+from .core.patch_builder import build_patch_gdx, get_patch_info, needs_declared_domains
 from .core.equation_injector import inject_equation_includes
+from .core.symbol_indexer import create_symbol_index
+from .core.preflight import format_diagnostics, preflight
 from .core.provenance import generate_run_id, create_run_json, write_run_json
 
 app = typer.Typer(help="GAMS Helper CLI")
@@ -68,6 +71,23 @@ def run_scenario(file: Path, out: Path = Path("runs"), dry_run: bool = typer.Opt
     print(f"[blue]Scenario:[/blue] {sc.id} - {sc.description or 'No description'}")
     print(f"[blue]Output:[/blue] {run_dir}")
     
+    if dry_run:
+        # Compile only: model + equation includes in a linked workspace, cached by content
+        print("[yellow]Running in dry-run mode (compile only)...[/yellow]")
+        includes = {e["file"]: scenario_dir / e["file"] for e in sc.equations if "file" in e}
+        result = preflight(
+            model_dir, main_file, includes=includes, options=sc.gams.get("options", {}),
+            prepare=(lambda ws: inject_equation_includes(ws, sc.equations, main_file)) if sc.equations else None,
+            extra="inject_equation_includes" if sc.equations else None, listing_dir=run_dir,
+        )
+        (run_dir / "preflight.json").write_text(json.dumps(result, indent=2), encoding="utf-8")
+        if not result["ok"]:
+            for line in format_diagnostics(result):
+                print(f"[red]Compile error:[/red] {line}")
+            raise typer.Exit(2)
+        print(f"[green]Compile OK[/green]{' (cached)' if result['cached'] else ''}")
+        return
+    
     try:
         # Create temporary working directory
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -85,7 +105,8 @@ def run_scenario(file: Path, out: Path = Path("runs"), dry_run: bool = typer.Opt
             if sc.edits:
                 print("[yellow]Building patch.gdx from scenario edits...[/yellow]")
                 patch_path = temp_model_dir / "patch.gdx"
-                build_patch_gdx(sc.edits, scenario_dir, patch_path)
+                index = create_symbol_index(model_dir, main_file) if needs_declared_domains(sc.edits) else None
+                build_patch_gdx(sc.edits, scenario_dir, patch_path, symbol_index=index)
                 patch_info = get_patch_info(patch_path)
                 
                 # Skip patch loading setup - original main.gms already has correct loading
@@ -114,12 +135,7 @@ def run_scenario(file: Path, out: Path = Path("runs"), dry_run: bool = typer.Opt
             
             # Prepare GAMS options
             gams_options = sc.gams.get("options", {})
-            if dry_run:
-                # Set compile-only mode
-                gams_options["action"] = "c"  # Compile only
-                print("[yellow]Running in dry-run mode (compile only)...[/yellow]")
-            else:
-                print("[yellow]Running GAMS solve...[/yellow]")
+            print("[yellow]Running GAMS solve...[/yellow]")
             
             # Run GAMS
             try:
@@ -0,0 +1,155 @@
+"""
+Adaptive sweep refinement.
+
+adaptive_sweep evaluates a coarse grid over the axes of a matrix spec, then repeatedly adds
+midpoints between neighbouring design points whose KPIs differ most (relative to each KPI's
+observed range) or whose regime KPIs differ at all (e.g. a constraint switching between
+binding and slack), until the solve budget is spent or no neighbouring pair differs by more
+than the tolerance. Solves go where the response surface changes; flat regions keep the
+coarse spacing.
+
+The evaluation is a callback (run the scenarios, return KPI values per scenario), so the
+same loop drives GAMS runs via tools/run_matrix.py --adaptive or a cheap function in tests.
+"""
+from __future__ import annotations
+import itertools
+import math
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .scenario_merg import Scenario
+from .sweep import Axis, _base, parse_axes, scenario_for_point
+
+Evaluate = Callable[[List[Scenario]], Sequence[Dict[str, Any]]]
+
+DEFAULTS: Dict[str, Any] = {
+    "initial": 3,       # coarse grid positions per axis
+    "budget": 50,       # total solves, coarse design included
+    "batch": 4,         # refinement points evaluated per round
+    "kpis": None,       # response KPIs (default: every numeric value returned by evaluate)
+    "regime": [],       # KPIs whose change marks a regime switch (always refined)
+    "min_step": 1 / 64,  # smallest spacing worth refining, as a fraction of each axis range
+    "tolerance": 0.01,  # stop when no neighbouring pair differs by more (fraction of KPI range)
+}
+
+
+def _position_value(axis: Axis, u: float) -> Any:
+    """Value of an axis at normalized position u in [0, 1]."""
+    if axis.levels is not None:
+        return axis.levels[round(u * (len(axis.levels) - 1))]
+    if axis.dist == "uniform":
+        return axis.a + u * (axis.b - axis.a)
+    return math.exp(math.log(axis.a) + u * (math.log(axis.b) - math.log(axis.a)))
+
+
+def _snap(axes: List[Axis], u: np.ndarray) -> Tuple[float, ...]:
+    """Round a position to the nearest level on discrete axes (and to a stable float key)."""
+    out = []
+    for axis, x in zip(axes, u):
+        if axis.levels is not None:
+            n = len(axis.levels) - 1
+            x = round(x * n) / n if n else 0.0
+        out.append(round(float(x), 12))
+    return tuple(out)
+
+
+def _coarse(axes: List[Axis], initial: int) -> List[Tuple[float, ...]]:
+    ticks = [0.0] if initial <= 1 else [i / (initial - 1) for i in range(initial)]
+    return [_snap(axes, np.array(p)) for p in itertools.product(ticks, repeat=len(axes))]
+
+
+def _candidates(X: np.ndarray, Y: pd.DataFrame, regime: List[str], opts: Dict[str, Any]) -> List[Tuple[float, np.ndarray]]:
+    """(score, midpoint) for neighbouring pairs that still differ, highest score first."""
+    n, d = X.shape
+    if n < 2:
+        return []
+    k = min(2 * d, n - 1)
+    dist = np.sqrt(((X[:, None, :] - X[None, :, :]) ** 2).sum(axis=2))
+    pairs = set()
+    for i in range(n):
+        for j in np.argsort(dist[i], kind="stable")[1:k + 1]:
+            pairs.add((min(i, int(j)), max(i, int(j))))
+
+    values = Y.to_numpy(dtype=float)
+    span = np.nanmax(values, axis=0) - np.nanmin(values, axis=0) if len(Y.columns) else np.array([])
+    span = np.where(np.isfinite(span) & (span > 0), span, np.inf)
+    is_regime = np.array([c in regime for c in Y.columns], dtype=bool)
+    out = []
+    for i, j in pairs:
+        if np.abs(X[i] - X[j]).max() < 2 * opts["min_step"]:
+            continue
+        a, b = values[i], values[j]
+        missing = np.isnan(a) != np.isnan(b)  # a failed/infeasible point next to a solved one
+        delta = np.where(np.isnan(a) | np.isnan(b), 0.0, np.abs(a - b))
+        scores = np.where(is_regime, (delta > 0).astype(float), delta / span)
+        score = float(max(scores.max(initial=0.0), 1.0 if missing.any() else 0.0))
+        if score > opts["tolerance"]:
+            out.append((score, (X[i] + X[j]) / 2))
+    out.sort(key=lambda c: -c[0])
+    return out
+
+
+def adaptive_sweep(spec: Dict[str, Any], evaluate: Evaluate, **options: Any) -> pd.DataFrame:
+    """
+    Run an adaptive sweep over the axes of a matrix spec.
+
+    Args:
+        spec: Matrix spec (see sweep.load_matrix); options are read from its 'adaptive'
+            block and may be overridden by keyword (initial, budget, batch, kpis, regime,
+            min_step, tolerance; see DEFAULTS)
+        evaluate: Called with a list of scenarios, returns one dict of KPI values per
+            scenario (extra keys such as run_dir are kept in the result)
+
+    Returns:
+        DataFrame with scenario, stage (0 = coarse design, then one per refinement round),
+        one column per axis and the returned values, one row per solve
+    """
+    opts = {**DEFAULTS, **(spec.get("adaptive") or {}), **options}
+    axes = parse_axes(spec)
+    unsupported = [a.name for a in axes if a.dist == "normal"]
+    if unsupported:
+        raise ValueError(f"Adaptive sweeps need bounded axes (values, range, linspace, uniform, loguniform): {', '.join(unsupported)}")
+    budget = int(opts["budget"])
+    base = _base(spec)
+    regime = list(opts["regime"] or [])
+    seen = set()
+    positions: List[Tuple[float, ...]] = []
+    rows: List[Dict[str, Any]] = []
+
+    def run(batch: List[Tuple[float, ...]], stage: int) -> int:
+        batch = [u for u in dict.fromkeys(batch) if u not in seen][:budget - len(rows)]
+        scenarios = []
+        for u in batch:
+            point = {a.name: _position_value(a, x) for a, x in zip(axes, u)}
+            scenarios.append(scenario_for_point(spec, point, len(rows) + len(scenarios), base=base))
+        results = list(evaluate(scenarios)) if scenarios else []
+        if len(results) != len(scenarios):
+            raise ValueError(f"evaluate returned {len(results)} results for {len(scenarios)} scenarios")
+        for u, scen, res in zip(batch, scenarios, results):
+            seen.add(u)
+            positions.append(u)
+            rows.append({"scenario": scen.id, "stage": stage, **scen.meta["sweep"]["point"], **(res or {})})
+        return len(batch)
+
+    run(_coarse(axes, int(opts["initial"])), 0)
+    stage = 1
+    while len(rows) < budget:
+        frame = pd.DataFrame(rows)
+        kpis = opts["kpis"] or [c for c in frame.columns
+                                if c not in ("scenario", "stage", *(a.name for a in axes))
+                                and pd.api.types.is_numeric_dtype(frame[c])]
+        kpis = list(dict.fromkeys([*kpis, *(r for r in regime if r in frame.columns)]))
+        Y = frame.reindex(columns=kpis).apply(pd.to_numeric, errors="coerce")
+        batch = []
+        for _, mid in _candidates(np.array(positions), Y, regime, opts):
+            u = _snap(axes, mid)
+            if u not in seen and u not in batch:
+                batch.append(u)
+            if len(batch) >= int(opts["batch"]):
+                break
+        if not batch or not run(batch, stage):
+            break
+        stage += 1
+    return pd.DataFrame(rows)
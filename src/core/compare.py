@@ -0,0 +1,596 @@
+"""
+SQL-pushdown comparison of run results.
+
+Runs are attached read-only to an in-memory DuckDB connection and the join, delta and
+pct_delta are computed inside DuckDB; only the requested symbol is scanned and only the
+requested page of rows is returned to pandas. Each run is read from results.duckdb,
+else symbol_values.parquet, else raw.gdx (requested symbols only).
+"""
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import duckdb  # type: ignore
+import pandas as pd
+
+KEY_COLUMNS = tuple(f"key{i}" for i in range(1, 8))
+# Memory cap for comparison queries; larger joins spill to DuckDB's temp directory
+MEMORY_LIMIT = os.getenv("GAMS_COMPARE_MEMORY_LIMIT", "2GB")
+# Symbol content hashes use DuckDB's hash(), which is only stable within a DuckDB version
+HASH_VERSION = f"duckdb-{duckdb.__version__}"
+DIFF_SUMMARY_FILENAME = "diff_summary.json"
+_JOINS = {"inner": "INNER JOIN", "outer": "FULL OUTER JOIN", "left": "LEFT JOIN", "right": "RIGHT JOIN"}
+# Per-symbol tolerance overrides: {symbol: {"atol": float, "rtol": float}}
+SymbolTolerances = Dict[str, Dict[str, float]]
+# Row order of diff summaries by status
+_STATUS_ORDER = {"changed": 0, "added": 1, "removed": 2, "identical": 3}
+
+
+def load_tolerances(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read a tolerance file.
+
+    Format (YAML):
+        atol: 1.0e-6          # global absolute tolerance
+        rtol: 1.0e-9          # global relative tolerance (relative to run A)
+        symbols:
+          x: {atol: 0.01}     # per-symbol overrides
+
+    Returns:
+        {"atol": float, "rtol": float, "symbol_tolerances": {...}}, ready to pass as keyword arguments
+    """
+    import yaml
+    data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    return {"atol": float(data.get("atol", 0.0)), "rtol": float(data.get("rtol", 0.0)),
+            "symbol_tolerances": {k: {t: float(v) for t, v in (d or {}).items()}
+                                  for k, d in (data.get("symbols") or {}).items()}}
+
+
+def resolve_tolerance(symbol: str, atol: float = 0.0, rtol: float = 0.0,
+                      symbol_tolerances: Optional[SymbolTolerances] = None) -> Tuple[float, float]:
+    """(atol, rtol) for a symbol: its override where given, else the global values."""
+    override = (symbol_tolerances or {}).get(symbol, {})
+    return float(override.get("atol", atol)), float(override.get("rtol", rtol))
+
+
+def _outside_sql(atol: str, rtol: str) -> str:
+    """Rows whose values differ beyond |B - A| <= atol + rtol * |A|; a missing side is always outside."""
+    return (f"(a.symbol IS NULL OR b.symbol IS NULL OR (a.value IS DISTINCT FROM b.value "
+            f"AND NOT coalesce(abs(b.value - a.value) <= {atol} + {rtol} * abs(a.value), FALSE)))")
+
+
+def _connect() -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect()
+    con.execute(f"SET memory_limit = '{MEMORY_LIMIT}'")
+    return con
+
+
+def _literal(path: Union[str, Path]) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def _gdx_frame(run_dir: Path, symbols: Optional[Sequence[str]], marginals: bool = False) -> pd.DataFrame:
+    from .gdx_io_merg import read_gdx_transfer_full
+    gdx = run_dir / "raw.gdx"
+    if not gdx.exists():
+        raise FileNotFoundError(f"No results.duckdb, symbol_values.parquet or raw.gdx in {run_dir}")
+    vals, margs, _ = read_gdx_transfer_full(str(gdx), symbols=list(symbols) if symbols else None)
+    frames = []
+    for name, df in ((margs if marginals else vals) or {}).items():
+        df = df.rename(columns={"marginal": "value"}) if marginals else df.copy()
+        dim = sum(c.startswith("key") for c in df.columns)
+        for c in KEY_COLUMNS:
+            if c not in df.columns:
+                df[c] = None
+        df["symbol"] = name
+        df["dim"] = dim
+        frames.append(df[["symbol", "dim", *KEY_COLUMNS, "value"]])
+    if not frames:
+        return pd.DataFrame({"symbol": pd.Series(dtype=str), "dim": pd.Series(dtype="int64"),
+                             **{c: pd.Series(dtype=str) for c in KEY_COLUMNS}, "value": pd.Series(dtype=float)})
+    return pd.concat(frames, ignore_index=True)
+
+
+def attach_run(con: duckdb.DuckDBPyConnection, run_dir: Union[str, Path], alias: str,
+               symbols: Optional[Sequence[str]] = None) -> str:
+    """
+    Make a run's values queryable on ``con``.
+
+    Args:
+        con: DuckDB connection
+        run_dir: Run directory
+        alias: SQL identifier to attach the run under
+        symbols: Symbols needed (only used by the GDX fallback to limit reading)
+
+    Returns:
+        SQL relation with columns symbol, dim, key1..key7 and value
+    """
+    run_dir = Path(run_dir)
+    db = run_dir / "results.duckdb"
+    if db.exists():
+        con.execute(f"ATTACH {_literal(db)} AS {alias} (READ_ONLY)")
+        return f"{alias}.symbol_values"
+    parquet = run_dir / "symbol_values.parquet"
+    if parquet.exists():
+        return f"read_parquet({_literal(parquet)})"
+    con.register(f"{alias}_gdx", _gdx_frame(run_dir, symbols))
+    keys = ", ".join(f"CAST({c} AS VARCHAR) AS {c}" for c in KEY_COLUMNS)
+    return f"(SELECT symbol, dim, {keys}, CAST(value AS DOUBLE) AS value FROM {alias}_gdx)"
+
+
+def attach_marginals(con: duckdb.DuckDBPyConnection, run_dir: Union[str, Path], alias: str,
+                     symbols: Optional[Sequence[str]] = None) -> str:
+    """
+    Like attach_run, for marginals: returns a relation with columns symbol, dim, key1..key7
+    and value (the marginal), read from results.duckdb, symbol_marginals.parquet or raw.gdx.
+    """
+    run_dir = Path(run_dir)
+    keys = ", ".join(KEY_COLUMNS)
+    db = run_dir / "results.duckdb"
+    if db.exists():
+        if not con.execute("SELECT count(*) FROM duckdb_databases() WHERE database_name = ?", [alias]).fetchone()[0]:
+            con.execute(f"ATTACH {_literal(db)} AS {alias} (READ_ONLY)")
+        return f"(SELECT symbol, dim, {keys}, marginal AS value FROM {alias}.symbol_marginals)"
+    parquet = run_dir / "symbol_marginals.parquet"
+    if parquet.exists():
+        return f"(SELECT symbol, dim, {keys}, marginal AS value FROM read_parquet({_literal(parquet)}))"
+    con.register(f"{alias}_gdx_m", _gdx_frame(run_dir, symbols, marginals=True))
+    casts = ", ".join(f"CAST({c} AS VARCHAR) AS {c}" for c in KEY_COLUMNS)
+    return f"(SELECT symbol, dim, {casts}, CAST(value AS DOUBLE) AS value FROM {alias}_gdx_m)"
+
+
+def list_symbols(run_dirs: Sequence[Union[str, Path]]) -> List[str]:
+    """Symbols present in every given run, sorted."""
+    con = _connect()
+    try:
+        common = None
+        for i, run_dir in enumerate(run_dirs):
+            src = attach_run(con, run_dir, f"run_{i}")
+            names = {r[0] for r in con.execute(f"SELECT DISTINCT symbol FROM {src}").fetchall()}
+            common = names if common is None else common & names
+        return sorted(common or [])
+    finally:
+        con.close()
+
+
+def _symbol_dim(con: duckdb.DuckDBPyConnection, sources: Sequence[str], symbol: str) -> int:
+    union = " UNION ALL ".join(f"SELECT max(dim) AS dim FROM {s} WHERE symbol = ?" for s in sources)
+    dim = con.execute(f"SELECT max(dim) FROM ({union})", [symbol] * len(sources)).fetchone()[0]
+    return int(dim or 0)
+
+
+def _compare_sql(src_a: str, src_b: str, how: str, dim: int, sort: str,
+                 tolerance: Optional[Tuple[float, float]] = None) -> Tuple[str, str]:
+    """(unordered comparison query, ORDER BY clause); with a tolerance only rows outside it are kept."""
+    if how not in _JOINS:
+        raise ValueError(f"Unknown join type: {how} (expected one of {', '.join(_JOINS)})")
+    keys = KEY_COLUMNS[:dim]
+    on = " AND ".join(f"a.{k} IS NOT DISTINCT FROM b.{k}" for k in keys) or "TRUE"
+    key_select = "".join(f"COALESCE(a.{k}, b.{k}) AS {k}, " for k in keys)
+    key_order = ", ".join(f"{k} NULLS FIRST" for k in keys)
+    if sort == "abs_delta":
+        order = "abs(delta) DESC NULLS LAST" + (f", {key_order}" if key_order else "")
+    elif sort == "keys":
+        order = key_order or "delta"
+    else:
+        raise ValueError(f"Unknown sort: {sort} (expected 'keys' or 'abs_delta')")
+    cols = ", ".join(("symbol", "dim", *keys, "value"))
+    return (
+        f"WITH a AS (SELECT {cols} FROM {src_a} WHERE symbol = $symbol), "
+        f"b AS (SELECT {cols} FROM {src_b} WHERE symbol = $symbol) "
+        f"SELECT {key_select}a.value AS value_A, b.value AS value_B, "
+        "b.value - a.value AS delta, "
+        "CASE WHEN a.value = 0 THEN NULL ELSE (b.value - a.value) / a.value END AS pct_delta "
+        f"FROM a {_JOINS[how]} b ON {on}"
+        + (f" WHERE {_outside_sql(repr(float(tolerance[0])), repr(float(tolerance[1])))}" if tolerance else "")
+    ), f" ORDER BY {order}"
+
+
+def compare_symbol(
+    run_dir_a: Union[str, Path],
+    run_dir_b: Union[str, Path],
+    symbol: str,
+    how: str = "inner",
+    offset: int = 0,
+    limit: Optional[int] = 1000,
+    sort: str = "keys",
+    changes_only: bool = False,
+    atol: float = 0.0,
+    rtol: float = 0.0,
+    symbol_tolerances: Optional[SymbolTolerances] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Compare one symbol between two runs.
+
+    Args:
+        run_dir_a: Run directory of run A
+        run_dir_b: Run directory of run B
+        symbol: Symbol name
+        how: Join type: "inner", "outer", "left" or "right"
+        offset: First row of the page
+        limit: Page size (None for all rows)
+        sort: "keys" (by key columns) or "abs_delta" (largest changes first)
+        changes_only: Keep only rows outside tolerance; symbols with identical content hashes
+            return an empty page without being joined
+        atol, rtol: Global tolerances for changes_only (|B - A| <= atol + rtol * |A| is unchanged)
+        symbol_tolerances: Per-symbol {"atol", "rtol"} overrides
+
+    Returns:
+        (page, total_rows): page has key1..key<dim>, value_A, value_B, delta and pct_delta
+        (NULL where value_A is 0 or a side is missing)
+    """
+    con = _connect()
+    try:
+        src_a = attach_run(con, run_dir_a, "run_a", [symbol])
+        src_b = attach_run(con, run_dir_b, "run_b", [symbol])
+        dim = _symbol_dim(con, (src_a, src_b), symbol)
+        tolerance = resolve_tolerance(symbol, atol, rtol, symbol_tolerances) if changes_only else None
+        if changes_only and _identical(con, src_a, src_b, symbol):
+            empty = list(KEY_COLUMNS[:dim]) + ["value_A", "value_B", "delta", "pct_delta"]
+            return pd.DataFrame(columns=empty), 0
+        sql, order = _compare_sql(src_a, src_b, how, dim, sort, tolerance)
+        params = {"symbol": symbol}
+        total = con.execute(f"SELECT count(*) FROM ({sql})", params).fetchone()[0]
+        page_sql = sql + order
+        if limit is not None:
+            page_sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+        elif offset:
+            page_sql += f" OFFSET {int(offset)}"
+        return con.execute(page_sql, params).fetchdf(), int(total)
+    finally:
+        con.close()
+
+
+def export_comparison(
+    run_dir_a: Union[str, Path],
+    run_dir_b: Union[str, Path],
+    symbol: str,
+    out_path: Union[str, Path],
+    how: str = "inner",
+    sort: str = "keys",
+    changes_only: bool = False,
+    atol: float = 0.0,
+    rtol: float = 0.0,
+    symbol_tolerances: Optional[SymbolTolerances] = None,
+) -> Path:
+    """
+    Stream a full two-run comparison of one symbol to CSV or Parquet (by file suffix)
+    without materialising it in pandas. Tolerance arguments as for compare_symbol.
+    """
+    out_path = Path(out_path)
+    fmt = "PARQUET" if out_path.suffix.lower() == ".parquet" else "CSV, HEADER"
+    con = _connect()
+    try:
+        src_a = attach_run(con, run_dir_a, "run_a", [symbol])
+        src_b = attach_run(con, run_dir_b, "run_b", [symbol])
+        tolerance = resolve_tolerance(symbol, atol, rtol, symbol_tolerances) if changes_only else None
+        sql, order = _compare_sql(src_a, src_b, how, _symbol_dim(con, (src_a, src_b), symbol), sort, tolerance)
+        con.execute(f"COPY ({sql}{order}) TO {_literal(out_path)} (FORMAT {fmt})", {"symbol": symbol})
+    finally:
+        con.close()
+    return out_path
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _matrix_sql(sources: Sequence[str], labels: Sequence[str], baseline: Optional[str], dim: int,
+                sort: str, window: str = "") -> Tuple[str, str]:
+    """
+    (distinct key query, pivot query) for the N-way matrix.
+
+    The pivot left-joins every run onto the distinct keys. When sorting by keys the page
+    window is applied to the keys first, so only the displayed rows are joined.
+    """
+    keys = KEY_COLUMNS[:dim]
+    key_cols = ", ".join(keys)
+    if keys:
+        key_sql = " UNION ".join(f"SELECT {key_cols} FROM {src} WHERE symbol = $symbol" for src in sources)
+        on = " AND ".join("k.{0} IS NOT DISTINCT FROM t{{i}}.{0}".format(k) for k in keys)
+    else:
+        key_sql = "SELECT DISTINCT 1 AS _row FROM (" + " UNION ALL ".join(
+            f"SELECT 1 FROM {src} WHERE symbol = $symbol" for src in sources) + ")"
+        on = "TRUE"
+    key_order = ", ".join(f"{k} NULLS FIRST" for k in keys) or "1"
+    base = labels.index(baseline) if baseline is not None else None
+    columns = [f"k.{k}" for k in keys]
+    columns += [f"t{i}.value AS {_ident(label)}" for i, label in enumerate(labels)]
+    deltas = [f"t{i}.value - t{base}.value" for i in range(len(labels)) if i != base] if base is not None else []
+    columns += [f"{d} AS {_ident('delta_' + labels[i])}"
+                for d, i in zip(deltas, [i for i in range(len(labels)) if i != base])]
+    joins = "".join(
+        f" LEFT JOIN (SELECT {key_cols + ', ' if keys else ''}value FROM {src} WHERE symbol = $symbol) t{i} ON {on.format(i=i)}"
+        for i, src in enumerate(sources)
+    )
+    if sort == "max_abs_delta" and deltas:
+        spread = "greatest(" + ", ".join(f"abs({d})" for d in deltas) + ")"
+        key_rel = f"({key_sql})"
+        order = f" ORDER BY {spread} DESC NULLS LAST, {key_order}{window}"
+    elif sort in ("keys", "max_abs_delta"):
+        key_rel = f"(SELECT * FROM ({key_sql}) ORDER BY {key_order}{window})"
+        order = f" ORDER BY {key_order}"
+    else:
+        raise ValueError(f"Unknown sort: {sort} (expected 'keys' or 'max_abs_delta')")
+    return key_sql, f"SELECT {', '.join(columns)} FROM {key_rel} k{joins}{order}"
+
+
+def _window(offset: int, limit: Optional[int]) -> str:
+    if limit is not None:
+        return f" LIMIT {int(limit)} OFFSET {int(offset)}"
+    return f" OFFSET {int(offset)}" if offset else ""
+
+
+def _matrix_query(con: duckdb.DuckDBPyConnection, run_dirs: Sequence[Union[str, Path]], symbol: str,
+                  baseline: Optional[str], sort: str, window: str = "") -> Tuple[str, str]:
+    labels = [Path(r).name for r in run_dirs]
+    if len(set(labels)) != len(labels):
+        raise ValueError("Run directories must have distinct names")
+    if baseline is not None and baseline not in labels:
+        raise ValueError(f"Baseline {baseline} is not one of the compared runs")
+    sources = [attach_run(con, r, f"run_{i}", [symbol]) for i, r in enumerate(run_dirs)]
+    return _matrix_sql(sources, labels, baseline, _symbol_dim(con, sources, symbol), sort, window)
+
+
+def compare_matrix(
+    run_dirs: Sequence[Union[str, Path]],
+    symbol: str,
+    baseline: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = 1000,
+    sort: str = "keys",
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Pivot one symbol across many runs: keys as rows, one value column per run.
+
+    Args:
+        run_dirs: Run directories; columns are named after the run folder
+        symbol: Symbol name
+        baseline: Run folder name to diff against; adds a delta_<run> column per other run
+        offset: First row of the page
+        limit: Page size (None for all rows)
+        sort: "keys" or "max_abs_delta" (largest deviation from the baseline first)
+
+    Returns:
+        (page, total_rows); keys missing in a run are NULL in that run's column
+    """
+    con = _connect()
+    try:
+        key_sql, sql = _matrix_query(con, run_dirs, symbol, baseline, sort, _window(offset, limit))
+        params = {"symbol": symbol}
+        total = con.execute(f"SELECT count(*) FROM ({key_sql})", params).fetchone()[0]
+        return con.execute(sql, params).fetchdf(), int(total)
+    finally:
+        con.close()
+
+
+def export_matrix(
+    run_dirs: Sequence[Union[str, Path]],
+    symbol: str,
+    out_path: Union[str, Path],
+    baseline: Optional[str] = None,
+    sort: str = "keys",
+) -> Path:
+    """Stream the full N-way pivot of one symbol to CSV or Parquet (by file suffix)."""
+    out_path = Path(out_path)
+    fmt = "PARQUET" if out_path.suffix.lower() == ".parquet" else "CSV, HEADER"
+    con = _connect()
+    try:
+        _, sql = _matrix_query(con, run_dirs, symbol, baseline, sort)
+        con.execute(f"COPY ({sql}) TO {_literal(out_path)} (FORMAT {fmt})", {"symbol": symbol})
+    finally:
+        con.close()
+    return out_path
+
+
+def _symbol_hash_sql(source: str, where: str = "TRUE") -> str:
+    """Per-symbol record count and order-independent content hash of keys and values."""
+    keys = ", ".join(KEY_COLUMNS)
+    return (
+        "SELECT symbol, max(dim) AS dim, count(*) AS records, "
+        "md5(concat_ws(':', bit_xor(h), sum(h::HUGEINT), count(*))) AS content_hash "
+        f"FROM (SELECT symbol, dim, hash({keys}, value) AS h FROM {source} WHERE {where}) GROUP BY symbol"
+    )
+
+
+def store_symbol_hashes(con: duckdb.DuckDBPyConnection, run_id: str) -> None:
+    """Record per-symbol content hashes of one run in a results database (called at ingestion)."""
+    con.execute("CREATE TABLE IF NOT EXISTS symbol_hashes (run_id TEXT, symbol TEXT, dim INTEGER, records BIGINT, "
+                "content_hash TEXT, hash_version TEXT)")
+    con.execute("DELETE FROM symbol_hashes WHERE run_id = ?", [run_id])
+    con.execute(f"INSERT INTO symbol_hashes SELECT ?, symbol, dim, records, content_hash, ? "
+                f"FROM ({_symbol_hash_sql('symbol_values', 'run_id = ?')})", [run_id, HASH_VERSION, run_id])
+
+
+def _symbol_hashes(con: duckdb.DuckDBPyConnection, source: str, alias: str,
+                   symbol: Optional[str] = None) -> pd.DataFrame:
+    """Stored hashes when the run database has them for this DuckDB version, else computed on the fly."""
+    where, params = ("symbol = ?", [symbol]) if symbol is not None else ("TRUE", [])
+    if source == f"{alias}.symbol_values":
+        stored = con.execute("SELECT count(*) FROM duckdb_tables() WHERE database_name = ? AND table_name = 'symbol_hashes'",
+                             [alias]).fetchone()[0]
+        if stored:
+            df = con.execute(f"SELECT symbol, dim, records, content_hash FROM {alias}.symbol_hashes "
+                             f"WHERE hash_version = ? AND {where}", [HASH_VERSION, *params]).fetchdf()
+            if not df.empty:
+                return df
+    return con.execute(_symbol_hash_sql(source, where), params).fetchdf()
+
+
+def _identical(con: duckdb.DuckDBPyConnection, src_a: str, src_b: str, symbol: str) -> bool:
+    ha = _symbol_hashes(con, src_a, "run_a", symbol)
+    hb = _symbol_hashes(con, src_b, "run_b", symbol)
+    return len(ha) == 1 and len(hb) == 1 and ha["content_hash"].iloc[0] == hb["content_hash"].iloc[0]
+
+
+def run_diff_summary(run_dir_a: Union[str, Path], run_dir_b: Union[str, Path], top_k: int = 20,
+                     atol: float = 0.0, rtol: float = 0.0,
+                     symbol_tolerances: Optional[SymbolTolerances] = None,
+                     symbols: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Summarise what changed between two runs across every symbol.
+
+    Symbols whose content hashes match are reported as identical without being read;
+    the remaining symbols are diffed in a single DuckDB pass.
+
+    Args:
+        run_dir_a: Reference run directory (e.g. the baseline)
+        run_dir_b: Run directory to compare against it
+        top_k: Number of largest absolute changes to return
+        atol, rtol: Global tolerances; records within |B - A| <= atol + rtol * |A| count as unchanged
+        symbol_tolerances: Per-symbol {"atol", "rtol"} overrides
+        symbols: Symbols expected to differ (case-insensitive, e.g. impacted_between); every
+            symbol is still diffed, and differences outside this set are listed as unexpected
+
+    Returns:
+        Dictionary with
+            symbols: DataFrame of symbol, status (changed/identical/added/removed), records_A, records_B,
+                changed, added, removed (record counts), max_abs_delta and max_rel_delta, plus
+                impacted (bool) with ``symbols``;
+            top: DataFrame of the top_k largest changes (symbol, key1..key7, value_A, value_B, delta, pct_delta);
+            identical: number of symbols whose hashes match or whose records are all within tolerance;
+            unexpected: with ``symbols``, the symbols that differ although outside them
+    """
+    impacted = list(symbols) if symbols is not None else None
+    con = _connect()
+    try:
+        src_a = attach_run(con, run_dir_a, "run_a")
+        src_b = attach_run(con, run_dir_b, "run_b")
+        hashes = pd.merge(_symbol_hashes(con, src_a, "run_a"), _symbol_hashes(con, src_b, "run_b"),
+                          on="symbol", how="outer", suffixes=("_A", "_B"))
+        status = pd.Series("changed", index=hashes.index)
+        status[hashes["content_hash_A"] == hashes["content_hash_B"]] = "identical"
+        status[hashes["content_hash_A"].isna()] = "added"
+        status[hashes["content_hash_B"].isna()] = "removed"
+        hashes["status"] = status
+        changed = hashes.loc[hashes["status"] == "changed", ["symbol"]].copy()
+        tolerances = [resolve_tolerance(sym, atol, rtol, symbol_tolerances) for sym in changed["symbol"]]
+        changed["atol"] = [t[0] for t in tolerances]
+        changed["rtol"] = [t[1] for t in tolerances]
+        con.register("changed_symbols", changed.astype({"atol": float, "rtol": float}))
+
+        keys = ", ".join(f"COALESCE(a.{k}, b.{k}) AS {k}" for k in KEY_COLUMNS)
+        on = " AND ".join(f"a.{k} IS NOT DISTINCT FROM b.{k}" for k in KEY_COLUMNS)
+        cols = ", ".join(("symbol", *KEY_COLUMNS, "value"))
+        con.execute(
+            f"CREATE TEMP TABLE diff AS "
+            f"WITH a AS (SELECT {cols} FROM {src_a} WHERE symbol IN (SELECT symbol FROM changed_symbols)), "
+            f"b AS (SELECT {cols} FROM {src_b} WHERE symbol IN (SELECT symbol FROM changed_symbols)) "
+            f"SELECT COALESCE(a.symbol, b.symbol) AS symbol, {keys}, a.value AS value_A, b.value AS value_B, "
+            "b.value - a.value AS delta, "
+            "CASE WHEN a.value = 0 THEN NULL ELSE (b.value - a.value) / a.value END AS pct_delta, "
+            "CASE WHEN a.symbol IS NULL THEN 'added' WHEN b.symbol IS NULL THEN 'removed' ELSE 'changed' END AS change "
+            f"FROM a FULL OUTER JOIN b ON a.symbol = b.symbol AND {on} "
+            "JOIN changed_symbols t ON t.symbol = COALESCE(a.symbol, b.symbol) "
+            f"WHERE {_outside_sql('t.atol', 't.rtol')}"
+        )
+        per_symbol = con.execute(
+            "SELECT symbol, count(*) FILTER (WHERE change = 'changed') AS changed, "
+            "count(*) FILTER (WHERE change = 'added') AS added, count(*) FILTER (WHERE change = 'removed') AS removed, "
+            "max(abs(delta)) AS max_abs_delta, max(abs(pct_delta)) AS max_rel_delta FROM diff GROUP BY symbol"
+        ).fetchdf()
+        top = con.execute(
+            f"SELECT symbol, {', '.join(KEY_COLUMNS)}, value_A, value_B, delta, pct_delta FROM diff "
+            f"WHERE change = 'changed' ORDER BY abs(delta) DESC, symbol LIMIT {int(top_k)}"
+        ).fetchdf()
+    finally:
+        con.close()
+
+    symbols = pd.merge(hashes[["symbol", "status", "records_A", "records_B"]], per_symbol, on="symbol", how="left")
+    for col in ("changed", "added", "removed"):
+        symbols[col] = symbols[col].fillna(0).astype(int)
+    # hashes differ but every record is within tolerance (or compares equal, e.g. -0.0 vs 0.0)
+    symbols.loc[(symbols["status"] == "changed") & (symbols[["changed", "added", "removed"]].sum(axis=1) == 0),
+                "status"] = "identical"
+    order = symbols["status"].map(_STATUS_ORDER)
+    symbols = symbols.assign(_order=order).sort_values(["_order", "max_abs_delta", "symbol"],
+                                                       ascending=[True, False, True]).drop(columns="_order")
+    summary = {"symbols": symbols.reset_index(drop=True), "top": top,
+               "identical": int((symbols["status"] == "identical").sum())}
+    return _mark_impacted(summary, impacted) if impacted is not None else summary
+
+
+def precompute_diff_summary(run_dir: Union[str, Path], runs_root: Optional[Union[str, Path]] = None,
+                            top_k: int = 20, **tolerances: Any) -> Optional[Path]:
+    """
+    Write diff_summary.json for a run against the designated baseline of its runs root.
+    Tolerance keyword arguments are passed to run_diff_summary and recorded in the file.
+
+    Returns the summary path, or None when no baseline is set or the run is the baseline.
+    """
+    from .run_index import get_baseline_run
+    run_dir = Path(run_dir)
+    runs_root = Path(runs_root) if runs_root else run_dir.parent
+    baseline = get_baseline_run(runs_root)
+    if not baseline or baseline == run_dir.name:
+        return None
+    summary = run_diff_summary(runs_root / baseline, run_dir, top_k=top_k, **tolerances)
+    out = run_dir / DIFF_SUMMARY_FILENAME
+    out.write_text(json.dumps({
+        "baseline": baseline, "top_k": top_k, "tolerances": tolerances, "identical": summary["identical"],
+        "symbols": json.loads(summary["symbols"].to_json(orient="records")),
+        "top": json.loads(summary["top"].to_json(orient="records")),
+    }, indent=2), encoding="utf-8")
+    return out
+
+
+def load_diff_summary(run_dir_a: Union[str, Path], run_dir_b: Union[str, Path], top_k: int = 20,
+                      symbols: Optional[Iterable[str]] = None, **tolerances: Any) -> Dict[str, Any]:
+    """
+    run_diff_summary, served from run B's precomputed diff_summary.json when it was made
+    against run A with the same tolerances. With ``symbols``, the summary is checked against
+    them as in run_diff_summary.
+    """
+    cached = Path(run_dir_b) / DIFF_SUMMARY_FILENAME
+    if cached.exists():
+        try:
+            data = json.loads(cached.read_text(encoding="utf-8"))
+            if (data.get("baseline") == Path(run_dir_a).name and data.get("top_k", 0) >= top_k
+                    and _same_tolerances(data.get("tolerances") or {}, tolerances)):
+                summary = {"symbols": pd.DataFrame(data["symbols"]), "top": pd.DataFrame(data["top"]),
+                           "identical": data["identical"]}
+                summary["top"] = summary["top"].head(top_k)
+                return _mark_impacted(summary, symbols) if symbols is not None else summary
+        except Exception:
+            pass
+    return run_diff_summary(run_dir_a, run_dir_b, top_k=top_k, symbols=symbols, **tolerances)
+
+
+def _mark_impacted(summary: Dict[str, Any], symbols: Iterable[str]) -> Dict[str, Any]:
+    """Flag the symbols of a summary that are expected to differ, and list those that differ anyway."""
+    wanted = {str(sym).lower() for sym in symbols}
+    table = summary["symbols"].copy()
+    table["impacted"] = table["symbol"].str.lower().isin(wanted)
+    unexpected = table.loc[(table["status"] != "identical") & ~table["impacted"], "symbol"]
+    return {**summary, "symbols": table, "unexpected": sorted(unexpected, key=str.lower)}
+
+
+def impacted_between(run_dir_a: Union[str, Path], run_dir_b: Union[str, Path]) -> Optional[Set[str]]:
+    """
+    Symbols that can differ between two runs of the same model and options: the union of
+    the symbols their scenarios impact (run.json "impact", see symbol_deps).
+
+    Returns:
+        The symbol names, or None when either run lacks an impact record or the runs differ
+        in model, main file or options
+    """
+    metas = []
+    for run_dir in (run_dir_a, run_dir_b):
+        try:
+            metas.append(json.loads((Path(run_dir) / "run.json").read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return None
+    a, b = metas
+    if not isinstance(a.get("impact"), dict) or not isinstance(b.get("impact"), dict):
+        return None
+    if any(a.get(k) != b.get(k) for k in ("model_hash", "main_file", "options")):
+        return None
+    return set(a["impact"].get("impacted") or []) | set(b["impact"].get("impacted") or [])
+
+
+def _same_tolerances(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    def norm(t):
+        return (float(t.get("atol") or 0.0), float(t.get("rtol") or 0.0), t.get("symbol_tolerances") or {})
+    return norm(a) == norm(b)
@@ -1,12 +1,21 @@
 from __future__ import annotations
 import os
-from typing import Tuple, Type
+from pathlib import Path
+from typing import Optional, Tuple, Type
 
 DEFAULT_GAMS_HOME = r"C:\GAMS\49"
+CACHE_ROOT = Path.home() / ".cache" / "gams_companion"
 
 def get_gams_home() -> str:
     return os.getenv("GAMS_HOME", DEFAULT_GAMS_HOME)
 
+def cache_dir(env_var: str, name: str) -> Optional[Path]:
+    """Folder of an on-disk cache: the env_var setting, else CACHE_ROOT/name; None when set to "off"."""
+    value = os.getenv(env_var, "")
+    if value.lower() in ("off", "0", "false"):
+        return None
+    return Path(value).expanduser() if value else CACHE_ROOT / name
+
 def import_gams_workspace() -> Tuple[Type, str]:
     """Return (GamsWorkspace class, api_module_name).
 
@@ -12,6 +12,8 @@ import duckdb  # type: ignore
 import pandas as pd
 from ulid import ULID  # type: ignore
 
+from .compare import store_symbol_hashes
+
 
 def _import_transfer():
     """Import GAMS Transfer API with proper error handling"""
@@ -470,5 +472,7 @@ def to_duckdb(symbol_values: Dict[str, pd.DataFrame], db_path: str | Path, *, sy
                 FROM {view}
             """)
     
+    # Per-symbol content hashes let comparisons skip identical symbols
+    store_symbol_hashes(conn, run_id)
     conn.close()
     return db_path
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Include graph of a GAMS model.
+
+build_include_graph follows $include, $batinclude, $libinclude and $sysinclude directives from
+the root files, including conditional ones ($if exist x.inc $include x.inc), with no depth
+limit. Targets resolve as GAMS resolves them:
+- absolute paths are used as given;
+- relative paths are tried against the working directory (the folder of the first root), then
+  the including file's folder, then the include directories (IDIR);
+- library and system includes are tried against <GAMS_HOME>/inclib and <GAMS_HOME>;
+- a name without an extension also tries ".gms".
+
+Files are scanned as they are discovered, with independent subtrees scanned concurrently on a
+thread pool. Each file is scanned once, however often it is included. A depth-first walk in
+source order then flattens the graph. Include cycles are recorded, not followed.
+"""
+from __future__ import annotations
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .env import get_gams_home
+
+_DIRECTIVE_RE = re.compile(r'\$(bat|lib|sys)?include\b\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s;]+))', re.IGNORECASE)
+_CONDITION_RE = re.compile(r'\$\s*if', re.IGNORECASE)
+
+# Scan of one file: (declarations, [(number of declarations before the line, dollar control line,
+# line)], statement references), see symbol_indexer._parse
+Scan = Tuple[List[Dict], List[Tuple[int, str, int]], List[Dict]]
+Loader = Callable[[Path], Optional[Scan]]
+
+
+@dataclass
+class IncludeGraph:
+    """
+    Resolved include graph. ``files`` lists every reached file in include order; each edge is
+    {"source", "line", "kind", "target", "path", "conditional", "cycle"} with "path" None when
+    the target was not found. ``order`` holds (file, start, end) slices of each file's
+    declarations in include order (end None: to the end of the file).
+    """
+    roots: List[str]
+    files: List[str] = field(default_factory=list)
+    edges: List[Dict[str, Any]] = field(default_factory=list)
+    cycles: List[List[str]] = field(default_factory=list)
+    scans: Dict[str, Any] = field(default_factory=dict, repr=False)
+    order: List[Tuple[str, int, Optional[int]]] = field(default_factory=list, repr=False)
+
+    @property
+    def unresolved(self) -> List[Dict[str, Any]]:
+        """Unconditional includes whose target was not found."""
+        return [e for e in self.edges if e["path"] is None and not e["conditional"]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"roots": self.roots, "files": self.files, "edges": self.edges,
+                "cycles": self.cycles, "unresolved": self.unresolved}
+
+
+def parse_include(directive: str) -> Optional[Dict[str, Any]]:
+    """{"kind", "target", "conditional"} of a dollar control line that includes a file, else None."""
+    m = _DIRECTIVE_RE.search(directive)
+    if m is None:
+        return None
+    target = next(g for g in m.groups()[1:] if g is not None)
+    conditional = m.start() > 0 and _CONDITION_RE.match(directive) is not None
+    return {"kind": f"{(m.group(1) or '').lower()}include", "target": target, "conditional": conditional}
+
+
+def resolve_include(target: str, kind: str, including: Path, work_dir: Path,
+                    include_dirs: Iterable[Union[str, Path]] = (), gams_home: Optional[str] = None) -> Optional[Path]:
+    """
+    Path of an include target, None if not found (or built from compile-time %variables%).
+
+    Args:
+        target: File name as written in the directive
+        kind: "include", "batinclude", "libinclude" or "sysinclude"
+        including: File holding the directive
+        work_dir: GAMS working directory
+        include_dirs: Include directories (IDIR), searched last
+        gams_home: GAMS system directory (default env.get_gams_home())
+    """
+    if "%" in target or not target:
+        return None
+    name = Path(target)
+    names = [name] if name.suffix else [name, name.with_suffix(".gms")]
+    if kind == "libinclude":
+        bases = [Path(gams_home or get_gams_home()) / "inclib", *map(Path, include_dirs)]
+    elif kind == "sysinclude":
+        bases = [Path(gams_home or get_gams_home()), *map(Path, include_dirs)]
+    else:
+        bases = [work_dir, including.parent, *map(Path, include_dirs)]
+    for candidate in names:
+        if candidate.is_absolute():
+            if candidate.is_file():
+                return candidate
+            continue
+        for base in bases:
+            path = base / candidate
+            if path.is_file():
+                return path
+    return None
+
+
+def _key(path: Path) -> str:
+    return os.path.realpath(path)
+
+
+def build_include_graph(
+    roots: Iterable[Union[str, Path]],
+    loader: Loader,
+    include_dirs: Optional[Iterable[Union[str, Path]]] = None,
+    work_dir: Optional[Union[str, Path]] = None,
+    max_workers: Optional[int] = None,
+    gams_home: Optional[str] = None,
+) -> IncludeGraph:
+    """
+    Scan the root files and everything they include.
+
+    Args:
+        roots: Files to start from (normally the main file)
+        loader: Scans one file (symbol_indexer.Loader); returns None if it cannot be read
+        include_dirs: Include directories (IDIR)
+        work_dir: GAMS working directory (default: folder of the first root)
+        max_workers: Thread pool size (default min(8, CPU count))
+        gams_home: GAMS system directory for $libinclude / $sysinclude
+
+    Returns:
+        IncludeGraph; ``scans`` maps each file to its loader result
+    """
+    roots = [Path(r) for r in roots]
+    graph = IncludeGraph(roots=[str(r) for r in roots])
+    if not roots:
+        return graph
+    work_dir = Path(work_dir) if work_dir is not None else roots[0].parent
+    include_dirs = list(include_dirs or [])
+    shown: Dict[str, str] = {}  # key -> path as reached
+    children: Dict[str, List[Tuple[int, Optional[str], Dict[str, Any]]]] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1)) as pool:
+        pending = {}
+        for root in roots:
+            key = _key(root)
+            if key not in shown:
+                shown[key] = str(root)
+                pending[pool.submit(loader, root)] = (key, root)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, path = pending.pop(future)
+                scanned = graph.scans[key] = future.result()
+                links = children[key] = []
+                for position, text, line in scanned[1] if scanned is not None else []:
+                    include = parse_include(text)
+                    if include is None:
+                        continue
+                    target = resolve_include(include["target"], include["kind"], path, work_dir, include_dirs, gams_home)
+                    child = _key(target) if target is not None else None
+                    if child is not None and child not in shown:
+                        shown[child] = str(target)
+                        pending[pool.submit(loader, target)] = (child, target)
+                    links.append((position, child, {"source": str(path), "line": line, **include,
+                                                    "path": shown[child] if child is not None else None, "cycle": False}))
+
+    visited: set = set()
+    stack: List[str] = []
+
+    def walk(key: str) -> None:
+        visited.add(key)
+        stack.append(key)
+        graph.files.append(shown[key])
+        start = 0
+        for position, child, edge in children.get(key, []):
+            graph.edges.append(edge)
+            if child is None:
+                continue
+            if child in stack:
+                edge["cycle"] = True
+                graph.cycles.append([shown[k] for k in stack[stack.index(child):]] + [shown[child]])
+                continue
+            if child in visited:
+                continue
+            graph.order.append((key, start, position))
+            start = position
+            walk(child)
+        if graph.scans.get(key) is not None:
+            graph.order.append((key, start, None))
+        stack.pop()
+
+    for root in roots:
+        key = _key(root)
+        if key not in visited and graph.scans.get(key) is not None:
+            walk(key)
+    return graph
@@ -0,0 +1,368 @@
+"""
+KPI extraction from run results.
+
+A list of KPI requests is compiled into one DuckDB query: the requests become a small
+definition table that is joined to symbol_values on the symbol name, so every referenced
+symbol is scanned once and all KPIs are aggregated in a single GROUP BY. Derived KPIs
+(ratio, threshold) are then evaluated column-wise on the resulting run x KPI frame.
+
+Request formats (see docs/KPI_SCHEMA.md):
+    {name, symbol, where: {key1: 'A' or ['A', 'B'], ...}, agg: sum|mean|min|max|count|wmean, weight: symbol}
+    {name, product: [symbol_a, symbol_b], where, agg}    per-key product on shared keys, then aggregated
+    {name, ratio: [kpi_a, kpi_b]}                        kpi_a / kpi_b (None when kpi_b is 0)
+    {name, threshold: {kpi, op, value}}                  1.0 if kpi <op> value else 0.0
+A symbol reference "x.m" reads the marginals of x; "where_value: {op, value}" keeps only
+records whose (product) value passes the comparison.
+"""
+from __future__ import annotations
+import hashlib
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from .compare import KEY_COLUMNS, _connect, attach_marginals, attach_run
+from .run_index import get_kpi_values, put_kpi_values
+
+AGGREGATES = ("sum", "mean", "min", "max", "count", "wmean")
+# Results files in the order attach_run reads them; their size and mtime identify an ingestion
+_RESULT_FILES = ("results.duckdb", "symbol_values.parquet", "raw.gdx")
+
+_OPS = {">": ">", ">=": ">=", "<": "<", "<=": "<=", "==": "=", "!=": "<>"}
+_DERIVED = ("ratio", "threshold")
+
+_DEFS_DDL = (
+    "CREATE TEMP TABLE kpi_defs (kpi_idx INTEGER, name TEXT, symbol TEXT, field TEXT, symbol2 TEXT, field2 TEXT, "
+    "agg TEXT, weight TEXT, weight_field TEXT, vop TEXT, vval DOUBLE, "
+    + ", ".join(f"f_{k} TEXT[]" for k in KEY_COLUMNS) + ")"
+)
+
+
+def normalize_kpis(spec: Union[List[Dict[str, Any]], Dict[str, Any], None]) -> List[Dict[str, Any]]:
+    """Accept a KPI list or a KPI YAML document ({"kpis": [...]}) and return the list."""
+    if spec is None:
+        return []
+    if isinstance(spec, dict):
+        spec = spec.get("kpis") or []
+    if not isinstance(spec, list):
+        raise ValueError("KPI spec must be a list of requests or a mapping with a 'kpis' list")
+    return spec
+
+
+def kpi_definition_hash(request: Dict[str, Any]) -> str:
+    """Hash of what a KPI computes (its name excluded), used as the KPI cache key."""
+    canon = {k: v for k, v in request.items() if k != "name"}
+    canon["agg"] = (request.get("agg") or "sum").lower()
+    canon["where"] = {k: sorted(str(x) for x in (v if isinstance(v, list) else [v]))
+                      for k, v in (request.get("where") or {}).items() if k in KEY_COLUMNS}
+    return hashlib.sha256(json.dumps(canon, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def results_signature(run_dir: Union[str, Path]) -> Optional[str]:
+    """Identify the current ingestion of a run's results (file name, size, mtime); None if no results."""
+    for name in _RESULT_FILES:
+        path = Path(run_dir) / name
+        if path.exists():
+            st = path.stat()
+            return f"{name}:{st.st_size}:{st.st_mtime_ns}"
+    return None
+
+
+def _run_id(run_dir: Path) -> str:
+    try:
+        return json.loads((run_dir / "run.json").read_text(encoding="utf-8")).get("run_id") or run_dir.name
+    except Exception:
+        return run_dir.name
+
+
+def _term(ref: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Split a symbol reference into (symbol, field): "x" / "x.l" -> value, "x.m" -> marginal."""
+    if not ref:
+        return None, None
+    if ref.endswith(".m"):
+        return ref[:-2], "m"
+    return (ref[:-2] if ref.endswith(".l") else ref), "value"
+
+
+def _op(name: str, op: str) -> str:
+    if op not in _OPS:
+        raise ValueError(f"KPI {name}: unknown comparison '{op}' (expected one of {', '.join(_OPS)})")
+    return _OPS[op]
+
+
+def _split(requests: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(base KPIs computed from symbols, derived KPIs computed from other KPIs)."""
+    derived = [r for r in requests if any(k in r for k in _DERIVED)]
+    base = [r for r in requests if not any(k in r for k in _DERIVED)]
+    names = {r["name"] for r in requests}
+    for r in derived:
+        refs = r["ratio"] if "ratio" in r else [(r["threshold"] or {}).get("kpi")]
+        if "ratio" in r and (not isinstance(refs, list) or len(refs) != 2):
+            raise ValueError(f"KPI {r['name']}: ratio needs [numerator_kpi, denominator_kpi]")
+        if "threshold" in r:
+            _op(r["name"], (r["threshold"] or {}).get("op", ">"))
+        for ref in refs:
+            if ref not in names:
+                raise ValueError(f"KPI {r['name']}: references unknown KPI '{ref}'")
+    return base, derived
+
+
+def _definition_rows(requests: List[Dict[str, Any]]) -> List[list]:
+    rows = []
+    for i, req in enumerate(requests):
+        agg = (req.get("agg") or "sum").lower()
+        if agg not in AGGREGATES:
+            raise ValueError(f"KPI {req.get('name')}: unknown agg '{agg}' (expected one of {', '.join(AGGREGATES)})")
+        if agg == "wmean" and not req.get("weight"):
+            raise ValueError(f"KPI {req.get('name')}: agg 'wmean' needs a 'weight' symbol")
+        if "product" in req:
+            factors = req["product"]
+            if not isinstance(factors, list) or len(factors) != 2:
+                raise ValueError(f"KPI {req.get('name')}: product needs two symbols, e.g. [Benefit, x]")
+            (sym, field), (sym2, field2) = _term(factors[0]), _term(factors[1])
+        elif req.get("symbol"):
+            (sym, field), (sym2, field2) = _term(req["symbol"]), (None, None)
+        else:
+            raise ValueError(f"KPI {req.get('name')}: needs 'symbol', 'product', 'ratio' or 'threshold'")
+        weight, weight_field = _term(req.get("weight"))
+        vop, vval = None, None
+        if req.get("where_value"):
+            vop = _op(req["name"], req["where_value"].get("op", ">"))
+            vval = float(req["where_value"]["value"])
+        where = req.get("where") or {}
+        filters = []
+        for k in KEY_COLUMNS:  # filters on other columns are ignored
+            v = where.get(k)
+            filters.append(None if v is None else [str(x) for x in (v if isinstance(v, list) else [v])])
+        rows.append([i, req["name"], sym, field, sym2, field2, agg, weight, weight_field, vop, vval, *filters])
+    return rows
+
+
+def _kpi_sql(values: str, marginals: Optional[str]) -> str:
+    match = " AND ".join(f"(d.f_{k} IS NULL OR list_contains(d.f_{k}, v.{k}))" for k in KEY_COLUMNS)
+    cols = ", ".join(KEY_COLUMNS)
+    u = (f"SELECT symbol, 'value' AS field, {cols}, value FROM {values} "
+         "WHERE symbol IN (SELECT symbol FROM refs WHERE field = 'value')")
+    if marginals:
+        u += (f" UNION ALL SELECT symbol, 'm' AS field, {cols}, value FROM {marginals} "
+              "WHERE symbol IN (SELECT symbol FROM refs WHERE field = 'm')")
+    on = lambda t: " AND ".join(f"{t}.{k} IS NOT DISTINCT FROM v.{k}" for k in KEY_COLUMNS)  # noqa: E731
+    rank = " + ".join(f"({k} IS NOT NULL)::INTEGER" for k in KEY_COLUMNS)
+    shared = lambda t: ", ".join(f"CASE WHEN d.shared >= {n} THEN {t}.{k} END AS {k}"  # noqa: E731
+                                 for n, k in enumerate(KEY_COLUMNS, 1))
+    joined = " AND ".join(f"v2.{k} IS NOT DISTINCT FROM CASE WHEN d.shared >= {n} THEN v.{k} END"
+                          for n, k in enumerate(KEY_COLUMNS, 1))
+    checks = " ".join(f"WHEN '{op}' THEN value {op} vval" for op in sorted(set(_OPS.values())))
+    return (
+        "WITH refs AS (SELECT symbol, field FROM kpi_defs UNION SELECT symbol2, field2 FROM kpi_defs "
+        "WHERE symbol2 IS NOT NULL UNION SELECT weight, weight_field FROM kpi_defs WHERE weight IS NOT NULL), "
+        f"u AS ({u}), "
+        f"dims AS (SELECT symbol, field, max({rank}) AS dim FROM u GROUP BY symbol, field), "
+        # a product joins on the leading keys both operands have (the lower dimension)
+        "dd AS (SELECT d.*, least(a.dim, b.dim) AS shared FROM kpi_defs d "
+        "LEFT JOIN dims a ON a.symbol = d.symbol AND a.field = d.field "
+        "LEFT JOIN dims b ON b.symbol = d.symbol2 AND b.field = d.field2), "
+        f"p AS (SELECT d.kpi_idx, {shared('u')}, u.value FROM dd d JOIN u ON u.symbol = d.symbol2 AND u.field = d.field2), "
+        "w AS (SELECT * FROM u WHERE (symbol, field) IN (SELECT (weight, weight_field) FROM kpi_defs)), "
+        "m AS (SELECT d.kpi_idx, d.vop, d.vval, "
+        "CASE WHEN d.symbol2 IS NULL THEN v.value ELSE v.value * v2.value END AS value, w.value AS weight "
+        f"FROM dd d JOIN u v ON v.symbol = d.symbol AND v.field = d.field AND {match} "
+        f"LEFT JOIN p v2 ON v2.kpi_idx = d.kpi_idx AND {joined} "
+        f"LEFT JOIN w ON w.symbol = d.weight AND w.field = d.weight_field AND {on('w')} "
+        "WHERE d.symbol2 IS NULL OR v2.kpi_idx IS NOT NULL), "
+        f"f AS (SELECT * FROM m WHERE vop IS NULL OR CASE vop {checks} END), "
+        "g AS (SELECT kpi_idx, sum(value) AS s, avg(value) AS a, min(value) AS lo, max(value) AS hi, "
+        "count(value) AS n, sum(value * weight) / nullif(sum(weight) FILTER (WHERE value IS NOT NULL), 0) AS wm "
+        "FROM f GROUP BY kpi_idx) "
+        "SELECT d.name, CASE d.agg WHEN 'sum' THEN g.s WHEN 'mean' THEN g.a WHEN 'min' THEN g.lo "
+        "WHEN 'max' THEN g.hi WHEN 'count' THEN coalesce(g.n, 0) ELSE g.wm END AS value "
+        "FROM kpi_defs d LEFT JOIN g USING (kpi_idx) ORDER BY d.kpi_idx"
+    )
+
+
+def _compile(requests: List[Dict[str, Any]]) -> Tuple[List[list], List[str], List[str]]:
+    """(definition rows, symbols read for values, symbols read for marginals)."""
+    rows = _definition_rows(requests)
+    refs = {(r[2], r[3]) for r in rows} | {(r[4], r[5]) for r in rows} | {(r[7], r[8]) for r in rows}
+    values = sorted(sym for sym, field in refs if sym and field == "value")
+    marginals = sorted(sym for sym, field in refs if sym and field == "m")
+    return rows, values, marginals
+
+
+def _run_kpis(run_dir: Union[str, Path], requests: List[Dict[str, Any]], compiled: Tuple[List[list], List[str], List[str]]) -> pd.DataFrame:
+    rows, value_symbols, marginal_symbols = compiled
+    con = _connect()
+    try:
+        try:
+            values = attach_run(con, run_dir, "run", value_symbols)
+            marginals = attach_marginals(con, run_dir, "run", marginal_symbols) if marginal_symbols else None
+        except FileNotFoundError:
+            return pd.DataFrame({"name": [r["name"] for r in requests], "value": [None] * len(requests)})
+        con.execute(_DEFS_DDL)
+        con.executemany(f"INSERT INTO kpi_defs VALUES ({', '.join('?' for _ in rows[0])})", rows)
+        df = con.execute(_kpi_sql(values, marginals)).fetchdf()
+    finally:
+        con.close()
+    df["value"] = df["value"].astype(object).where(df["value"].notna(), None)
+    return df
+
+
+def _apply_derived(frame: pd.DataFrame, derived: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Add derived KPI columns to a run x KPI frame (vectorized over runs, dependency order)."""
+    pending = list(derived)
+    while pending:
+        ready = [r for r in pending
+                 if all(ref in frame.columns for ref in (r["ratio"] if "ratio" in r else [r["threshold"]["kpi"]]))]
+        if not ready:
+            raise ValueError(f"Circular derived KPIs: {', '.join(r['name'] for r in pending)}")
+        for r in ready:
+            if "ratio" in r:
+                num = pd.to_numeric(frame[r["ratio"][0]], errors="coerce")
+                den = pd.to_numeric(frame[r["ratio"][1]], errors="coerce")
+                frame[r["name"]] = num / den.where(den != 0)
+            else:
+                t = r["threshold"]
+                col = pd.to_numeric(frame[t["kpi"]], errors="coerce")
+                flag = _compare(col, t.get("op", ">"), float(t["value"]))
+                frame[r["name"]] = flag.astype(float).where(col.notna())
+            pending.remove(r)
+    return frame
+
+
+def _compare(col: pd.Series, op: str, value: float) -> pd.Series:
+    return {">": col.gt, ">=": col.ge, "<": col.lt, "<=": col.le, "==": col.eq, "!=": col.ne}[op](value)
+
+
+def extract_kpis(run_dir: Union[str, Path], requests: Union[List[Dict[str, Any]], Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Compute KPI values for a run in a single query.
+
+    Args:
+        run_dir: Run directory (results.duckdb, symbol_values.parquet or raw.gdx)
+        requests: KPI request list, or a KPI YAML document with a 'kpis' list
+
+    Returns:
+        DataFrame with columns name, value (one row per request, in order; value is None
+        when no record matches, except for count which is 0)
+    """
+    requests = normalize_kpis(requests)
+    if not requests:
+        return pd.DataFrame(columns=["name", "value"])
+    base, derived = _split(requests)
+    df = _run_kpis(run_dir, base, _compile(base)) if base else pd.DataFrame(columns=["name", "value"])
+    if not derived:
+        return df
+    wide = _apply_derived(pd.DataFrame([df["value"].tolist()], columns=df["name"].tolist()), derived)
+    values = [wide[r["name"]].iloc[0] for r in requests]
+    return pd.DataFrame({"name": [r["name"] for r in requests],
+                         "value": pd.Series([None if pd.isna(v) else v for v in values], dtype=object)})
+
+
+def extract_kpis_many(
+    requests: Union[List[Dict[str, Any]], Dict[str, Any]],
+    run_dirs: Optional[Sequence[Union[str, Path]]] = None,
+    runs_root: Optional[Union[str, Path]] = None,
+    max_workers: Optional[int] = None,
+    cache: bool = True,
+    **filters: Any,
+) -> pd.DataFrame:
+    """
+    Compute the run x KPI matrix for many runs.
+
+    The KPI list is compiled once and the runs are evaluated in parallel threads
+    (DuckDB releases the GIL while scanning each run's results). With cache enabled, values
+    are read from and written to the kpi_values table of the provenance index, keyed by
+    run_id and kpi_definition_hash; an entry is reused until the run's results file is
+    re-ingested or the KPI definition changes, and only missing KPIs are computed.
+
+    Args:
+        requests: KPI request list, or a KPI YAML document with a 'kpis' list
+        run_dirs: Run directories to evaluate
+        runs_root: Provenance index location (default: each run directory's parent); when
+            run_dirs is not given, runs are selected from this index with the query_runs
+            filters (scenario_id, model_hash, since, ...)
+        max_workers: Thread count (default: ThreadPoolExecutor's default)
+        cache: Use the KPI value cache
+        **filters: query_runs filters
+
+    Returns:
+        DataFrame with a run column (folder name), a run_dir column and one column per KPI,
+        one row per run in input (or index) order
+    """
+    requests = normalize_kpis(requests)
+    names = [r["name"] for r in requests]
+    requests, derived = _split(requests)
+    if run_dirs is None:
+        if runs_root is None:
+            raise ValueError("Pass run_dirs or a runs_root to select runs from the index")
+        from .run_index import query_runs
+        run_dirs = [r["run_dir"] for r in query_runs(runs_root, **filters)]
+    run_dirs = [Path(r) for r in run_dirs]
+    if not run_dirs:
+        return pd.DataFrame(columns=["run", "run_dir", *names])
+    base = pd.DataFrame({"run": [r.name for r in run_dirs], "run_dir": [str(r) for r in run_dirs]})
+    if not names:
+        return base
+    if requests:
+        _compile(requests)  # validate once before any run is read
+    frame = _apply_derived(_base_matrix(requests, run_dirs, runs_root, max_workers, cache), derived)
+    return pd.concat([base, frame[names]], axis=1)
+
+
+def _base_matrix(
+    requests: List[Dict[str, Any]],
+    run_dirs: List[Path],
+    runs_root: Optional[Union[str, Path]],
+    max_workers: Optional[int],
+    cache: bool,
+) -> pd.DataFrame:
+    """Run x KPI values for symbol-based KPIs, served from the KPI cache where valid."""
+    names = [r["name"] for r in requests]
+    hashes = [kpi_definition_hash(r) for r in requests]
+    values: List[List[Any]] = [[None] * len(requests) for _ in run_dirs]
+    todo: List[Tuple[int, List[int]]] = [(i, list(range(len(requests)))) for i in range(len(run_dirs))]
+    roots = [Path(runs_root) if runs_root is not None else d.parent for d in run_dirs]
+    if cache:
+        run_ids = [_run_id(d) for d in run_dirs]
+        sigs = [results_signature(d) for d in run_dirs]
+        by_root = defaultdict(list)
+        for i, root in enumerate(roots):
+            by_root[root].append(i)
+        todo = []
+        for root, idxs in by_root.items():
+            cached = get_kpi_values(root, sorted(set(hashes)))
+            for i in idxs:
+                missing = []
+                for j, h in enumerate(hashes):
+                    hit = cached.get((run_ids[i], h))
+                    if hit is not None and sigs[i] is not None and hit[1] == sigs[i]:
+                        values[i][j] = hit[0]
+                    else:
+                        missing.append(j)
+                if missing:
+                    todo.append((i, missing))
+
+    def _evaluate(item: Tuple[int, List[int]]) -> List[Any]:
+        i, missing = item
+        sub = [requests[j] for j in missing]
+        return _run_kpis(run_dirs[i], sub, _compile(sub))["value"].tolist()
+
+    todo = [item for item in todo if item[1]]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        computed = list(pool.map(_evaluate, todo))
+
+    new_rows = defaultdict(list)
+    for (i, missing), vals in zip(todo, computed):
+        for j, v in zip(missing, vals):
+            values[i][j] = v
+            if cache and sigs[i] is not None:
+                new_rows[roots[i]].append((run_ids[i], hashes[j], names[j], None if v is None else float(v), sigs[i]))
+    for root, rows in new_rows.items():
+        try:
+            put_kpi_values(root, rows)
+        except Exception as e:  # the cache is an optimisation; never fail extraction over it
+            print(f"Warning: could not update KPI cache: {e}")
+    return pd.DataFrame(values, columns=names)
@@ -0,0 +1,232 @@
+"""
+Streaming parser for GAMS listing (.lst) files.
+
+Extracts model statistics, generation time, solve summary (solver/model status, objective,
+resource usage, iterations) for every solve, plus compilation/execution times and error counts.
+parse_compile_errors turns the $-markers of the compilation echo into structured diagnostics.
+The file is read line by line, so large listings are parsed without loading them into memory.
+"""
+from __future__ import annotations
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+_TIME_RE = re.compile(r"^(COMPILATION|GENERATION|EXECUTION) TIME\s*=\s*([0-9.]+) SECONDS\s+(\d+) MB")
+_STATS_HEADER = "MODEL STATISTICS"
+_SUMMARY_HEADER = "S O L V E      S U M M A R Y"
+_STAT_PAIR_RE = re.compile(r"([A-Z][A-Z\-]*(?: [A-Z\-]+)*)\s+([0-9]+)")
+_SUMMARY_LINE_RES = (
+    (re.compile(r"^\s+MODEL\s+(\S+)\s+OBJECTIVE\s+(\S+)"), ("model", "objective_var")),
+    (re.compile(r"^\s+TYPE\s+(\S+)\s+DIRECTION\s+(\S+)"), ("model_type", "direction")),
+    (re.compile(r"^\s+SOLVER\s+(\S+)\s+FROM LINE\s+(\d+)"), ("solver", "from_line")),
+)
+_STATUS_RE = re.compile(r"^\*\*\*\* (SOLVER|MODEL) STATUS\s+(\d+)\s+(.*?)\s*$")
+_OBJECTIVE_RE = re.compile(r"^\*\*\*\* OBJECTIVE VALUE\s+(\S+)")
+_RESOURCE_RE = re.compile(r"^\s*RESOURCE USAGE, LIMIT\s+([0-9.]+)\s+([0-9.]+)")
+_ITERATION_RE = re.compile(r"^\s*ITERATION COUNT, LIMIT\s+(\d+)\s+(\d+)")
+_ERRORS_RE = re.compile(r"^\*\*\*\* (\d+) ERROR\(S\)\s+(\d+) WARNING\(S\)")
+
+_ECHO_RE = re.compile(r"^(\s*(\d+)  )(.*)$")
+_MARKER_RE = re.compile(r"^\*\*\*\*\s+\$")
+_MARKER_CODE_RE = re.compile(r"\$(\d+(?:,\d+)*)")
+_ERROR_LINE_RE = re.compile(r"^\*\*\*\* LINE\s+(\d+)\s+(INPUT|INCLUDE|BATINCLUDE|LIBINCLUDE|SYSINCLUDE)\s+(.*?)\s*$")
+_INLINE_MSG_RE = re.compile(r"^\*\*\*\*\s+(\d+)\s+(\S.*?)\s*$")
+_MESSAGE_RE = re.compile(r"^\s*(\d+)\s+(\S.*?)\s*$")
+
+# Fields of a compile diagnostic
+COMPILE_ERROR_FIELDS = ("code", "message", "line", "column", "file", "listing_line", "source")
+
+# Columns of the per-solve record, in catalog order
+SOLVE_STAT_FIELDS = (
+    "model", "model_type", "solver", "direction", "objective_var", "from_line",
+    "blocks_of_equations", "single_equations", "blocks_of_variables", "single_variables",
+    "non_zero_elements", "discrete_variables", "generation_s", "generation_mb",
+    "solver_status", "solver_status_text", "model_status", "model_status_text",
+    "objective_value", "resource_usage_s", "resource_limit_s", "iterations", "iteration_limit",
+)
+
+
+def _to_float(text: str) -> Optional[float]:
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _new_solve() -> Dict[str, Any]:
+    return {field: None for field in SOLVE_STAT_FIELDS}
+
+
+def parse_listing(lst_path: Union[str, Path, None]) -> Dict[str, Any]:
+    """
+    Parse a GAMS listing file into structured solve statistics.
+
+    Args:
+        lst_path: Path to the .lst file
+
+    Returns:
+        Dictionary with compile_s, execution_s, memory_mb, errors, warnings and
+        solves (one record per solve with the fields in SOLVE_STAT_FIELDS).
+        Missing files give an empty result with no solves.
+    """
+    result: Dict[str, Any] = {"compile_s": None, "execution_s": None, "memory_mb": None,
+                              "errors": 0, "warnings": 0, "solves": []}
+    if not lst_path or not Path(lst_path).exists():
+        return result
+    solves: List[Dict[str, Any]] = result["solves"]
+    current: Optional[Dict[str, Any]] = None
+    mode = None  # "stats" | "summary" | None
+    with open(lst_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped == _STATS_HEADER:
+                current = _new_solve(); solves.append(current); mode = "stats"
+                continue
+            if stripped == _SUMMARY_HEADER:
+                if current is None or current["solver_status"] is not None or current["resource_usage_s"] is not None:
+                    current = _new_solve(); solves.append(current)
+                mode = "summary"
+                continue
+            m = _TIME_RE.match(line)
+            if m:
+                kind, seconds, mb = m.group(1), float(m.group(2)), int(m.group(3))
+                if kind == "GENERATION":
+                    if current is None or current["generation_s"] is not None:
+                        current = _new_solve(); solves.append(current)
+                    # the solve summary of this model follows its generation time
+                    current["generation_s"] = seconds; current["generation_mb"] = mb; mode = "summary"
+                elif kind == "COMPILATION":
+                    result["compile_s"] = seconds
+                elif kind == "EXECUTION":
+                    result["execution_s"] = seconds
+                result["memory_mb"] = max(result["memory_mb"] or 0, mb)
+                continue
+            m = _ERRORS_RE.match(line)
+            if m:
+                result["errors"] += int(m.group(1)); result["warnings"] += int(m.group(2))
+                continue
+            if mode == "stats":
+                for name, value in _STAT_PAIR_RE.findall(line):
+                    key = name.lower().replace(" ", "_").replace("-", "_")
+                    current[key] = int(value)
+            elif mode == "summary":
+                _parse_summary_line(line, current)
+    return result
+
+
+def parse_compile_errors(lst_path: Union[str, Path, None]) -> List[Dict[str, Any]]:
+    """
+    Structured compile errors of a GAMS listing.
+
+    Each $-marker under an echoed source line becomes one diagnostic with the fields in
+    COMPILE_ERROR_FIELDS: error code, message (from the "Error Messages" section or the
+    inline form written with errmsg=1), line and column, the file when the listing names it
+    ("**** LINE n INCLUDE file", else None for the main file), the echo line number and the
+    echoed source text.
+
+    Returns:
+        Diagnostics in listing order; empty for a clean or missing listing
+    """
+    diags: List[Dict[str, Any]] = []
+    if not lst_path or not Path(lst_path).exists():
+        return diags
+    messages: Dict[int, str] = {}
+    echo = None  # (prefix width, listing line number, source text)
+    pending: List[Dict[str, Any]] = []  # diagnostics of the last marker block
+    in_messages, last_code = False, None
+    with open(lst_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if in_messages:
+                if _ERRORS_RE.match(line):
+                    in_messages = False
+                    continue
+                m = _MESSAGE_RE.match(line)
+                if m and not line.startswith(" " * 6):
+                    last_code = int(m.group(1)); messages[last_code] = m.group(2)
+                elif line.strip() and last_code is not None:
+                    messages[last_code] += " " + line.strip()
+                continue
+            if line.strip() == "Error Messages":
+                in_messages, last_code = True, None
+                continue
+            if _MARKER_RE.match(line):
+                if echo is None:
+                    continue
+                width, number, source = echo
+                for m in _MARKER_CODE_RE.finditer(line):
+                    for code in m.group(1).split(","):
+                        diag = {field: None for field in COMPILE_ERROR_FIELDS}
+                        diag.update(code=int(code), line=number, column=max(1, m.start() - width + 1),
+                                    listing_line=number, source=source)
+                        diags.append(diag); pending.append(diag)
+                continue
+            m = _ERROR_LINE_RE.match(line)
+            if m:
+                for diag in pending:
+                    diag["line"] = int(m.group(1))
+                    diag["file"] = None if m.group(2) == "INPUT" else m.group(3)
+                continue
+            m = _INLINE_MSG_RE.match(line)
+            if m and not _ERRORS_RE.match(line):
+                messages.setdefault(int(m.group(1)), m.group(2))
+                continue
+            m = _ECHO_RE.match(line)
+            if m:
+                echo = (len(m.group(1)), int(m.group(2)), m.group(3))
+                pending = []
+    for diag in diags:
+        diag["message"] = messages.get(diag["code"])
+    return diags
+
+
+def _parse_summary_line(line: str, current: Dict[str, Any]) -> None:
+    for regex, (first, second) in _SUMMARY_LINE_RES:
+        m = regex.match(line)
+        if m:
+            current[first] = m.group(1)
+            current[second] = int(m.group(2)) if second == "from_line" else m.group(2)
+            return
+    m = _STATUS_RE.match(line)
+    if m:
+        prefix = m.group(1).lower()
+        current[f"{prefix}_status"] = int(m.group(2)); current[f"{prefix}_status_text"] = m.group(3)
+        return
+    m = _OBJECTIVE_RE.match(line)
+    if m:
+        current["objective_value"] = _to_float(m.group(1))
+        return
+    m = _RESOURCE_RE.match(line)
+    if m:
+        current["resource_usage_s"] = float(m.group(1)); current["resource_limit_s"] = float(m.group(2))
+        return
+    m = _ITERATION_RE.match(line)
+    if m:
+        current["iterations"] = int(m.group(1)); current["iteration_limit"] = int(m.group(2))
+
+
+def solve_times(stats: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Collapse parsed listing stats into GAMS-reported phase times.
+
+    Returns any of "compile", "generation", "solve" and "execution" seconds;
+    generation and solver resource usage are summed over all solves.
+    """
+    out: Dict[str, float] = {}
+    if stats.get("compile_s") is not None:
+        out["compile"] = stats["compile_s"]
+    generation = [s["generation_s"] for s in stats.get("solves", []) if s.get("generation_s") is not None]
+    if generation:
+        out["generation"] = sum(generation)
+    solve = [s["resource_usage_s"] for s in stats.get("solves", []) if s.get("resource_usage_s") is not None]
+    if solve:
+        out["solve"] = sum(solve)
+    if stats.get("execution_s") is not None:
+        out["execution"] = stats["execution_s"]
+    return out
+
+
+def find_listing(run_dir: Union[str, Path]) -> Optional[Path]:
+    """Newest .lst file in a run directory, if any."""
+    candidates = sorted(Path(run_dir).glob("*.lst"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return candidates[0] if candidates else None
@@ -13,6 +13,7 @@ import json
 import os
 import shutil
 import tempfile
+import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -25,7 +26,12 @@ from .gams_api_wrapper_merg import (
     GamsApiError,
     options_to_cli_args,
 )
-from .provenance import build_run_meta, write_run_json
+from .provenance import build_run_meta, compute_model_manifest, write_run_json
+from .listing_parser import parse_listing, solve_times
+from .timing import PhaseTimer
+from .warm_start import (
+    edit_vector, find_warm_start, inject_loadpoint, loadpoint_symbols, source_run, warm_start_record,
+)
 
 # Scenario support is optional; import if present
 try:
@@ -115,8 +121,25 @@ def run_gams_v49(
     scenario_id: Optional[str] = None,
     patch_path: Optional[str] = None,
     system_directory: Optional[str] = None,
+    scenario: Optional[Any] = None,
+    warm_start: Optional[str] = None,
 ) -> Path:
-    """Primary runner. Applies scenario (if provided) in temp workspace, then runs GAMS."""
+    """Primary runner. Applies scenario (if provided) in temp workspace, then runs GAMS.
+
+    ``scenario`` takes an in-memory scenario_merg.Scenario (e.g. generated by core.sweep)
+    instead of a ``scenario_yaml`` path; its sweep point, if any, is recorded in run.json.
+
+    ``warm_start`` is a solved run directory, or "auto" for the run of the same model under
+    runs/ whose scenario edits are closest; its raw.gdx is loaded with execute_loadpoint
+    before the first solve and the source and iteration savings go to run.json (warm_start).
+
+    The symbols a scenario edits and those they can impact (symbol_deps) go to run.json
+    under ``impact``; compare checks differences against them and flags symbols that change
+    outside the impact.
+
+    Phase timings (copy, scenario, patch_build, gams, collect, hashing) and GAMS-reported
+    listing times are written to run.json under ``timings``.
+    """
     work_dir_p = Path(work_dir).resolve()
     if not work_dir_p.exists():
         raise FileNotFoundError(f"Work dir not found: {work_dir_p}")
@@ -135,43 +158,83 @@ def run_gams_v49(
     run_stamp = datetime.now().strftime("run_%Y%m%dT%H%M%S")
     out_dir = Path("runs") / run_stamp
 
+    timer = PhaseTimer(run_stamp)
     try:
-        _copy_tree(work_dir_p, td_path)
+        with timer.phase("copy"):
+            _copy_tree(work_dir_p, td_path)
         local_main = td_path / main_name
         if not local_main.exists():
             raise FileNotFoundError(f"Main file not found in temp copy: {local_main}")
 
         # Optional scenario application
         scen_info = None
-        if scenario_yaml:
+        if scenario_yaml or scenario is not None:
             if apply_scenario_to_temp_workspace is None:
                 raise RuntimeError("Scenario support not available (scenario_merg.py missing).")
-            scen_info = apply_scenario_to_temp_workspace(td_path, work_dir_p, main_name, scenario_yaml)
+            t0 = time.perf_counter()
+            scen_info = apply_scenario_to_temp_workspace(td_path, work_dir_p, main_name, scenario if scenario is not None else scenario_yaml)
+            patch_s = (scen_info.get("timings") or {}).get("patch_build", 0.0)
+            timer.add("patch_build", patch_s)
+            timer.add("scenario", time.perf_counter() - t0 - patch_s)
+        vector = edit_vector(scen_info["edits"]) if scen_info and scen_info.get("edits") else None
+
+        warm, injected, manifest = None, False, None
+        if warm_start:
+            with timer.phase("warm_start"):
+                if warm_start == "auto":
+                    manifest = compute_model_manifest(str(work_dir_p))  # reused for run.json
+                    warm = find_warm_start(vector or {}, out_dir.parent, model_hash=manifest["hash"])
+                else:
+                    warm = source_run(warm_start, vector)
+                if warm:
+                    symbols = loadpoint_symbols(work_dir_p, main_name, warm["run_dir"])
+                    injected = inject_loadpoint(td_path, main_name, Path(warm["run_dir"]) / "raw.gdx", symbols)
 
         # Run via Control API; fallback to subprocess on compat issues
-        try:
-            _run_job_api(td_path, main_name, options)
-        except Exception as e:
-            msg = str(e).lower()
-            if any(k in msg for k in ("memoryview", "buffer", "compatibility")):
-                _run_job_subprocess(td_path, main_name, options)
-            else:
-                raise
+        with timer.phase("gams"):
+            try:
+                _run_job_api(td_path, main_name, options)
+            except Exception as e:
+                msg = str(e).lower()
+                if any(k in msg for k in ("memoryview", "buffer", "compatibility")):
+                    _run_job_subprocess(td_path, main_name, options)
+                else:
+                    raise
 
         # Collect artifacts
-        copied = _collect_artifacts(td_path, out_dir, gdx_out)
+        with timer.phase("collect"):
+            copied = _collect_artifacts(td_path, out_dir, gdx_out)
         if not copied["gdx"]:
             raise RuntimeError(f"Expected GDX not produced: {td_path / gdx_out}")
+        solve_stats = parse_listing(copied["lst"])
+        for name, seconds in solve_times(solve_stats).items():
+            timer.add(name, seconds, source="listing")
 
         # Provenance
-        meta = build_run_meta(
-            work_dir=str(work_dir_p),
-            main_file=main_name,
-            options=options or {},
-            scenario_id=scenario_id or (scen_info or {}).get("scenario_id"),
-            patch_path=patch_path or (str(td_path / "patch.gdx") if (td_path / "patch.gdx").exists() else None),
-            gams_version=None,
-        )
+        with timer.phase("hashing"):
+            meta = build_run_meta(
+                work_dir=str(work_dir_p),
+                main_file=main_name,
+                options=options or {},
+                scenario_id=scenario_id or (scen_info or {}).get("scenario_id"),
+                patch_path=patch_path or (str(td_path / "patch.gdx") if (td_path / "patch.gdx").exists() else None),
+                gams_version=None,
+                patch_hash=None if patch_path else (scen_info or {}).get("patch_hash"),
+                manifest=manifest,
+            )
+        if scen_info and scen_info.get("patch_cache"):
+            meta["patch_cache"] = scen_info["patch_cache"]
+        meta["timings"] = {**timer.as_dict(), **(meta.get("timings") or {})}
+        meta["solve_stats"] = solve_stats
+        if ((scen_info or {}).get("meta") or {}).get("sweep"):
+            meta["sweep"] = scen_info["meta"]["sweep"]
+        if vector is not None:
+            meta["edit_vector"] = vector
+        if warm:
+            meta["warm_start"] = warm_start_record(warm, meta, injected)
+        impact = _scenario_impact(work_dir_p, main_name, scen_info)
+        if impact is not None:
+            meta["impact"] = impact
         write_run_json(out_dir, meta)
 
         # Debug breadcrumbs
@@ -211,6 +274,8 @@ def run_gams(
     scenario_yaml: Optional[str] = None,
     scenario_id: Optional[str] = None,
     patch_path: Optional[str] = None,
+    scenario: Optional[Any] = None,
+    warm_start: Optional[str] = None,
 ) -> Path:
     """Thin wrapper for compatibility; forwards to run_gams_v49 with scenario support."""
     return run_gams_v49(
@@ -222,6 +287,8 @@ def run_gams(
         scenario_yaml=scenario_yaml,
         scenario_id=scenario_id,
         patch_path=patch_path,
+        scenario=scenario,
+        warm_start=warm_start,
     )
 
 
@@ -233,6 +300,17 @@ def get_run_log_txt(run_dir: str | Path) -> str:
     return lst_files[0].read_text(encoding="utf-8", errors="ignore")
 
 
+def _scenario_impact(work_dir: Path, main_name: str, scen_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Edited and impacted symbols of the applied scenario; nothing edited without one."""
+    if not scen_info:
+        return {"changed": [], "impacted": []}
+    try:
+        from .symbol_deps import dependency_graph, scenario_impact
+        return scenario_impact(dependency_graph(work_dir, main_name), scen_info.get("edits") or {})
+    except Exception:
+        return None
+
+
 def validate_gams_setup() -> bool:
     try:
         return validate_gams_api()
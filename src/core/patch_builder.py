@@ -1,7 +1,28 @@
+"""
+Build patch.gdx files from scenario edits.
+
+Parameter tables (CSV, gzipped CSV or Parquet) are read column-wise: key columns become
+string categoricals and the value column float64, and the whole frame is passed to
+setRecords. Large CSVs are read in chunks so the raw text never has to fit in memory at
+once. Domains come from the scenario ('domain' on a parameter or set edit) or from the
+symbol index; without either the relaxed universe domain '*' is used.
+"""
 from __future__ import annotations
-import pandas as pd
+import logging
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .patch_cache import cached_patch, patch_key
+from .provenance import hash_file
+
+logger = logging.getLogger(__name__)
+
+CSV_CHUNK_ROWS = 1_000_000
+TABLE_SUFFIXES = (".csv", ".csv.gz", ".parquet", ".pq")
 
 def _import_transfer():
     """Import GAMS Transfer API with error handling."""
@@ -11,105 +32,142 @@ def _import_transfer():
     except Exception as e:
         raise ImportError("GAMS Transfer API not available. Ensure a recent GAMS is installed.") from e
 
-def build_patch_gdx(edits: Dict[str, Any], scenario_dir: Path, output_path: str | Path) -> Path:
+def _is_table(value: Any) -> bool:
+    return isinstance(value, str) and value.lower().endswith(TABLE_SUFFIXES)
+
+def _split_columns(columns: Sequence[str]) -> Tuple[List[str], str]:
+    """(key columns, value column): 'value' if present (ignoring 'text'), else the last column."""
+    columns = list(columns)
+    if "value" in columns:
+        return [c for c in columns if c not in ("value", "text")], "value"
+    return columns[:-1], columns[-1]
+
+def _normalize(df: pd.DataFrame, key_cols: List[str], value_col: str) -> pd.DataFrame:
+    out = pd.DataFrame({c: df[c].astype(str).astype("category") for c in key_cols})
+    out[value_col] = pd.to_numeric(df[value_col], errors="coerce").astype("float64")
+    return out
+
+def read_records(path: Union[str, Path], chunk_rows: int = CSV_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Read a parameter table into records: key columns as string categoricals, then one
+    float64 value column.
+
+    Args:
+        path: .csv, .csv.gz, .parquet or .pq file; the value column is 'value' if present
+            (a 'text' column is dropped), otherwise the last column
+        chunk_rows: CSV rows parsed per chunk
+
+    Returns:
+        DataFrame with the key columns in file order followed by the value column
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Parameter file not found: {path}")
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+        key_cols, value_col = _split_columns(pq.read_schema(path).names)
+        return _normalize(pd.read_parquet(path, columns=key_cols + [value_col]), key_cols, value_col)
+    key_cols, value_col = _split_columns(pd.read_csv(path, nrows=0).columns)
+    reader = pd.read_csv(path, usecols=key_cols + [value_col], dtype={c: str for c in key_cols},
+                         keep_default_na=False, na_values={value_col: ["", "NA", "NaN", "nan"]},
+                         chunksize=chunk_rows)
+    parts = [_normalize(chunk, key_cols, value_col) for chunk in reader]
+    if not parts:
+        return pd.DataFrame({**{c: pd.Categorical([]) for c in key_cols}, value_col: np.array([], dtype="float64")})
+    if len(parts) == 1:
+        return parts[0]
+    out = pd.DataFrame({c: union_categoricals([p[c] for p in parts]) for c in key_cols})
+    out[value_col] = np.concatenate([p[value_col].to_numpy() for p in parts])
+    return out
+
+
+def resolve_domain(name: str, dim: int, edit: Any = None, symbol_index: Optional[Iterable[Dict[str, Any]]] = None) -> List[str]:
+    """
+    Domain of a patched symbol: the edit's 'domain' list, else the 'domain' recorded for the
+    symbol in the symbol index, else '*' for every dimension.
+    """
+    domain = edit.get("domain") if isinstance(edit, dict) else None
+    if domain is None and symbol_index is not None:
+        entry = next((e for e in symbol_index if str(e.get("name", "")).lower() == name.lower() and e.get("domain")), None)
+        domain = entry["domain"] if entry else None
+    if domain is None:
+        return ["*"] * dim
+    domain = [str(d) for d in (domain if isinstance(domain, list) else [domain])]
+    if len(domain) != dim:
+        raise ValueError(f"{name}: domain {domain} has {len(domain)} entries but the data has {dim} key columns")
+    return domain
+
+def needs_declared_domains(edits: Dict[str, Any]) -> bool:
+    """True if a set edit or parameter table of the edits has no 'domain' of its own."""
+    for set_edits in (edits.get("sets") or {}).values():
+        if set_edits.get("add") and set_edits.get("domain") is None:
+            return True
+    for param_data in (edits.get("parameters") or {}).values():
+        source = param_data.get("file") if isinstance(param_data, dict) else param_data
+        if _is_table(source) and not (isinstance(param_data, dict) and param_data.get("domain") is not None):
+            return True
+    return False
+
+def build_patch_gdx(edits: Dict[str, Any], scenario_dir: Path, output_path: str | Path,
+                    symbol_index: Optional[List[Dict[str, Any]]] = None) -> Path:
     """
     Build a patch.gdx file from scenario edits.
     
     Args:
-        edits: Dictionary containing scalars, parameters, and sets edits
-        scenario_dir: Directory where the scenario file is located (for relative CSV paths)
+        edits: Dictionary containing scalars, parameters, and sets edits. A parameter is a
+            number, a table path (CSV/Parquet, relative to scenario_dir) or a mapping
+            {file: <path>, domain: [set names]}; a set edit may also carry a domain
+        scenario_dir: Directory where the scenario file is located (for relative table paths)
         output_path: Path where to write the patch.gdx file
+        symbol_index: Optional symbol index entries providing declared domains
     
     Returns:
-        Path to the created patch.gdx file
+        Path to the created patch.gdx file (served from the patch cache when the same
+        edits, table contents and domains were built before)
     """
+    scenario_dir = Path(scenario_dir)
+    params = edits.get("parameters") or {}
+    sources = [v.get("file") if isinstance(v, dict) else v for v in params.values()]
+    tables = [scenario_dir / src for src in sources if _is_table(src)]
+    for table in tables:
+        if not table.exists():
+            raise FileNotFoundError(f"Parameter file not found: {table}")
+    names = {n.lower() for n in [*params, *(edits.get("sets") or {})]}
+    domains = sorted((str(e["name"]).lower(), e["domain"]) for e in (symbol_index or [])
+                     if e.get("domain") and str(e.get("name", "")).lower() in names)
+    key = patch_key("patch_builder", {k: edits.get(k) for k in ("scalars", "parameters", "sets")}, tables, domains)
+    return cached_patch(key, lambda path: _write_patch(edits, scenario_dir, path, symbol_index), output_path)[0]
+
+def _write_patch(edits: Dict[str, Any], scenario_dir: Path, output_path: Path,
+                 symbol_index: Optional[List[Dict[str, Any]]]) -> None:
     gt = _import_transfer()
-    output_path = Path(output_path)
-    
     database = gt.Container()
-    
-    # First, create any sets that will be needed as domains
-    created_sets = {}
-    
-    # Process sets first so they can be used as domains
-    if "sets" in edits:
-        for set_name, set_edits in edits["sets"].items():
-            if "add" in set_edits and set_edits["add"]:
-                # Create the set
-                gams_set = gt.Set(database, set_name)
-                # Set records as simple list of strings
-                gams_set.setRecords(set_edits["add"])
-                created_sets[set_name] = gams_set
-                print(f"Created set {set_name} with {len(set_edits['add'])} elements")
-    
-    # Process scalars (0-dimensional parameters)
-    if "scalars" in edits:
-        for scalar_name, value in edits["scalars"].items():
-            scalar = gt.Parameter(database, scalar_name)
-            scalar.setRecords([value])
-    
-    # Process parameters (including CSV files)
-    if "parameters" in edits:
-        for param_name, param_data in edits["parameters"].items():
-            if isinstance(param_data, str) and param_data.endswith('.csv'):
-                # Load CSV parameter properly
-                csv_path = scenario_dir / param_data
-                if not csv_path.exists():
-                    raise FileNotFoundError(f"CSV file not found: {csv_path}")
-                
-                df = pd.read_csv(csv_path)
-                
-                # Determine parameter structure
-                if 'value' in df.columns:
-                    # Standard format: key columns + value column
-                    value_col = 'value'
-                    key_cols = [col for col in df.columns if col != 'value' and col != 'text']
-                else:
-                    # Assume last column is value
-                    value_col = df.columns[-1]
-                    key_cols = list(df.columns[:-1])
-                
-                if len(key_cols) == 0:
-                    # Scalar parameter from CSV
-                    param = gt.Parameter(database, param_name)
-                    param.setRecords([df[value_col].iloc[0]])
-                else:
-                    # Multi-dimensional parameter
-                    # For toy model compatibility, create sets with standard names
-                    domains = []
-                    set_names = ['i', 'j', 'k', 'l']  # Standard GAMS set names
-                    
-                    for i, key_col in enumerate(key_cols):
-                        set_name = set_names[i] if i < len(set_names) else f"set{i}"
-                        
-                        if set_name not in created_sets:
-                            # Create set from CSV data
-                            unique_values = df[key_col].unique().tolist()
-                            implicit_set = gt.Set(database, set_name)
-                            implicit_set.setRecords(unique_values)
-                            created_sets[set_name] = implicit_set
-                            print(f"Created set {set_name} with values: {unique_values}")
-                        domains.append(created_sets[set_name])
-                    
-                    # Create parameter with proper domains
-                    param = gt.Parameter(database, param_name, domain=domains)
-                    
-                    # Format data for setRecords - must match domain order
-                    records_data = []
-                    for _, row in df.iterrows():
-                        record = tuple(str(row[col]) for col in key_cols) + (row[value_col],)
-                        records_data.append(record)
-                    
-                    param.setRecords(records_data)
-                    print(f"Created parameter {param_name} with {len(records_data)} records")
-            else:
-                # Direct parameter value (scalar)
-                param = gt.Parameter(database, param_name)
-                param.setRecords([param_data])
-    
-    # Write the patch.gdx
+
+    for set_name, set_edits in (edits.get("sets") or {}).items():
+        if set_edits.get("add"):
+            records = pd.DataFrame({"uni": pd.Categorical([str(e) for e in set_edits["add"]])})
+            domain = resolve_domain(set_name, 1, set_edits, symbol_index)
+            gt.Set(database, set_name, domain=domain, records=records)
+            logger.debug("patch set %s: %d elements", set_name, len(records))
+
+    for scalar_name, value in (edits.get("scalars") or {}).items():
+        gt.Parameter(database, scalar_name, records=float(value))
+
+    for param_name, param_data in (edits.get("parameters") or {}).items():
+        source = param_data.get("file") if isinstance(param_data, dict) else param_data
+        if not _is_table(source):
+            gt.Parameter(database, param_name, records=float(source))
+            continue
+        records = read_records(Path(scenario_dir) / source)
+        key_cols = list(records.columns[:-1])
+        if not key_cols:
+            gt.Parameter(database, param_name, records=float(records.iloc[0, 0]))
+            continue
+        domain = resolve_domain(param_name, len(key_cols), param_data, symbol_index)
+        gt.Parameter(database, param_name, domain=domain, records=records)
+        logger.debug("patch parameter %s: %d records", param_name, len(records))
+
     database.write(str(output_path))
-    return output_path
 
 def get_patch_info(patch_path: Path) -> Dict[str, Any]:
     """
@@ -130,12 +188,10 @@ def get_patch_info(patch_path: Path) -> Dict[str, Any]:
     for symbol_name in database.data.keys():
         symbols.append(symbol_name)
     
-    # Calculate hash of the patch file
-    import hashlib
-    with open(patch_path, 'rb') as f:
-        patch_hash = hashlib.sha256(f.read()).hexdigest()
+    # Calculate hash of the patch file (streamed, same algorithm as run provenance)
+    patch_hash = hash_file(patch_path)
     
     return {
         "symbols": sorted(symbols),
         "hash": patch_hash
-    }
\ No newline at end of file
+    }
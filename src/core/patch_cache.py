@@ -0,0 +1,113 @@
+"""
+Content-addressed cache for patch.gdx files.
+
+A patch is keyed by a canonical hash of the normalized scenario edits, the content hashes
+of any referenced table files and the builder that produced it. A rerun of the same
+scenario hard-links the cached GDX into the temp workspace (copying when linking is not
+possible) and reuses the patch hash stored next to it, so neither the CSV parse, the GDX
+write nor the provenance re-hash is repeated.
+
+Location: PATCH_CACHE_DIR, from GAMS_PATCH_CACHE (env.cache_dir; "off" always rebuilds).
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from .env import cache_dir
+from .provenance import _new_hasher, hash_file
+
+PATCH_CACHE_VERSION = 1  # bump when patch building changes in a way that alters the GDX
+PATCH_CACHE_DIR: Optional[Path] = cache_dir("GAMS_PATCH_CACHE", "patches")
+
+_digests: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """Content hash of a referenced file, memoized per (path, size, mtime) for this process."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    with _digest_lock:
+        if key in _digests:
+            return _digests[key]
+    digest = hash_file(path)
+    with _digest_lock:
+        _digests[key] = digest
+    return digest
+
+
+def patch_key(builder: str, edits: Any, files: Iterable[Union[str, Path]] = (), extra: Any = None) -> str:
+    """
+    Cache key of a patch.
+
+    Args:
+        builder: Name of the code path building the patch (patches of different builders
+            never share entries)
+        edits: Normalized scenario edits (anything JSON-serializable)
+        files: Table files the edits reference; their contents, not paths, enter the key
+        extra: Any other input affecting the patch (e.g. resolved domains)
+    """
+    canon = {
+        "version": PATCH_CACHE_VERSION, "builder": builder, "edits": edits, "extra": extra,
+        "files": sorted(file_digest(f) for f in files),
+    }
+    h = _new_hasher()
+    h.update(json.dumps(canon, sort_keys=True, default=str, separators=(",", ":")).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _place(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:  # cross-device, unsupported filesystem, ...
+        shutil.copy2(src, dest)
+
+
+def cached_patch(
+    key: str,
+    build: Callable[[Path], Any],
+    dest: Union[str, Path],
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> Tuple[Path, str, bool]:
+    """
+    Place the patch for ``key`` at ``dest``, building it with ``build(path)`` on a miss.
+
+    Returns:
+        (dest, patch hash, cache hit). With the cache disabled the patch is built at dest.
+    """
+    dest = Path(dest)
+    root = Path(cache_dir) if cache_dir is not None else PATCH_CACHE_DIR
+    if root is None:
+        build(dest)
+        return dest, hash_file(dest), False
+    entry, sidecar = root / f"{key}.gdx", root / f"{key}.json"
+    hit = entry.exists() and sidecar.exists()
+    if hit:
+        try:
+            patch_hash = json.loads(sidecar.read_text(encoding="utf-8"))["patch_hash"]
+        except Exception:
+            hit = False
+    if not hit:
+        root.mkdir(parents=True, exist_ok=True)
+        tag = f"{os.getpid()}.{threading.get_ident()}"
+        tmp = root / f".{key}.{tag}.gdx"
+        try:
+            build(tmp)
+            patch_hash = hash_file(tmp)
+            tmp_meta = root / f".{key}.{tag}.json"
+            tmp_meta.write_text(json.dumps({"patch_hash": patch_hash, "bytes": tmp.stat().st_size}), encoding="utf-8")
+            os.replace(tmp_meta, sidecar)  # sidecar first: a visible .gdx always has its hash
+            os.replace(tmp, entry)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+    _place(entry, dest)
+    return dest, patch_hash, hit
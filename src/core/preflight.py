@@ -0,0 +1,238 @@
+"""
+Compile-only preflight of a model plus scenario equation includes.
+
+preflight compiles the model with action=c in a lightweight workspace (data files such as GDX
+and CSV hard-linked, sources copied, so compile-time writes never reach the model) and parses compile errors from the listing into
+structured diagnostics (listing_parser.parse_compile_errors). Results and listings are cached
+by the model hash, the include contents and the compile options, so a batch compiles each
+distinct include set once and a rerun compiles nothing. preflight_batch checks a whole batch
+before any run is submitted.
+
+PREFLIGHT_CACHE_DIR (GAMS_PREFLIGHT_CACHE, see env.cache_dir) holds the cache; with the
+variable set to "off" every preflight compiles.
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Union
+
+from .env import cache_dir
+from .listing_parser import parse_compile_errors, parse_listing
+from .patch_cache import _place, file_digest
+from .provenance import _new_hasher, compute_model_manifest
+
+PREFLIGHT_CACHE_VERSION = 1
+PREFLIGHT_CACHE_DIR: Optional[Path] = cache_dir("GAMS_PREFLIGHT_CACHE", "preflight")
+
+# Files GAMS may (over)write during a compile; never placed in the workspace
+_OUTPUT_SUFFIXES = {".lst", ".log", ".lxi", ".lxl", ".ref", ".g00"}
+# Read-only input data, hard-linked rather than copied; anything else ($onecho, $call, ... may
+# rewrite it) is copied so the model folder is never written through a shared inode
+_LINKED_SUFFIXES = {".gdx", ".csv", ".parquet", ".xlsx"}
+
+
+def scenario_includes(scenario: Any, model_dir: Union[str, Path]) -> Dict[str, Path]:
+    """Equation includes of a scenario_merg.Scenario (or scenario YAML path) as {relative path: source}."""
+    if scenario is None:
+        return {}
+    if not hasattr(scenario, "edits"):
+        from .scenario_merg import load_scenario
+        scenario = load_scenario(scenario)
+    return {rel: Path(model_dir) / rel for rel in scenario.edits["equations"]["includes"]}
+
+
+def preflight_key(model_hash: str, main_file: str, includes: Mapping[str, Union[str, Path]],
+                  options: Optional[Dict[str, Any]] = None, extra: Any = None) -> str:
+    """Cache key of a compile: model hash, main file, include contents, options and extra inputs."""
+    canon = {
+        "version": PREFLIGHT_CACHE_VERSION, "model": model_hash, "main": main_file, "extra": extra,
+        "includes": {rel: file_digest(src) for rel, src in sorted(includes.items())},
+        "options": {str(k).lower(): str(v) for k, v in (options or {}).items()},
+    }
+    h = _new_hasher()
+    h.update(json.dumps(canon, sort_keys=True, default=str, separators=(",", ":")).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _default_compile(workspace: Path, main_name: str, options: Dict[str, Any]) -> None:
+    from .model_runner_merg import _run_job_api, _run_job_subprocess
+    try:
+        _run_job_api(workspace, main_name, options)
+    except Exception as e:
+        msg = str(e).lower()
+        if any(k in msg for k in ("memoryview", "buffer", "compatibility")):
+            _run_job_subprocess(workspace, main_name, options)
+        else:
+            raise
+
+
+def _link_model(src: Path, dst: Path, main_name: str) -> None:
+    for p in src.rglob("*"):
+        rel = p.relative_to(src)
+        if rel.parts[0] == "runs" or p.is_dir():
+            continue
+        suffix = p.suffix.lower()
+        if suffix in _OUTPUT_SUFFIXES:
+            continue
+        if suffix in _LINKED_SUFFIXES and str(rel) != main_name:
+            _place(p, dst / rel)
+        else:
+            (dst / rel).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(p, dst / rel)
+
+
+def _compile(work_dir: Path, main_name: str, includes: Mapping[str, Union[str, Path]], options: Dict[str, Any],
+             prepare: Optional[Callable[[Path], Any]], compile_fn: Callable[[Path, str, Dict[str, Any]], Any],
+             listing_copy: Path) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="gams_preflight_") as td:
+        workspace = Path(td)
+        _link_model(work_dir, workspace, main_name)
+        for rel, src in includes.items():
+            src = Path(src)
+            if not src.exists():
+                return {"ok": False, "error": f"Equation include not found: {src}", "diagnostics": [], "compile_s": None}
+            dst = workspace / rel
+            if dst.exists():
+                dst.unlink()  # may be a hard link into the model folder
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(src, dst)
+        if prepare is not None:
+            prepare(workspace)
+        error = None
+        try:
+            compile_fn(workspace, main_name, {**options, "action": "c"})
+        except Exception as e:  # compile errors surface through the listing
+            error = str(e)
+        lst = workspace / (Path(main_name).stem + ".lst")
+        if not lst.exists():
+            found = sorted(workspace.glob("*.lst"), key=lambda p: p.stat().st_mtime, reverse=True)
+            lst = found[0] if found else None
+        if lst is None:
+            return {"ok": False, "error": error or "GAMS produced no listing", "diagnostics": [], "compile_s": None}
+        diagnostics = parse_compile_errors(lst)
+        stats = parse_listing(lst)
+        listing_copy.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(lst, listing_copy)
+        ok = not diagnostics and not stats["errors"] and error is None
+        return {"ok": ok, "error": None if ok else error, "diagnostics": diagnostics,
+                "compile_s": stats["compile_s"], "cacheable": ok or bool(diagnostics)}
+
+
+def preflight(
+    work_dir: Union[str, Path],
+    main_file: str,
+    scenario: Any = None,
+    *,
+    includes: Optional[Mapping[str, Union[str, Path]]] = None,
+    options: Optional[Dict[str, Any]] = None,
+    model_hash: Optional[str] = None,
+    prepare: Optional[Callable[[Path], Any]] = None,
+    extra: Any = None,
+    cache_dir: Optional[Union[str, Path]] = None,
+    compile_fn: Optional[Callable[[Path, str, Dict[str, Any]], Any]] = None,
+    listing_dir: Optional[Union[str, Path]] = None,
+) -> Dict[str, Any]:
+    """
+    Compile the model (action=c) with a scenario's equation includes, or reuse a cached result.
+
+    Args:
+        work_dir: Model folder
+        main_file: Main .gms file
+        scenario: scenario_merg.Scenario or scenario YAML whose equation includes are compiled in
+        includes: {relative path in the workspace: source file}, instead of scenario
+        options: GAMS options of the run (action is forced to "c")
+        model_hash: Precomputed model hash (default: computed from work_dir)
+        prepare: Called with the workspace before compiling (e.g. to inject equation names);
+            pass a matching ``extra`` so differently prepared compiles get separate keys
+        extra: Any other input affecting the compile, added to the cache key
+        cache_dir: Cache folder (default PREFLIGHT_CACHE_DIR; None there disables caching)
+        compile_fn: compile_fn(workspace, main_file, options) running GAMS (default: Control
+            API with gams.exe fallback, as the runner does)
+        listing_dir: Folder to receive the compile listing (<main>.lst), also on a cache hit
+
+    Returns:
+        {"ok", "key", "cached", "model_hash", "includes", "compile_s", "diagnostics", "error",
+        "seconds"}; diagnostics follow listing_parser.COMPILE_ERROR_FIELDS
+    """
+    t0 = time.perf_counter()
+    work_dir = Path(work_dir).resolve()
+    main_name = Path(main_file).name
+    includes = dict(includes) if includes is not None else scenario_includes(scenario, work_dir)
+    model_hash = model_hash or compute_model_manifest(str(work_dir))["hash"]
+    key = preflight_key(model_hash, main_name, includes, options, extra)
+    root = Path(cache_dir) if cache_dir is not None else PREFLIGHT_CACHE_DIR
+    entry = root / f"{key}.json" if root is not None else None
+    listing = root / f"{key}.lst" if root is not None else None
+    if entry is not None and entry.exists():
+        try:
+            result = json.loads(entry.read_text(encoding="utf-8"))
+            if listing_dir is not None and listing.exists():
+                _place(listing, Path(listing_dir) / f"{Path(main_name).stem}.lst")
+            return {**result, "cached": True, "seconds": time.perf_counter() - t0}
+        except Exception:
+            pass
+    tag = f"{os.getpid()}.{threading.get_ident()}"
+    tmp_lst = (root if root is not None else Path(tempfile.gettempdir())) / f".{key}.{tag}.lst"
+    try:
+        result = _compile(work_dir, main_name, includes, dict(options or {}), prepare, compile_fn or _default_compile, tmp_lst)
+        cacheable = result.pop("cacheable", False)
+        result = {"ok": result["ok"], "key": key, "model_hash": model_hash, "includes": sorted(includes),
+                  "compile_s": result["compile_s"], "diagnostics": result["diagnostics"], "error": result["error"]}
+        if listing_dir is not None and tmp_lst.exists():
+            Path(listing_dir).mkdir(parents=True, exist_ok=True)
+            shutil.copy2(tmp_lst, Path(listing_dir) / f"{Path(main_name).stem}.lst")
+        if entry is not None and cacheable:  # failures without diagnostics (GAMS missing, license) are not cached
+            tmp = root / f".{key}.{tag}.json"
+            tmp.write_text(json.dumps(result, indent=2), encoding="utf-8")
+            os.replace(tmp_lst, listing)
+            os.replace(tmp, entry)
+    finally:
+        if tmp_lst.exists():
+            tmp_lst.unlink()
+    return {**result, "cached": False, "seconds": time.perf_counter() - t0}
+
+
+def preflight_batch(
+    work_dir: Union[str, Path],
+    main_file: str,
+    scenarios: Iterable[Any],
+    **kwargs: Any,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Preflight every scenario of a batch, compiling each distinct include set once.
+
+    Args:
+        work_dir: Model folder
+        main_file: Main .gms file
+        scenarios: scenario_merg.Scenario objects or scenario YAML paths
+        **kwargs: Passed on to preflight (options, cache_dir, compile_fn, ...)
+
+    Returns:
+        {scenario ID (or YAML path): preflight result}
+    """
+    work_dir = Path(work_dir).resolve()
+    kwargs.setdefault("model_hash", compute_model_manifest(str(work_dir))["hash"])
+    by_includes: Dict[tuple, Dict[str, Any]] = {}
+    out: Dict[str, Dict[str, Any]] = {}
+    for scen in scenarios:
+        name = scen.id if hasattr(scen, "id") else str(scen)
+        includes = scenario_includes(scen, work_dir)
+        group = tuple(sorted((rel, str(src)) for rel, src in includes.items()))
+        if group not in by_includes:
+            by_includes[group] = preflight(work_dir, main_file, includes=includes, **kwargs)
+        out[name] = by_includes[group]
+    return out
+
+
+def format_diagnostics(result: Dict[str, Any]) -> List[str]:
+    """Human-readable lines for a failed preflight."""
+    lines = [f"{d.get('file') or 'main'}:{d['line']}:{d['column']}: error {d['code']}: {d.get('message') or ''}".rstrip()
+             for d in result.get("diagnostics") or []]
+    if not lines and result.get("error"):
+        lines.append(result["error"])
+    return lines
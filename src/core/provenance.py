@@ -1,31 +1,126 @@
 from __future__ import annotations
-import hashlib, json
+import hashlib, json, os, time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from ulid import ULID  # type: ignore
 
+from .run_index import index_run
+
+# Hash algorithm for model/patch fingerprints: sha256 (default), blake2b, blake2s or blake3 (if installed)
+HASH_ALGORITHM = os.getenv("GAMS_HASH_ALGORITHM", "sha256").lower()
+_CHUNK_SIZE = 1 << 20
+
+def _new_hasher(algorithm: str | None = None):
+    algorithm = (algorithm or HASH_ALGORITHM).lower()
+    if algorithm == "blake3":
+        try:
+            import blake3  # type: ignore
+        except ImportError as e:
+            raise ImportError("Hash algorithm 'blake3' requires the blake3 package (pip install blake3)") from e
+        return blake3.blake3()
+    return hashlib.new(algorithm)
+
 def _sha256_of_bytes(data: bytes) -> str:
-    import hashlib
     h = hashlib.sha256(); h.update(data); return h.hexdigest()
 
+def _hash_file_sized(path: Path, algorithm: str | None = None) -> Tuple[str, int]:
+    """Stream a file through the hasher in fixed-size chunks; returns (hexdigest, bytes read)."""
+    h = _new_hasher(algorithm); buf = bytearray(_CHUNK_SIZE); view = memoryview(buf); total = 0
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n: break
+            h.update(view[:n]); total += n
+    return h.hexdigest(), total
+
+def hash_file(path: str | Path, algorithm: str | None = None) -> str:
+    """Hex digest of a file, read in chunks so memory stays flat for multi-GB GDX files."""
+    return _hash_file_sized(Path(path), algorithm)[0]
+
 def _sha256_of_file(path: Path) -> str:
-    return _sha256_of_bytes(Path(path).read_bytes())
+    return hash_file(path, "sha256")
+
+def _scan_model_dir(path: Path, exclude_dirs: Iterable[str], out: List[Path]) -> Dict[str, Any]:
+    files: Dict[str, Any] = {}; dirs: Dict[str, Dict[str, Any]] = {}
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for e in entries:
+        if e.is_dir():
+            if e.name in exclude_dirs: continue
+            dirs[e.name] = _scan_model_dir(Path(e.path), exclude_dirs, out)
+        else:
+            files[e.name] = Path(e.path); out.append(files[e.name])
+    return {"files": files, "dirs": dirs}
+
+def _fold_model_dir(node: Dict[str, Any], digests: Dict[Path, str], algorithm: str) -> Dict[str, Any]:
+    files = {name: digests[p] for name, p in node["files"].items()}
+    dirs = {name: _fold_model_dir(child, digests, algorithm) for name, child in node["dirs"].items()}
+    h = _new_hasher(algorithm)
+    for name, fh in files.items():
+        h.update(b"f\0"); h.update(name.encode("utf-8")); h.update(b"\0"); h.update(fh.encode("ascii")); h.update(b"\0")
+    for name, child in dirs.items():
+        h.update(b"d\0"); h.update(name.encode("utf-8")); h.update(b"\0"); h.update(child["hash"].encode("ascii")); h.update(b"\0")
+    return {"hash": h.hexdigest(), "files": files, "dirs": dirs}
+
+def compute_model_manifest(root: str | Path, exclude_dirs: Iterable[str] = ("runs",), *, algorithm: str | None = None, max_workers: int | None = None) -> Dict[str, Any]:
+    """Merkle manifest of a model folder.
+
+    Every directory node holds ``{"hash", "files": {name: digest}, "dirs": {name: node}}`` and its
+    hash covers the names and hashes of its children, so the root hash identifies the whole tree and
+    two manifests can be diffed by descending only into subtrees whose hashes differ. Files are hashed
+    in parallel (hashlib releases the GIL); the root also records ``algorithm``, ``file_count`` and
+    ``total_bytes``.
+    """
+    algorithm = (algorithm or HASH_ALGORITHM).lower(); paths: List[Path] = []
+    tree = _scan_model_dir(Path(root), tuple(exclude_dirs), paths)
+    workers = max_workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda p: _hash_file_sized(p, algorithm), paths))
+    manifest = _fold_model_dir(tree, {p: r[0] for p, r in zip(paths, results)}, algorithm)
+    manifest.update({"algorithm": algorithm, "file_count": len(paths), "total_bytes": sum(r[1] for r in results)})
+    return manifest
 
 def compute_model_hash(root: str | Path, exclude_dirs: Iterable[str] = ("runs",)) -> str:
-    root = Path(root); files = []
-    for p in root.rglob("*"):
-        if p.is_dir(): continue
-        if any(part in exclude_dirs for part in p.parts): continue
-        files.append(p)
-    files = sorted(files, key=lambda p: str(p.relative_to(root)))
-    h = hashlib.sha256()
-    for p in files:
-        rel = str(p.relative_to(root)).replace("\\","/")
-        h.update(rel.encode("utf-8")); h.update(b"\0"); h.update(p.read_bytes()); h.update(b"\0")
-    return h.hexdigest()
-
-def build_run_meta(*, work_dir: str, main_file: str, options: Dict[str, str] | None = None, scenario_id: str | None = None, gams_version: str | None = None, patch_path: str | Path | None = None, git_commit: str | None = None) -> Dict[str, str]:
+    """Root hash of :func:`compute_model_manifest`."""
+    return compute_model_manifest(root, exclude_dirs)["hash"]
+
+def _walk_manifest_files(node: Dict[str, Any], prefix: str) -> List[str]:
+    out = [prefix + name for name in node.get("files", {})]
+    for name, child in node.get("dirs", {}).items():
+        out += _walk_manifest_files(child, f"{prefix}{name}/")
+    return out
+
+def _diff_nodes(a: Dict[str, Any], b: Dict[str, Any], prefix: str, out: Dict[str, List[str]]) -> None:
+    if a["hash"] == b["hash"]: return
+    fa, fb = a.get("files", {}), b.get("files", {})
+    for name in sorted(fa.keys() | fb.keys()):
+        if name not in fb: out["removed"].append(prefix + name)
+        elif name not in fa: out["added"].append(prefix + name)
+        elif fa[name] != fb[name]: out["changed"].append(prefix + name)
+    da, db = a.get("dirs", {}), b.get("dirs", {})
+    for name in sorted(da.keys() | db.keys()):
+        sub = f"{prefix}{name}/"
+        if name not in db: out["removed"] += _walk_manifest_files(da[name], sub)
+        elif name not in da: out["added"] += _walk_manifest_files(db[name], sub)
+        else: _diff_nodes(da[name], db[name], sub, out)
+
+def diff_manifests(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Files added, removed and changed going from manifest ``a`` to manifest ``b``.
+
+    Identical subtrees are skipped by hash, so the cost is proportional to what changed.
+    """
+    alg_a, alg_b = a.get("algorithm", "sha256"), b.get("algorithm", "sha256")
+    if alg_a != alg_b:
+        raise ValueError(f"Cannot diff manifests hashed with different algorithms ({alg_a} vs {alg_b})")
+    out: Dict[str, List[str]] = {"added": [], "removed": [], "changed": []}
+    _diff_nodes(a, b, "", out)
+    return out
+
+def build_run_meta(*, work_dir: str, main_file: str, options: Dict[str, str] | None = None, scenario_id: str | None = None, gams_version: str | None = None, patch_path: str | Path | None = None, git_commit: str | None = None, patch_hash: str | None = None, manifest: Dict[str, Any] | None = None) -> Dict[str, str]:
+    """Run metadata with model/patch fingerprints; a known patch_hash (e.g. from the patch cache) skips re-hashing the patch
+    and a model manifest already computed for work_dir (e.g. to pick a warm start) skips re-hashing the model."""
     # Try to create ULID, fallback to UUID if MemoryView error occurs (pandas/numpy compatibility issue)
     try:
         run_id = str(ULID())
@@ -35,19 +130,38 @@ def build_run_meta(*, work_dir: str, main_file: str, options: Dict[str, str] | N
             run_id = str(uuid.uuid4())
         else:
             raise
+    t0 = time.perf_counter()
+    hashed_model = manifest is None
+    manifest = compute_model_manifest(work_dir) if hashed_model else manifest
+    hashed_patch = bool(patch_path) and not patch_hash
+    patch_hash = patch_hash or (hash_file(patch_path) if patch_path else None)
+    hashed_bytes = (manifest["total_bytes"] if hashed_model else 0) + (Path(patch_path).stat().st_size if hashed_patch else 0)
+    hash_s = time.perf_counter() - t0
     meta = {
         "run_id": run_id,
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "scenario_id": scenario_id,
         "gams_version": gams_version,
-        "model_hash": compute_model_hash(work_dir),
-        "patch_hash": _sha256_of_file(Path(patch_path)) if patch_path else None,
+        "model_hash": manifest["hash"],
+        "patch_hash": patch_hash,
         "commit": git_commit,
         "main_file": main_file,
         "options": options or {},
+        "model_manifest": manifest,
+        "timings": {"hashing": {
+            "algorithm": manifest["algorithm"], "files": (manifest["file_count"] if hashed_model else 0) + (1 if hashed_patch else 0),
+            "bytes": hashed_bytes, "seconds": round(hash_s, 6),
+            "mb_per_s": round(hashed_bytes / hash_s / 1e6, 2) if hash_s > 0 else None,
+        }},
     }
     return meta
 
-def write_run_json(run_dir: str | Path, meta: Dict[str, str]) -> Path:
+def write_run_json(run_dir: str | Path, meta: Dict[str, str], runs_root: str | Path | None = None) -> Path:
+    """Write run.json and record the run in the provenance index (runs_root defaults to run_dir's parent)."""
     run_dir = Path(run_dir); out = run_dir / "run.json"
-    out.write_text(json.dumps(meta, indent=2), encoding="utf-8"); return out
+    out.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    try:
+        index_run(run_dir, meta, runs_root)
+    except Exception as e:  # the index is a cache; never fail a run over it
+        print(f"Warning: could not update provenance index: {e}")
+    return out
@@ -6,9 +6,9 @@ from __future__ import annotations
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 
-from .provenance import build_run_meta, write_run_json
+from .provenance import build_run_meta, diff_manifests, write_run_json
 
 
 def load_provenance_from_run_dir(run_dir: Path) -> Optional[Dict[str, Any]]:
@@ -171,6 +171,74 @@ def get_provenance_summary(run_dir: Path) -> Dict[str, str]:
     return summary
 
 
+def diff_run_models(run_dir_a: Path, run_dir_b: Path) -> Optional[Dict[str, List[str]]]:
+    """
+    Report which model files differ between two runs using their stored manifests.
+    
+    Args:
+        run_dir_a: Directory of the reference run
+        run_dir_b: Directory of the run compared against it
+        
+    Returns:
+        Dictionary with "added", "removed" and "changed" relative paths, or None
+        if either run has no model manifest in its run.json
+    """
+    prov_a = load_provenance_from_run_dir(Path(run_dir_a)) or {}
+    prov_b = load_provenance_from_run_dir(Path(run_dir_b)) or {}
+    if not prov_a.get("model_manifest") or not prov_b.get("model_manifest"):
+        return None
+    return diff_manifests(prov_a["model_manifest"], prov_b["model_manifest"])
+
+
+def format_model_diff(diff: Optional[Dict[str, List[str]]], max_items: int = 5) -> str:
+    """
+    Render a manifest diff as a short human-readable sentence.
+    
+    Args:
+        diff: Result of diff_run_models (None when manifests are unavailable)
+        max_items: Maximum number of paths listed per category
+        
+    Returns:
+        Text such as "only data/demand.gdx changed"
+    """
+    if diff is None:
+        return "model manifest not available"
+    total = sum(len(v) for v in diff.values())
+    if total == 0:
+        return "model files identical"
+    parts = []
+    for label in ("changed", "added", "removed"):
+        paths = diff.get(label) or []
+        if paths:
+            shown = ", ".join(paths[:max_items])
+            more = f" (+{len(paths) - max_items} more)" if len(paths) > max_items else ""
+            parts.append(f"{shown}{more} {label}")
+    prefix = "only " if total == 1 else ""
+    return prefix + "; ".join(parts)
+
+
+def record_run_phase(run_dir: Path, phase: str, seconds: float) -> bool:
+    """
+    Add a post-run phase (e.g. an Excel or DuckDB export) to the timings in run.json.
+    
+    Args:
+        run_dir: Directory containing run.json
+        phase: Phase name stored under timings.phases
+        seconds: Duration of the phase
+        
+    Returns:
+        True if run.json was updated, False if it does not exist
+    """
+    provenance_data = load_provenance_from_run_dir(Path(run_dir))
+    if provenance_data is None:
+        return False
+    timings = provenance_data.setdefault("timings", {})
+    phases = timings.setdefault("phases", {})
+    phases[phase] = round(phases.get(phase, 0.0) + seconds, 6)
+    write_run_json(run_dir, provenance_data)
+    return True
+
+
 def create_provenance_for_sync_run(
     work_dir: str,
     main_file: str,
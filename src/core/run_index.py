@@ -0,0 +1,417 @@
+"""
+Queryable provenance index across runs.
+
+Keeps one SQLite table of run.json metadata next to the run folders, updated on every
+write_run_json, so listing and filtering thousands of runs does not open each run.json.
+"""
+from __future__ import annotations
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .listing_parser import SOLVE_STAT_FIELDS
+
+INDEX_FILENAME = "provenance_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    run_name TEXT NOT NULL,
+    run_dir TEXT NOT NULL,
+    scenario_id TEXT,
+    model_hash TEXT,
+    patch_hash TEXT,
+    main_file TEXT,
+    options TEXT,
+    gams_version TEXT,
+    git_commit TEXT,
+    timestamp TEXT,
+    duration_s REAL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_scenario ON runs (scenario_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_model_hash ON runs (model_hash, timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_patch_hash ON runs (patch_hash);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON runs (status);
+CREATE INDEX IF NOT EXISTS idx_runs_name ON runs (run_name);
+CREATE TABLE IF NOT EXISTS solve_stats (
+    run_id TEXT NOT NULL,
+    solve_index INTEGER NOT NULL,
+    model TEXT,
+    model_type TEXT,
+    solver TEXT,
+    direction TEXT,
+    objective_var TEXT,
+    from_line INTEGER,
+    blocks_of_equations INTEGER,
+    single_equations INTEGER,
+    blocks_of_variables INTEGER,
+    single_variables INTEGER,
+    non_zero_elements INTEGER,
+    discrete_variables INTEGER,
+    generation_s REAL,
+    generation_mb INTEGER,
+    solver_status INTEGER,
+    solver_status_text TEXT,
+    model_status INTEGER,
+    model_status_text TEXT,
+    objective_value REAL,
+    resource_usage_s REAL,
+    resource_limit_s REAL,
+    iterations INTEGER,
+    iteration_limit INTEGER,
+    PRIMARY KEY (run_id, solve_index)
+);
+CREATE INDEX IF NOT EXISTS idx_solve_stats_model ON solve_stats (model, solver);
+CREATE TABLE IF NOT EXISTS kpi_values (
+    run_id TEXT NOT NULL,
+    kpi_hash TEXT NOT NULL,
+    name TEXT,
+    value REAL,
+    source_sig TEXT NOT NULL,
+    computed_at TEXT,
+    PRIMARY KEY (run_id, kpi_hash)
+);
+CREATE TABLE IF NOT EXISTS edit_vectors (
+    run_id TEXT PRIMARY KEY,
+    vector TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = ("run_id", "run_name", "run_dir", "scenario_id", "model_hash", "patch_hash", "main_file",
+            "options", "gams_version", "git_commit", "timestamp", "duration_s", "status")
+
+
+def index_path(runs_root: Union[str, Path]) -> Path:
+    """Location of the index database for a runs root folder."""
+    return Path(runs_root) / INDEX_FILENAME
+
+
+def connect_index(runs_root: Union[str, Path]) -> sqlite3.Connection:
+    """
+    Open (and create if needed) the provenance index for a runs root.
+
+    Args:
+        runs_root: Folder containing the run directories
+
+    Returns:
+        SQLite connection with rows returned as sqlite3.Row
+    """
+    path = index_path(runs_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _row_from_meta(run_dir: Path, meta: Dict[str, Any]) -> Dict[str, Any]:
+    timings = meta.get("timings") or {}
+    duration = meta.get("duration_s", timings.get("total_s"))
+    return {
+        "run_id": meta.get("run_id") or run_dir.name,
+        "run_name": run_dir.name,
+        "run_dir": str(run_dir.resolve()),
+        "scenario_id": meta.get("scenario_id"),
+        "model_hash": meta.get("model_hash"),
+        "patch_hash": meta.get("patch_hash"),
+        "main_file": meta.get("main_file"),
+        "options": json.dumps(meta.get("options") or {}, sort_keys=True),
+        "gams_version": meta.get("gams_version"),
+        "git_commit": meta.get("commit"),
+        "timestamp": meta.get("timestamp"),
+        "duration_s": float(duration) if duration is not None else None,
+        "status": meta.get("status") or "completed",
+    }
+
+
+def _upsert(conn: sqlite3.Connection, run_dir: Path, meta: Dict[str, Any]) -> None:
+    row = _row_from_meta(run_dir, meta)
+    placeholders = ", ".join("?" for _ in _COLUMNS)
+    conn.execute(f"INSERT OR REPLACE INTO runs ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                 [row[c] for c in _COLUMNS])
+    if meta.get("edit_vector") is not None:
+        conn.execute("INSERT OR REPLACE INTO edit_vectors (run_id, vector) VALUES (?, ?)",
+                     [row["run_id"], json.dumps(meta["edit_vector"])])
+    solves = (meta.get("solve_stats") or {}).get("solves")
+    if solves is None:
+        return
+    conn.execute("DELETE FROM solve_stats WHERE run_id = ?", [row["run_id"]])
+    cols = ("run_id", "solve_index") + SOLVE_STAT_FIELDS
+    sql = f"INSERT INTO solve_stats ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})"
+    conn.executemany(sql, [[row["run_id"], i] + [s.get(f) for f in SOLVE_STAT_FIELDS] for i, s in enumerate(solves)])
+
+
+def index_run(run_dir: Union[str, Path], meta: Dict[str, Any], runs_root: Optional[Union[str, Path]] = None) -> None:
+    """
+    Insert or update one run in the index.
+
+    Args:
+        run_dir: Run directory holding run.json
+        meta: Provenance metadata as written to run.json
+        runs_root: Index location (defaults to the parent of run_dir)
+    """
+    run_dir = Path(run_dir)
+    conn = connect_index(runs_root or run_dir.parent)
+    try:
+        with conn:
+            _upsert(conn, run_dir, meta)
+    finally:
+        conn.close()
+
+
+def rebuild_index(runs_root: Union[str, Path]) -> int:
+    """
+    Backfill the index from every */run.json under runs_root.
+
+    Args:
+        runs_root: Folder containing the run directories
+
+    Returns:
+        Number of runs indexed
+    """
+    runs_root = Path(runs_root)
+    return _index_run_files(runs_root, list(runs_root.glob("*/run.json")))
+
+
+def sync_index(runs_root: Union[str, Path]) -> int:
+    """
+    Index the run folders under runs_root that the index does not know yet, e.g. runs
+    made before the index existed. Only their run.json files are read.
+
+    Returns:
+        Number of runs added
+    """
+    runs_root = Path(runs_root)
+    conn = connect_index(runs_root)
+    try:
+        known = {r[0] for r in conn.execute("SELECT run_dir FROM runs")}
+    finally:
+        conn.close()
+    return _index_run_files(runs_root, [p for p in runs_root.glob("*/run.json")
+                                        if str(p.parent.resolve()) not in known])
+
+
+def _index_run_files(runs_root: Path, run_jsons: List[Path]) -> int:
+    if not run_jsons:
+        return 0
+    conn = connect_index(runs_root)
+    count = 0
+    try:
+        with conn:
+            for run_json in run_jsons:
+                try:
+                    meta = json.loads(run_json.read_text(encoding="utf-8"))
+                except Exception:
+                    continue
+                _upsert(conn, run_json.parent, meta)
+                count += 1
+    finally:
+        conn.close()
+    return count
+
+
+def _iso(value: Union[str, datetime, None]) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _run_filters(
+    scenario_id: Optional[str] = None,
+    model_hash: Optional[str] = None,
+    patch_hash: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Union[str, datetime, None] = None,
+    until: Union[str, datetime, None] = None,
+    options: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, List[Any]]:
+    clauses, params = [], []
+    if scenario_id is not None:
+        clauses.append("r.scenario_id = ?"); params.append(scenario_id)
+    if model_hash is not None:
+        clauses.append("r.model_hash LIKE ?"); params.append(model_hash + "%")
+    if patch_hash is not None:
+        clauses.append("r.patch_hash = ?"); params.append(patch_hash)
+    if status is not None:
+        clauses.append("r.status = ?"); params.append(status)
+    if since is not None:
+        clauses.append("r.timestamp >= ?"); params.append(_iso(since))
+    if until is not None:
+        clauses.append("r.timestamp < ?"); params.append(_iso(until))
+    for key, value in (options or {}).items():
+        clauses.append("json_extract(r.options, ?) = ?"); params.extend([f'$."{key}"', value])
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _fetch(runs_root: Union[str, Path], sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+    conn = connect_index(runs_root)
+    try:
+        return [dict(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def query_runs(runs_root: Union[str, Path], limit: Optional[int] = None, **filters: Any) -> List[Dict[str, Any]]:
+    """
+    Filter indexed runs, newest first.
+
+    Args:
+        runs_root: Folder containing the run directories
+        limit: Maximum number of rows
+        **filters: Any of
+            scenario_id: exact scenario id;
+            model_hash: model hash or hash prefix;
+            patch_hash: exact patch hash;
+            status: run status (e.g. "completed");
+            since / until: timestamp window [since, until), ISO string or datetime;
+            options: GAMS options that must match exactly, e.g. {"Lo": 2}
+
+    Returns:
+        List of run dictionaries (options decoded back to a dict)
+    """
+    where, params = _run_filters(**filters)
+    sql = f"SELECT r.* FROM runs r{where} ORDER BY r.timestamp DESC, r.run_name DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    rows = _fetch(runs_root, sql, params)
+    for r in rows:
+        r["options"] = json.loads(r["options"]) if r["options"] else {}
+    return rows
+
+
+def query_solve_stats(runs_root: Union[str, Path], **filters: Any) -> List[Dict[str, Any]]:
+    """
+    Solve statistics of indexed runs, oldest first, one row per solve.
+
+    Accepts the same filters as query_runs; each row also carries run_name,
+    scenario_id, model_hash and timestamp of its run.
+    """
+    where, params = _run_filters(**filters)
+    sql = (
+        "SELECT r.run_name, r.scenario_id, r.model_hash, r.timestamp, s.* FROM solve_stats s "
+        f"JOIN runs r ON r.run_id = s.run_id{where} ORDER BY r.timestamp, r.run_name, s.solve_index"
+    )
+    return _fetch(runs_root, sql, params)
+
+
+def query_edit_vectors(runs_root: Union[str, Path], **filters: Any) -> List[Dict[str, Any]]:
+    """
+    Recorded scenario edit vectors (warm_start.edit_vector) of indexed runs, newest first.
+
+    Accepts the same filters as query_runs; each row carries run_id, run_name, run_dir and
+    edit_vector.
+    """
+    where, params = _run_filters(**filters)
+    sql = ("SELECT r.run_id, r.run_name, r.run_dir, e.vector FROM edit_vectors e "
+           f"JOIN runs r ON r.run_id = e.run_id{where} ORDER BY r.timestamp DESC, r.run_name DESC")
+    rows = _fetch(runs_root, sql, params)
+    for r in rows:
+        r["edit_vector"] = json.loads(r.pop("vector"))
+    return rows
+
+
+def distinct_values(runs_root: Union[str, Path], column: str) -> List[Any]:
+    """Distinct non-null values of an indexed column (e.g. scenario_id) for filter widgets."""
+    if column not in _COLUMNS:
+        raise ValueError(f"Unknown index column: {column}")
+    conn = connect_index(runs_root)
+    try:
+        return [r[0] for r in conn.execute(f"SELECT DISTINCT {column} FROM runs WHERE {column} IS NOT NULL ORDER BY 1")]
+    finally:
+        conn.close()
+
+
+def list_run_names(runs_root: Union[str, Path], **filters: Any) -> List[str]:
+    """
+    Run folder names for the UI, newest first.
+
+    Indexes run folders the index does not know yet (sync_index), so folders made before
+    the index existed still appear.
+    """
+    runs_root = Path(runs_root)
+    if not runs_root.exists():
+        return []
+    sync_index(runs_root)
+    return [r["run_name"] for r in query_runs(runs_root, **filters)]
+
+
+def set_baseline_run(runs_root: Union[str, Path], run_name: Optional[str]) -> None:
+    """Designate the baseline run that new runs are summarised against (None clears it)."""
+    conn = connect_index(runs_root)
+    try:
+        with conn:
+            if run_name is None:
+                conn.execute("DELETE FROM settings WHERE key = 'baseline_run'")
+            else:
+                conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('baseline_run', ?)", [run_name])
+    finally:
+        conn.close()
+
+
+def get_baseline_run(runs_root: Union[str, Path]) -> Optional[str]:
+    """Name of the designated baseline run folder, if any."""
+    if not index_path(runs_root).exists():
+        return None
+    conn = connect_index(runs_root)
+    try:
+        row = conn.execute("SELECT value FROM settings WHERE key = 'baseline_run'").fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def get_kpi_values(runs_root: Union[str, Path], kpi_hashes: List[str]) -> Dict[Tuple[str, str], Tuple[Optional[float], str]]:
+    """
+    Cached KPI values for the given KPI definition hashes.
+
+    Returns:
+        {(run_id, kpi_hash): (value, source_sig)}; callers compare source_sig with the
+        run's current results file to detect re-ingestion
+    """
+    if not kpi_hashes or not index_path(runs_root).exists():
+        return {}
+    conn = connect_index(runs_root)
+    try:
+        placeholders = ", ".join("?" for _ in kpi_hashes)
+        rows = conn.execute(f"SELECT run_id, kpi_hash, value, source_sig FROM kpi_values WHERE kpi_hash IN ({placeholders})",
+                            list(kpi_hashes))
+        return {(r[0], r[1]): (r[2], r[3]) for r in rows}
+    finally:
+        conn.close()
+
+
+def put_kpi_values(runs_root: Union[str, Path], rows: List[Tuple[str, str, str, Optional[float], str]]) -> None:
+    """Store (run_id, kpi_hash, name, value, source_sig) rows, replacing older entries."""
+    if not rows:
+        return
+    conn = connect_index(runs_root)
+    try:
+        with conn:
+            now = datetime.utcnow().isoformat() + "Z"
+            conn.executemany("INSERT OR REPLACE INTO kpi_values (run_id, kpi_hash, name, value, source_sig, computed_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", [(*r, now) for r in rows])
+    finally:
+        conn.close()
+
+
+def clear_kpi_values(runs_root: Union[str, Path], run_id: Optional[str] = None) -> int:
+    """Drop cached KPI values (all, or one run's); returns the number of rows removed."""
+    if not index_path(runs_root).exists():
+        return 0
+    conn = connect_index(runs_root)
+    try:
+        with conn:
+            if run_id is None:
+                return conn.execute("DELETE FROM kpi_values").rowcount
+            return conn.execute("DELETE FROM kpi_values WHERE run_id = ?", [run_id]).rowcount
+    finally:
+        conn.close()
@@ -6,6 +6,8 @@ from typing import Any, Dict, List, Optional, Tuple
 import yaml  # PyYAML
 import re
 
+from .patch_cache import cached_patch, patch_key
+
 try:
     from gams import transfer as gt  # type: ignore
 except Exception as e:
@@ -83,9 +85,13 @@ def _ensure_transfer():
         raise ImportError("GAMS Transfer API not available. Ensure GAMS v49+ API is installed in this environment.")
 
 def build_patch_gdx(out_dir: str | Path, scen: Scenario) -> Path:
-    \"\"\"Create patch.gdx with symbols declared in the scenario.\"\"\"
-    _ensure_transfer()
+    """Create patch.gdx with symbols declared in the scenario (from the patch cache when built before)."""
     out = Path(out_dir); out.mkdir(parents=True, exist_ok=True)
+    edits = {"scalars": scen.edits.scalars, "parameters": scen.edits.parameters, "sets": scen.edits.sets}
+    return cached_patch(patch_key("scenario", edits), lambda path: _write_patch_gdx(scen, path), out / "patch.gdx")[0]
+
+def _write_patch_gdx(scen: Scenario, patch: Path) -> None:
+    _ensure_transfer()
     db = gt.Container()
     # scalars
     for s in scen.edits.scalars:
@@ -112,12 +118,10 @@ def build_patch_gdx(out_dir: str | Path, scen: Scenario) -> Path:
             filtered_add = [str(el) for el in to_add if el not in to_remove]
             if filtered_add:
                 st.setRecords(filtered_add)
-    patch = out / "patch.gdx"
     db.write(str(patch))
-    return patch
 
 def ensure_autoload_include(temp_main_gms: str | Path, symbols: List[str]) -> Path:
-    \"\"\"Ensure temp main.gms includes an autoload include that loads our patch.gdx for given symbols.\"\"\"
+    """Ensure temp main.gms includes an autoload include that loads our patch.gdx for given symbols."""
     main = Path(temp_main_gms)
     inc_path = main.parent / "autoload_patch.inc"
     load_lines = []
@@ -138,12 +142,12 @@ def ensure_autoload_include(temp_main_gms: str | Path, symbols: List[str]) -> Pa
     return inc_path
 
 def apply_scenario_to_temp_dir(temp_dir: str | Path, model_dir: str | Path, main_gms_name: str, scenario_yaml: str | Path) -> dict:
-    \"\"\"Apply a scenario to the *temp* workspace before running GAMS.
+    """Apply a scenario to the *temp* workspace before running GAMS.
     - Writes patch.gdx in temp_dir
     - Copies includes (if any) into temp_dir preserving rel paths
     - Ensures autoload include is present in temp main.gms
     - Returns dict with scenario_id and symbols touched
-    \"\"\"
+    """
     data = load_yaml(scenario_yaml)
     scen = validate_scenario(data)
     temp_dir = Path(temp_dir); model_dir = Path(model_dir)
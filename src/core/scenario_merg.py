@@ -1,11 +1,16 @@
 
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import copy
 import re
+import time
 import yaml  # PyYAML
 
+from .patch_cache import cached_patch, patch_key
+from .provenance import _new_hasher
+
 # We will use the Transfer API via gt.Workspace -> Database to build a small patch GDX.
 def _import_transfer():
     try:
@@ -18,22 +23,44 @@ def _import_transfer():
 class Scenario:
     id: str
     description: Optional[str]
-    edits: Dict[str, Any]
+    edits: Dict[str, Any]           # effective edits (base layers merged)
     meta: Dict[str, Any]
+    extends: Optional[str] = None
+    layers: List[Dict[str, Any]] = field(default_factory=list)  # own edits of each layer, base first
 
 _slug_re = re.compile(r"^[A-Za-z0-9_\-\.]+$")
 
-def load_scenario(path: str | Path) -> Scenario:
-    data = yaml.safe_load(Path(path).read_text(encoding="utf-8"))
-    if not isinstance(data, dict):
-        raise ValueError("Scenario YAML must be a mapping/object")
-    sid = data.get("id")
-    if not sid or not isinstance(sid, str) or not _slug_re.match(sid):
-        raise ValueError("Scenario 'id' is required and must be slug-safe (letters, numbers, _ - .)")
-    edits = data.get("edits") or {}
+def load_scenario(path: str | Path, _seen: Optional[List[str]] = None) -> Scenario:
+    """Load a scenario YAML; 'extends: <id>' loads the base scenario from the same folder first."""
+    path = Path(path)
+    data = yaml.safe_load(path.read_text(encoding="utf-8"))
+    base_id = data.get("extends") if isinstance(data, dict) else None
+    if not base_id:
+        return scenario_from_dict(data)
+    seen = (_seen or []) + [str(data.get("id"))]
+    if base_id in seen:
+        raise ValueError(f"Scenario inheritance cycle: {' -> '.join(seen + [base_id])}")
+    return scenario_from_dict(data, base=load_scenario(find_scenario(path.parent, base_id), seen))
+
+def find_scenario(folder: str | Path, scenario_id: str) -> Path:
+    """YAML file of a scenario ID in folder: <id>.yaml / <id>.yml, else the file declaring that id."""
+    folder = Path(folder)
+    for name in (f"{scenario_id}.yaml", f"{scenario_id}.yml"):
+        if (folder / name).exists():
+            return folder / name
+    for candidate in sorted([*folder.glob("*.yaml"), *folder.glob("*.yml")]):
+        try:
+            data = yaml.safe_load(candidate.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if isinstance(data, dict) and data.get("id") == scenario_id:
+            return candidate
+    raise FileNotFoundError(f"Base scenario '{scenario_id}' not found in {folder}")
+
+def _normalize_edits(edits: Any, require_section: bool = True) -> Dict[str, Any]:
     if not isinstance(edits, dict):
         raise ValueError("'edits' must be a mapping/object")
-    if not any(k in edits for k in ("scalars", "parameters", "sets", "equations")):
+    if require_section and not any(k in edits for k in ("scalars", "parameters", "sets", "equations")):
         raise ValueError("Scenario must declare at least one of: scalars, parameters, sets, equations")
     # Normalize shapes
     scalars = edits.get("scalars") or []
@@ -65,26 +92,166 @@ def load_scenario(path: str | Path) -> Scenario:
     includes = eq.get("includes") or []
     if includes and not isinstance(includes, list):
         raise ValueError("'equations.includes' must be a list")
-    scen = Scenario(
+    return {"scalars": scalars, "parameters": parameters, "sets": sets_, "equations": {"includes": includes}}
+
+def merge_edits(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply delta edits on top of base edits: scalars and parameter records override by name
+    and key (new ones are appended), set adds/removes are applied in order (set union minus
+    removals) and equation includes are appended. Entries the delta does not touch are shared
+    with base (copy-on-write), so a small delta on a large base stays cheap.
+    """
+    out = {k: list(base[k]) for k in ("scalars", "parameters", "sets")}
+    out["equations"] = {"includes": list(base["equations"]["includes"])}
+    pos = {x["name"]: i for i, x in enumerate(out["scalars"])}
+    for s in delta["scalars"]:
+        if s["name"] in pos:
+            out["scalars"][pos[s["name"]]] = {**out["scalars"][pos[s["name"]]], "value": s["value"]}
+        else:
+            pos[s["name"]] = len(out["scalars"])
+            out["scalars"].append(dict(s))
+    pos = {x["name"]: i for i, x in enumerate(out["parameters"])}
+    for p in delta["parameters"]:
+        if p["name"] not in pos:
+            pos[p["name"]] = len(out["parameters"])
+            out["parameters"].append(copy.deepcopy(p))
+            continue
+        hit = out["parameters"][pos[p["name"]]] = {**out["parameters"][pos[p["name"]]]}
+        updates = hit["updates"] = list(hit["updates"])
+        keys = {tuple(str(k) for k in r["key"]): i for i, r in enumerate(updates)}
+        for u in p["updates"]:
+            key = tuple(str(k) for k in u["key"])
+            if key in keys:
+                updates[keys[key]] = {**updates[keys[key]], "value": u["value"]}
+            else:
+                keys[key] = len(updates)
+                updates.append(copy.deepcopy(u))
+    pos = {x["name"]: i for i, x in enumerate(out["sets"])}
+    for s in delta["sets"]:
+        if s["name"] not in pos:
+            pos[s["name"]] = len(out["sets"])
+            out["sets"].append(copy.deepcopy(s))
+            continue
+        hit = out["sets"][pos[s["name"]]] = {**out["sets"][pos[s["name"]]]}
+        add, remove = {str(e) for e in s["add"]}, {str(e) for e in s["remove"]}
+        kept = [e for e in hit["add"] if str(e) not in remove]
+        hit["add"] = kept + [e for e in s["add"] if str(e) not in {str(x) for x in kept}]
+        dropped = [e for e in hit["remove"] if str(e) not in add]
+        hit["remove"] = dropped + [e for e in s["remove"] if str(e) not in {str(x) for x in dropped}]
+    includes = out["equations"]["includes"]
+    includes += [i for i in delta["equations"]["includes"] if i not in includes]
+    return out
+
+def scenario_from_dict(data: Dict[str, Any], base: Optional[Scenario] = None) -> Scenario:
+    """
+    Validate a scenario mapping (the YAML document) and return a Scenario.
+
+    With a base scenario, the mapping's edits are a delta on top of it: the result's edits
+    are merged (merge_edits), its meta extends the base meta and its layers are the base
+    layers plus the delta.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Scenario YAML must be a mapping/object")
+    sid = data.get("id")
+    if not sid or not isinstance(sid, str) or not _slug_re.match(sid):
+        raise ValueError("Scenario 'id' is required and must be slug-safe (letters, numbers, _ - .)")
+    delta = _normalize_edits(data.get("edits") or {}, require_section=base is None)
+    if base is None:
+        return Scenario(id=sid, description=data.get("description"), edits=delta, meta=data.get("meta") or {})
+    return Scenario(
         id=sid,
-        description=data.get("description"),
-        edits={"scalars": scalars, "parameters": parameters, "sets": sets_, "equations": {"includes": includes}},
-        meta=data.get("meta") or {},
+        description=data.get("description") or base.description,
+        edits=merge_edits(base.edits, delta),
+        meta={**base.meta, **(data.get("meta") or {})},
+        extends=base.id,
+        layers=(base.layers or [base.edits]) + [delta],
     )
-    return scen
 
 def build_patch_gdx(temp_dir: str | Path, scen: Scenario) -> Path:
-    """Create patch.gdx in temp_dir with all symbol edits; returns the path."""
-    gt = _import_transfer()
+    """Create patch.gdx in temp_dir with all symbol edits (from the patch cache when built before); returns the path."""
+    return _cached_patch_gdx(temp_dir, scen)[0]
+
+def _cached_patch_gdx(temp_dir: str | Path, scen: Scenario) -> Tuple[Path, str, bool]:
+    """(patch path, patch hash, cache hit) for the scenario's symbol edits."""
     temp_dir = Path(temp_dir); temp_dir.mkdir(parents=True, exist_ok=True)
+    edits = {k: scen.edits[k] for k in ("scalars", "parameters", "sets")}
+    return cached_patch(patch_key("scenario_merg", edits), lambda path: _write_patch_gdx(edits, path), temp_dir / "patch.gdx")
+
+def _layer_plan(layers: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, str]]]:
+    """
+    Patch contents and load mode per layer, base first. The base layer is the flat patch of
+    the base scenario. A symbol's first layer replaces the model data ("R", as the flat patch
+    does); later layers merge into it ("M"): scalars and parameter records override and set
+    elements are added. A layer removing earlier set elements rewrites that set with its
+    effective elements instead ("R").
+    """
+    plan = []
+    members: Dict[str, List[Any]] = {}
+    for i, layer in enumerate(layers):
+        edits = {k: layer[k] for k in ("scalars", "parameters", "sets")} if i == 0 else {"scalars": [], "parameters": [], "sets": []}
+        modes: Dict[str, str] = {}
+        for sc in layer["scalars"]:
+            if i:
+                edits["scalars"].append(sc)
+            modes[sc["name"]] = "R"
+        for par in layer["parameters"]:
+            if not par["updates"]:
+                continue
+            if i:
+                edits["parameters"].append(par)
+            modes[par["name"]] = "R" if i == 0 or not any(par["name"] in m for _, m in plan) else "M"
+        for st in layer["sets"]:
+            name = st["name"]
+            before = members.get(name, [])
+            removed = {str(e) for e in st["remove"]}
+            known = {str(e) for e in before}
+            members[name] = [e for e in before if str(e) not in removed]
+            members[name] += [e for e in st["add"] if str(e) not in {str(x) for x in members[name]}]
+            if i == 0:
+                if members[name]:
+                    modes[name] = "R"
+            elif before and not (known & removed):
+                new = [e for e in st["add"] if str(e) not in known]
+                if new:
+                    edits["sets"].append({"name": name, "add": new, "remove": []})
+                    modes[name] = "M"
+            elif members[name]:
+                edits["sets"].append({"name": name, "add": list(members[name]), "remove": []})
+                modes[name] = "R"
+        plan.append((edits, modes))
+    return plan
+
+def _cached_layer_patches(temp_dir: str | Path, scen: Scenario) -> Tuple[List[Tuple[Path, Dict[str, str]]], str, str]:
+    """
+    Build (or reuse from the patch cache) one patch_<i>.gdx per scenario layer.
+
+    Returns:
+        ([(patch path, {symbol: load mode})], combined patch hash, "hit" / "miss" / "partial")
+    """
+    temp_dir = Path(temp_dir); temp_dir.mkdir(parents=True, exist_ok=True)
+    patches, hashes, hits = [], [], []
+    for i, (edits, modes) in enumerate(_layer_plan(scen.layers)):
+        path, digest, hit = cached_patch(
+            patch_key("scenario_merg", edits),
+            lambda out, edits=edits: _write_patch_gdx(edits, out),
+            temp_dir / f"patch_{i}.gdx",
+        )
+        patches.append((path, modes)); hashes.append(digest); hits.append(hit)
+    h = _new_hasher()
+    h.update("\n".join(hashes).encode("utf-8"))
+    status = "hit" if all(hits) else "miss" if not any(hits) else "partial"
+    return patches, h.hexdigest(), status
+
+def _write_patch_gdx(edits: Dict[str, Any], patch: Path) -> None:
+    gt = _import_transfer()
     db = gt.Container()  # Transfer Container
     # Scalars -> parameters of dim 0
-    for s in scen.edits["scalars"]:
+    for s in edits["scalars"]:
         name = s["name"]; val = s["value"]
         par = gt.Parameter(db, name)
         par.setRecords([val])
     # Parameters -> parameters of inferred dimension
-    for p in scen.edits["parameters"]:
+    for p in edits["parameters"]:
         name = p["name"]; ups = p["updates"]
         if ups:
             # Infer dimension from first key
@@ -97,18 +264,42 @@ def build_patch_gdx(temp_dir: str | Path, scen: Scenario) -> Path:
                 records_data.append(key + [u["value"]])
             par.setRecords(records_data)
     # Sets -> sets(dim=1) adding only "add" items  
-    for s in scen.edits["sets"]:
+    for s in edits["sets"]:
         name = s["name"]
         add_items = s.get("add") or []
         if add_items:
             st = gt.Set(db, name)
             st.setRecords(add_items)
-    patch = temp_dir / "patch.gdx"
     db.write(str(patch))
-    return patch
 
 def ensure_autoload_include(temp_main_gms: str | Path, symbols: List[str]) -> Path:
     """Move GDX loading to after declarations and update symbol list."""
+    block = [
+        "* Load scenario overrides from patch.gdx",
+        "$onMultiR",
+        "$if exist patch.gdx $gdxin patch.gdx",
+        f"$if exist patch.gdx $load {', '.join(symbols)}",
+        "$if exist patch.gdx $gdxin",
+        "$offMulti",
+    ]
+    return _insert_autoload(temp_main_gms, block if symbols else [])
+
+def ensure_layered_autoload(temp_main_gms: str | Path, patches: List[Tuple[Path, Dict[str, str]]]) -> Path:
+    """Like ensure_autoload_include, loading one patch per scenario layer in order (see _layer_plan)."""
+    block = ["* Load scenario overrides, base layer first"]
+    for patch, modes in patches:
+        name = Path(patch).name
+        block.append(f"$if exist {name} $gdxin {name}")
+        for mode, directive in (("R", "$onMultiR"), ("M", "$onMulti")):
+            syms = [sym for sym, m in modes.items() if m == mode]
+            if syms:
+                block.append(directive)
+                block.append(f"$if exist {name} $load {', '.join(syms)}")
+        block.append(f"$if exist {name} $gdxin")
+    block.append("$offMulti")
+    return _insert_autoload(temp_main_gms, block if any(modes for _, modes in patches) else [])
+
+def _insert_autoload(temp_main_gms: str | Path, block: List[str]) -> Path:
     main = Path(temp_main_gms)
     
     # Read the main.gms file
@@ -126,32 +317,33 @@ def ensure_autoload_include(temp_main_gms: str | Path, symbols: List[str]) -> Pa
         else:
             out_lines.append(line)
             # Insert GDX loading after parameter declarations (look for "Benefit" parameter as marker)  
-            if "Benefit(i)" in line and symbols and not gdx_lines_removed:
+            if "Benefit(i)" in line and block and not gdx_lines_removed:
                 out_lines.append("")
-                out_lines.append("* Load scenario overrides from patch.gdx")
-                out_lines.append("$onMultiR")
-                out_lines.append("$if exist patch.gdx $gdxin patch.gdx")
-                symbol_list = ", ".join(symbols)
-                out_lines.append(f"$if exist patch.gdx $load {symbol_list}")
-                out_lines.append("$if exist patch.gdx $gdxin")
-                out_lines.append("$offMulti")
+                out_lines.extend(block)
                 gdx_lines_removed = True
     
     # Write back the modified main.gms
     main.write_text("\n".join(out_lines) + "\n", encoding="utf-8")
     return main
 
-def apply_scenario_to_temp_workspace(temp_dir: str | Path, model_dir: str | Path, main_gms_name: str, scenario_yaml: str | Path) -> Dict[str, Any]:
-    """Apply scenario YAML to the *temp copy*:
-       - Build patch.gdx in temp_dir
+def apply_scenario_to_temp_workspace(temp_dir: str | Path, model_dir: str | Path, main_gms_name: str, scenario_yaml: str | Path | Scenario) -> Dict[str, Any]:
+    """Apply scenario YAML (or an in-memory Scenario, e.g. from a sweep) to the *temp copy*:
+       - Build patch.gdx in temp_dir (patch_0.gdx, patch_1.gdx, ... for a scenario with 'extends')
        - Copy equation includes from model_dir into temp_dir
        - Ensure autoload include is present in temp main.gms
-       Returns dict with scenario_id and symbols touched.
+       Returns dict with scenario_id, symbols touched, patch path/hash, layer patches, patch
+       cache hit / miss / partial, patch build time, scenario meta and edits.
     """
-    scen = load_scenario(scenario_yaml)
+    scen = scenario_yaml if isinstance(scenario_yaml, Scenario) else load_scenario(scenario_yaml)
     temp_dir = Path(temp_dir); model_dir = Path(model_dir)
     # Build patch
-    patch = build_patch_gdx(temp_dir, scen)
+    t0 = time.perf_counter()
+    if len(scen.layers) > 1:
+        patches, patch_hash, cache_status = _cached_layer_patches(temp_dir, scen)
+    else:
+        patch, patch_hash, cache_hit = _cached_patch_gdx(temp_dir, scen)
+        patches, cache_status = [], "hit" if cache_hit else "miss"
+    patch_s = time.perf_counter() - t0
     # Copy any equation include files
     for rel in scen.edits["equations"]["includes"]:
         src = (model_dir / rel).resolve()
@@ -165,5 +357,11 @@ def apply_scenario_to_temp_workspace(temp_dir: str | Path, model_dir: str | Path
     syms += [s["name"] for s in scen.edits["scalars"]]
     syms += [p["name"] for p in scen.edits["parameters"]]
     syms += [s["name"] for s in scen.edits["sets"]]
-    ensure_autoload_include(Path(temp_dir) / main_gms_name, syms)
-    return {"scenario_id": scen.id, "symbols": syms, "patch": str(patch)}
+    if patches:
+        ensure_layered_autoload(Path(temp_dir) / main_gms_name, patches)
+        patch = patches[-1][0]
+    else:
+        ensure_autoload_include(Path(temp_dir) / main_gms_name, syms)
+    return {"scenario_id": scen.id, "symbols": syms, "patch": str(patch), "patch_hash": patch_hash,
+            "patches": [str(p) for p, _ in patches], "patch_cache": cache_status,
+            "timings": {"patch_build": patch_s}, "meta": scen.meta, "edits": scen.edits}
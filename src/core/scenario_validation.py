@@ -0,0 +1,249 @@
+"""
+Validation of scenario edits against the model's symbol index.
+
+A SymbolCatalog is built once per model from symbol_indexer.create_symbol_index and reused
+for every scenario: edits are checked for symbol existence, type, key arity and (where the
+domain set's elements are declared inline in the model) domain membership, with elements
+added or removed by the scenario's own set edits taken into account. Checks are dictionary
+lookups, and the edits of a shared base layer are checked once per batch, so thousands of
+generated scenarios validate in milliseconds.
+
+Issues are dicts {"scenario", "section", "symbol", "key", "message"}; validate_scenarios
+returns them per scenario and ensure_valid raises ScenarioValidationError.
+"""
+from __future__ import annotations
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from .symbol_indexer import create_symbol_index
+
+_UNIVERSE = "*"
+
+
+class ScenarioValidationError(ValueError):
+    """Raised by ensure_valid; ``issues`` maps scenario IDs to their issues."""
+
+    def __init__(self, issues: Dict[str, List[Dict[str, Any]]]):
+        self.issues = issues
+        count = sum(len(v) for v in issues.values())
+        first = next(iter(issues.values()))[0]["message"] if count else ""
+        super().__init__(f"{count} invalid edit(s) in {len(issues)} scenario(s); first: {first}")
+
+
+class SymbolCatalog:
+    """
+    Symbol index of one model, keyed by lower-case name, with resolved set elements.
+    Names and labels compare case-insensitively, as in GAMS.
+    """
+
+    def __init__(self, index: Iterable[Dict[str, Any]]):
+        self.symbols: Dict[str, Dict[str, Any]] = {}
+        for entry in index:
+            key = str(entry.get("name", "")).lower()
+            if not key:
+                continue
+            known = self.symbols.get(key)
+            if known is None:
+                self.symbols[key] = dict(entry)
+            elif known.get("elements") is None and entry.get("elements") is not None:
+                known["elements"] = entry["elements"]
+        self._elements: Dict[str, Optional[FrozenSet[str]]] = {}
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.symbols.get(str(name).lower())
+
+    def kind(self, name: str) -> Optional[str]:
+        entry = self.get(name)
+        return entry["type"] if entry else None
+
+    def dim(self, name: str) -> int:
+        """Dimension; a set declared without a domain is one-dimensional over the universe."""
+        entry = self.get(name)
+        if entry is None:
+            return 0
+        if entry["type"] in ("set", "alias"):
+            return max(1, entry.get("dim") or 0)
+        return entry.get("dim") or 0
+
+    def domain(self, name: str) -> List[str]:
+        entry = self.get(name)
+        if entry is None:
+            return []
+        domain = list(entry.get("domain") or [])
+        return domain if len(domain) == self.dim(name) else [_UNIVERSE] * self.dim(name)
+
+    def elements(self, set_name: str) -> Optional[FrozenSet[str]]:
+        """Lower-case elements of a one-dimensional set (through aliases), None if unknown."""
+        key = str(set_name).lower()
+        if key not in self._elements:
+            entry = self.symbols.get(key)
+            if entry is not None and entry["type"] == "alias" and entry.get("domain"):
+                self._elements[key] = self.elements(entry["domain"][0])
+            elif entry is not None and entry["type"] == "set" and entry.get("elements") is not None and self.dim(key) == 1:
+                self._elements[key] = frozenset(str(e).lower() for e in entry["elements"])
+            else:
+                self._elements[key] = None
+        return self._elements[key]
+
+
+_catalogs: Dict[Tuple[str, str], Tuple[Tuple[Tuple[str, int, int], ...], SymbolCatalog]] = {}
+_catalog_lock = threading.Lock()
+
+
+def _fingerprint(files: Iterable[str]) -> Tuple[Tuple[str, int, int], ...]:
+    out = []
+    for f in sorted(set(files)):
+        try:
+            st = os.stat(f)
+            out.append((f, st.st_size, st.st_mtime_ns))
+        except OSError:
+            out.append((f, -1, -1))
+    return tuple(out)
+
+
+def catalog_for_model(model_dir: Union[str, Path], main_file: str = "main.gms") -> SymbolCatalog:
+    """SymbolCatalog of a model, rebuilt only when one of its indexed source files changed."""
+    key = (str(Path(model_dir).resolve()), main_file)
+    with _catalog_lock:
+        cached = _catalogs.get(key)
+    if cached is not None and cached[0] == _fingerprint(f for f, _, _ in cached[0]):
+        return cached[1]
+    index = create_symbol_index(model_dir, main_file)
+    files = [e["file"] for e in index] + [str(Path(model_dir) / main_file)]
+    catalog = SymbolCatalog(index)
+    with _catalog_lock:
+        _catalogs[key] = (_fingerprint(files), catalog)
+    return catalog
+
+
+def _issue(section: str, symbol: str, message: str, key: Any = None) -> Dict[str, Any]:
+    return {"scenario": None, "section": section, "symbol": symbol, "key": key, "message": message}
+
+
+def _set_changes(edits: Dict[str, Any]) -> Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]:
+    return {
+        str(s["name"]).lower(): (frozenset(str(e).lower() for e in s.get("add") or []),
+                                 frozenset(str(e).lower() for e in s.get("remove") or []))
+        for s in edits.get("sets") or []
+    }
+
+
+def _members(catalog: SymbolCatalog, set_name: str, changes: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]) -> Optional[FrozenSet[str]]:
+    base = catalog.elements(set_name)
+    entry = catalog.get(set_name)
+    target = entry["domain"][0].lower() if entry and entry["type"] == "alias" and entry.get("domain") else str(set_name).lower()
+    if base is None or target not in changes:
+        return base
+    add, remove = changes[target]
+    return (base | add) - remove
+
+
+def _check_key(catalog: SymbolCatalog, section: str, name: str, key: List[Any],
+               changes: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]) -> Optional[Dict[str, Any]]:
+    for label, dom in zip(key, catalog.domain(name)):
+        if dom == _UNIVERSE:
+            continue
+        members = _members(catalog, dom, changes)
+        if members is not None and str(label).lower() not in members:
+            return _issue(section, name, f"{name}: '{label}' is not an element of {dom}", key)
+    return None
+
+
+def validate_edits(edits: Dict[str, Any], catalog: SymbolCatalog,
+                   changes: Optional[Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]] = None) -> List[Dict[str, Any]]:
+    """
+    Issues of one set of normalized edits (scenario_merg.Scenario.edits shape).
+
+    Args:
+        edits: {"scalars", "parameters", "sets", ...}
+        catalog: SymbolCatalog of the model
+        changes: Set edits in effect ({set: (added, removed)}); default: this edits' own
+    """
+    changes = _set_changes(edits) if changes is None else changes
+    issues: List[Dict[str, Any]] = []
+    for s in edits.get("scalars") or []:
+        name = s["name"]
+        kind = catalog.kind(name)
+        if kind is None:
+            issues.append(_issue("scalars", name, f"Unknown symbol '{name}'"))
+        elif kind not in ("scalar", "parameter") or catalog.dim(name) != 0:
+            issues.append(_issue("scalars", name, f"'{name}' is a {catalog.dim(name)}-dimensional {kind}, not a scalar"))
+    for p in edits.get("parameters") or []:
+        name = p["name"]
+        kind = catalog.kind(name)
+        if kind is None:
+            issues.append(_issue("parameters", name, f"Unknown symbol '{name}'"))
+            continue
+        if kind not in ("parameter", "scalar"):
+            issues.append(_issue("parameters", name, f"'{name}' is a {kind}, not a parameter"))
+            continue
+        dim = catalog.dim(name)
+        for u in p.get("updates") or []:
+            key = list(u["key"])
+            if len(key) != dim:
+                issues.append(_issue("parameters", name, f"{name}: key {key} has {len(key)} entries, expected {dim}", key))
+                continue
+            problem = _check_key(catalog, "parameters", name, key, changes)
+            if problem:
+                issues.append(problem)
+    for s in edits.get("sets") or []:
+        name = s["name"]
+        kind = catalog.kind(name)
+        if kind is None:
+            issues.append(_issue("sets", name, f"Unknown symbol '{name}'"))
+            continue
+        if kind != "set":
+            issues.append(_issue("sets", name, f"'{name}' is a {kind}, not a set"))
+            continue
+        dim = catalog.dim(name)
+        for label in s.get("add") or []:
+            key = str(label).split(".")
+            if len(key) != dim:
+                issues.append(_issue("sets", name, f"{name}: element '{label}' has {len(key)} index positions, expected {dim}", label))
+                continue
+            problem = _check_key(catalog, "sets", name, key, {k: v for k, v in changes.items() if k != name.lower()})
+            if problem:
+                issues.append(problem)
+    return issues
+
+
+def validate_scenario(scenario: Any, catalog: SymbolCatalog) -> List[Dict[str, Any]]:
+    """Issues of one scenario_merg.Scenario (empty when valid)."""
+    return validate_scenarios([scenario], catalog).get(scenario.id, [])
+
+
+def validate_scenarios(scenarios: Iterable[Any], catalog: SymbolCatalog) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Validate many scenarios against one catalog.
+
+    Layered scenarios (extends / sweeps) are checked layer by layer; a layer shared by many
+    scenarios (the same base) is checked once unless their set edits differ.
+
+    Returns:
+        {scenario ID: issues} for the scenarios with issues only
+    """
+    memo: Dict[Tuple[int, Tuple[int, ...]], Tuple[Any, List[Dict[str, Any]]]] = {}
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for scen in scenarios:
+        layers = scen.layers or [scen.edits]
+        changes = _set_changes(scen.edits)
+        # set edits of any layer change what the other layers' keys are checked against
+        context = tuple(id(layer) for layer in layers if layer.get("sets"))
+        issues: List[Dict[str, Any]] = []
+        for layer in layers:
+            key = (id(layer), context)
+            if key not in memo:
+                memo[key] = (layer, validate_edits(layer, catalog, changes))  # keep layer alive: ids stay unique
+            issues += memo[key][1]
+        if issues:
+            out[scen.id] = [{**i, "scenario": scen.id} for i in issues]
+    return out
+
+
+def ensure_valid(scenarios: Iterable[Any], catalog: SymbolCatalog) -> None:
+    """Raise ScenarioValidationError if any scenario has issues."""
+    issues = validate_scenarios(scenarios, catalog)
+    if issues:
+        raise ScenarioValidationError(issues)
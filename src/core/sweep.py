@@ -0,0 +1,236 @@
+"""
+Parameter sweeps over a base scenario.
+
+A matrix spec (matrix.yaml, see docs/MATRIX_SCHEMA.md) names a base scenario and a list of
+axes, each targeting a scalar or one parameter record. iter_scenarios expands it lazily into
+scenario_merg.Scenario objects by full grid, random sampling or Latin hypercube sampling, so
+large designs go straight to the runner without writing scenario YAMLs. Scenario IDs are
+derived from the sweep ID and the point's values: the same point always gets the same ID.
+"""
+from __future__ import annotations
+import hashlib
+import itertools
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import NormalDist
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import yaml
+
+from .scenario_merg import Scenario, _slug_re, load_scenario, scenario_from_dict
+
+METHODS = ("grid", "random", "lhs")
+_DISCRETE = ("values", "range", "linspace")
+_CONTINUOUS = ("uniform", "loguniform", "normal")
+
+
+@dataclass
+class Axis:
+    """One swept input: a scalar (key is None) or a single parameter record."""
+    name: str
+    symbol: str
+    key: Optional[List[str]]
+    levels: Optional[List[Any]] = None  # discrete axes
+    dist: Optional[str] = None          # continuous axes: uniform | loguniform | normal
+    a: float = 0.0
+    b: float = 0.0
+
+    def value(self, u: float) -> Any:
+        """Map u in [0, 1) to an axis value (inverse CDF for continuous axes)."""
+        if self.levels is not None:
+            return self.levels[min(int(u * len(self.levels)), len(self.levels) - 1)]
+        if self.dist == "uniform":
+            return self.a + u * (self.b - self.a)
+        if self.dist == "loguniform":
+            return math.exp(math.log(self.a) + u * (math.log(self.b) - math.log(self.a)))
+        return NormalDist(self.a, self.b).inv_cdf(min(max(u, 1e-12), 1 - 1e-12))
+
+
+def _levels(name: str, axis: Dict[str, Any]) -> List[Any]:
+    if "values" in axis:
+        values = axis["values"]
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"Axis {name}: 'values' must be a non-empty list")
+        return values
+    if "range" in axis:
+        r = axis["range"]
+        start, stop, step = float(r["start"]), float(r["stop"]), float(r.get("step", 1))
+        if step <= 0 or stop < start:
+            raise ValueError(f"Axis {name}: range needs start <= stop and step > 0")
+        n = int(math.floor((stop - start) / step + 1e-9)) + 1  # stop is inclusive when on the grid
+        return [round(start + i * step, 12) for i in range(n)]
+    r = axis["linspace"]
+    return [float(v) for v in np.linspace(float(r["start"]), float(r["stop"]), int(r["num"]))]
+
+
+def parse_axes(spec: Dict[str, Any]) -> List[Axis]:
+    """Validate the 'axes' list of a matrix spec."""
+    axes_spec = spec.get("axes")
+    if not isinstance(axes_spec, list) or not axes_spec:
+        raise ValueError("Matrix spec needs a non-empty 'axes' list")
+    axes: List[Axis] = []
+    for item in axes_spec:
+        if not isinstance(item, dict) or bool(item.get("scalar")) == bool(item.get("parameter")):
+            raise ValueError(f"Axis needs exactly one of 'scalar' or 'parameter'; got {item}")
+        symbol = item.get("scalar") or item["parameter"]
+        key = None
+        if item.get("parameter"):
+            raw = item.get("key")
+            if raw is None:
+                raise ValueError(f"Axis on parameter {symbol} needs a 'key' (list of set elements)")
+            key = [str(k) for k in (raw if isinstance(raw, list) else [raw])]
+        name = item.get("name") or (f"{symbol}[{','.join(key)}]" if key else symbol)
+        kinds = [k for k in (*_DISCRETE, *_CONTINUOUS) if k in item]
+        if len(kinds) != 1:
+            raise ValueError(f"Axis {name}: give exactly one of {', '.join(_DISCRETE + _CONTINUOUS)}")
+        if kinds[0] in _DISCRETE:
+            axes.append(Axis(name, symbol, key, levels=_levels(name, item)))
+            continue
+        params = item[kinds[0]]
+        if not isinstance(params, list) or len(params) != 2:
+            raise ValueError(f"Axis {name}: {kinds[0]} needs [a, b]")
+        a, b = float(params[0]), float(params[1])
+        if (kinds[0] == "normal" and b <= 0) or (kinds[0] != "normal" and b < a) or (kinds[0] == "loguniform" and a <= 0):
+            raise ValueError(f"Axis {name}: invalid {kinds[0]} parameters {params}")
+        axes.append(Axis(name, symbol, key, dist=kinds[0], a=a, b=b))
+    names = [a.name for a in axes]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate axis names: {names}")
+    return axes
+
+
+def _method(spec: Dict[str, Any]) -> str:
+    method = (spec.get("method") or "grid").lower()
+    if method not in METHODS:
+        raise ValueError(f"Unknown sweep method '{method}' (expected one of {', '.join(METHODS)})")
+    return method
+
+
+def count_points(spec: Dict[str, Any]) -> int:
+    """Number of scenarios the spec expands to."""
+    axes = parse_axes(spec)
+    if _method(spec) == "grid":
+        return math.prod(len(a.levels or []) for a in axes)
+    return int(spec.get("samples") or 0)
+
+
+def iter_points(spec: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield the design points of a spec as {axis name: value}.
+
+    grid takes the product of all (discrete) axes; random and lhs draw 'samples' points
+    with numpy's default_rng('seed'), lhs placing exactly one point in each of the
+    'samples' equal-probability strata of every axis.
+    """
+    axes = parse_axes(spec)
+    method = _method(spec)
+    if method == "grid":
+        continuous = [a.name for a in axes if a.levels is None]
+        if continuous:
+            raise ValueError(f"Grid sweeps need discrete axes (values, range or linspace): {', '.join(continuous)}")
+        for combo in itertools.product(*(a.levels for a in axes)):
+            yield {a.name: _plain(v) for a, v in zip(axes, combo)}
+        return
+    samples = int(spec.get("samples") or 0)
+    if samples <= 0:
+        raise ValueError(f"Method '{method}' needs a positive 'samples' count")
+    rng = np.random.default_rng(spec.get("seed"))
+    if method == "random":
+        for _ in range(samples):
+            u = rng.random(len(axes))
+            yield {a.name: _plain(a.value(x)) for a, x in zip(axes, u)}
+        return
+    strata = np.stack([rng.permutation(samples) for _ in axes], axis=1)
+    u = (strata + rng.random((samples, len(axes)))) / samples
+    for row in u:
+        yield {a.name: _plain(a.value(x)) for a, x in zip(axes, row)}
+
+
+def _plain(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def scenario_id(sweep_id: str, point: Dict[str, Any]) -> str:
+    """Deterministic, slug-safe scenario ID for a design point."""
+    digest = hashlib.sha1(json.dumps(point, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"{sweep_id}-{digest[:10]}"
+
+
+def _axis_edits(axes: List[Axis], point: Dict[str, Any]) -> Dict[str, Any]:
+    scalars: List[Dict[str, Any]] = []
+    params: Dict[str, Dict[str, Any]] = {}
+    for axis in axes:
+        if axis.name not in point:
+            continue
+        if axis.key is None:
+            scalars.append({"name": axis.symbol, "value": point[axis.name]})
+        else:
+            entry = params.setdefault(axis.symbol, {"name": axis.symbol, "updates": []})
+            entry["updates"].append({"key": list(axis.key), "value": point[axis.name]})
+    return {"scalars": scalars, "parameters": list(params.values())}
+
+
+def _sweep_id(spec: Dict[str, Any]) -> str:
+    sid = spec.get("id")
+    if not sid or not isinstance(sid, str) or not _slug_re.match(sid):
+        raise ValueError("Matrix 'id' is required and must be slug-safe (letters, numbers, _ - .)")
+    return sid
+
+
+def _base(spec: Dict[str, Any], base_dir: Optional[Union[str, Path]] = None) -> Optional[Scenario]:
+    base = spec.get("base")
+    if base is None:
+        return None
+    if isinstance(base, dict):
+        return scenario_from_dict(base)
+    path = Path(base)
+    if not path.is_absolute():
+        path = Path(base_dir or spec.get("_dir") or ".") / path
+    return load_scenario(path)
+
+
+def scenario_for_point(spec: Dict[str, Any], point: Dict[str, Any], index: Optional[int] = None,
+                       base: Optional[Scenario] = None) -> Scenario:
+    """
+    Build the scenario for one design point: a delta on top of the base scenario with each
+    axis value set (replacing or adding the scalar / parameter record it targets). The base
+    stays its own layer, so all points of a sweep share its cached patch.
+
+    Args:
+        spec: Matrix spec
+        point: {axis name: value}; axes missing from the point keep the base value
+        index: Position in the design, recorded in meta
+        base: Pre-loaded base scenario (default: read from spec['base'])
+    """
+    sweep_id = _sweep_id(spec)
+    base = _base(spec) if base is None else base
+    return scenario_from_dict({
+        "id": scenario_id(sweep_id, point),
+        "description": spec.get("description") or f"{sweep_id} sweep point",
+        "edits": _axis_edits(parse_axes(spec), point),
+        "meta": {"sweep": {"id": sweep_id, "index": index, "point": dict(point)}},
+    }, base=base)
+
+
+def iter_scenarios(spec: Dict[str, Any], base_dir: Optional[Union[str, Path]] = None) -> Iterator[Scenario]:
+    """Lazily expand a matrix spec into scenarios, in design order."""
+    base = _base(spec, base_dir)
+    for i, point in enumerate(iter_points(spec)):
+        yield scenario_for_point(spec, point, i, base=base)
+
+
+def load_matrix(path: Union[str, Path]) -> Dict[str, Any]:
+    """Read a matrix.yaml; a relative 'base' path is resolved against the file's folder."""
+    path = Path(path)
+    spec = yaml.safe_load(path.read_text(encoding="utf-8"))
+    if not isinstance(spec, dict):
+        raise ValueError("Matrix YAML must be a mapping")
+    spec["_dir"] = str(path.resolve().parent)
+    _sweep_id(spec)
+    parse_axes(spec)
+    _method(spec)
+    return spec
+
@@ -0,0 +1,128 @@
+"""
+Symbol dependency graph for impact analysis.
+
+Built from the declarations and statement references of symbol_indexer: a symbol depends on
+the symbols its assignments and equation definitions read, a set-indexed declaration on its
+domain sets, a model on its equations, and the variables and equations of a solved model on
+the model itself. ``impacted`` follows these edges from edited symbols to every symbol whose
+values could differ, e.g. CapacityLimit -> cap -> toy -> x, z, obj.
+
+The condition of an if, loop, while, for or repeat is read by every statement in its body,
+including a solve, whose model then reads it. The analysis is otherwise static: statement
+order and $if/$ifThen branches are ignored, while execute_load, embedded code and macros are
+not followed at all. The impacted set is therefore a guide, not a proof: compare checks it
+against the content hashes of the runs instead of trusting it.
+"""
+from __future__ import annotations
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from .symbol_indexer import include_graph, references_in, symbols_in_order
+
+
+class DependencyGraph:
+    """
+    Read edges between the symbols of one model, keyed by lower-case name.
+    Model statements add their model names as nodes of kind "model".
+    """
+
+    def __init__(self, symbols: Iterable[Dict[str, Any]], references: Iterable[Dict[str, Any]]):
+        self.names: Dict[str, str] = {}
+        self.kinds: Dict[str, str] = {}
+        self.reads: Dict[str, Set[str]] = {}
+        for entry in symbols:
+            key = entry["name"].lower()
+            if key in self.names:
+                continue
+            self.names[key], self.kinds[key] = entry["name"], entry["type"]
+            self.reads[key] = {d.lower() for d in entry.get("domain") or [] if d != "*"}
+        references = list(references)
+        for ref in references:
+            if ref["kind"] == "model":
+                key = ref["targets"][0].lower()
+                self.names.setdefault(key, ref["targets"][0])
+                self.kinds.setdefault(key, "model")
+                self.reads.setdefault(key, set())
+        for ref in references:
+            if ref["kind"] == "equation":
+                self._add(ref["targets"][0], ref["reads"])
+            elif ref["kind"] == "assignment":
+                targets = [t for t in ref["targets"] if t.lower() in self.names]
+                if targets:
+                    self._add(targets[-1], ref["reads"])
+            elif ref["kind"] == "model":
+                reads = ref["reads"]
+                if any(r.lower() == "all" for r in reads):
+                    reads = [n for k, n in self.names.items() if self.kinds[k] == "equation"]
+                self._add(ref["targets"][0], reads)
+        for ref in references:
+            if ref["kind"] == "solve" and ref["targets"][0].lower() in self.names:
+                model = ref["targets"][0].lower()
+                self._add(model, [r for r in ref["reads"] if self.kinds.get(r.lower()) != "variable"])
+                for equation in [r for r in self.reads.get(model, ()) if self.kinds.get(r) == "equation"]:
+                    self.reads[equation].add(model)
+                    for name in [r for r in self.reads[equation] if self.kinds.get(r) == "variable"]:
+                        self.reads[name].add(model)
+        self._dependents: Optional[Dict[str, Set[str]]] = None
+
+    def _add(self, target: str, reads: Iterable[str]) -> None:
+        key = target.lower()
+        if key not in self.names:
+            return
+        self.reads[key].update(r.lower() for r in reads if r.lower() in self.names and r.lower() != key)
+
+    def dependents(self, name: str) -> Set[str]:
+        """Lower-case names of the symbols reading ``name`` directly."""
+        if self._dependents is None:
+            self._dependents = {}
+            for reader, reads in self.reads.items():
+                for read in reads:
+                    self._dependents.setdefault(read, set()).add(reader)
+        return self._dependents.get(str(name).lower(), set())
+
+    def impacted(self, changed: Iterable[str]) -> Set[str]:
+        """
+        Symbols whose values can change when the given symbols change, the given ones
+        included, as declared. Unknown names are ignored.
+        """
+        seen = {str(c).lower() for c in changed if str(c).lower() in self.names}
+        queue = deque(seen)
+        while queue:
+            for reader in self.dependents(queue.popleft()):
+                if reader not in seen:
+                    seen.add(reader)
+                    queue.append(reader)
+        return {self.names[k] for k in seen}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {self.names[k]: {"type": self.kinds[k], "reads": sorted(self.names[r] for r in reads)}
+                for k, reads in self.reads.items()}
+
+
+def dependency_graph(model_dir: Union[str, Path], main_file: str = "main.gms",
+                     include_dirs: Optional[Iterable[Union[str, Path]]] = None) -> DependencyGraph:
+    """DependencyGraph of a model, scanned through the persistent symbol index."""
+    graph = include_graph(Path(model_dir) / main_file, include_dirs=include_dirs, use_cache=True)
+    return DependencyGraph(symbols_in_order(graph), references_in(graph))
+
+
+def impacted_symbols(model_dir: Union[str, Path], changed: Iterable[str], main_file: str = "main.gms",
+                     include_dirs: Optional[Iterable[Union[str, Path]]] = None) -> Set[str]:
+    """Symbols of a model that can change when ``changed`` are edited (DependencyGraph.impacted)."""
+    return dependency_graph(model_dir, main_file, include_dirs).impacted(changed)
+
+
+def scenario_impact(graph: DependencyGraph, edits: Dict[str, Any]) -> Optional[Dict[str, List[str]]]:
+    """
+    Edited and impacted symbols of normalized scenario edits (scenario_merg.Scenario.edits).
+
+    Returns:
+        {"changed": [...], "impacted": [...]} sorted, or None when the scenario includes
+        equation files, whose effect the model's index does not cover
+    """
+    if (edits.get("equations") or {}).get("includes"):
+        return None
+    changed = [e["name"] for section in ("scalars", "parameters", "sets") for e in edits.get(section) or []]
+    return {"changed": sorted(set(changed), key=str.lower),
+            "impacted": sorted(graph.impacted(changed), key=str.lower)}
@@ -1,13 +1,23 @@
 """
 Symbol indexer for GAMS source files with GDX fallback.
 Follows spec in symbol_indexer_spec.md.
+
+Each source file is read once and turned into a token stream by a single-pass lexer
+(tokenize) built on compiled patterns: $onText/$offText blocks, column-1 '*' comments and
+inline '//' and '#' comments are dropped, quoted strings stay whole, /.../ data blocks of
+declaration statements become one 'data' token and dollar control lines one 'dollar' token.
+A small state machine (_parse) then walks the tokens to collect the declarations, including
+several symbols per statement and statements spanning many lines, and the references of the
+executable statements (see _references) for symbol_deps.
 """
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 import re
 import json
 
+from .include_graph import IncludeGraph, Loader, Scan, build_include_graph
+
 try:
     from .gdx_io_merg import read_gdx_transfer_full
 except ImportError:
@@ -16,283 +26,486 @@ except ImportError:
         return {}, {}, {}
 
 
-def scan_sources(files: List[Union[str, Path]]) -> List[Dict]:
+# (kind, text, line); kinds: word, number, string, punct, op, data, dollar, nl
+Token = Tuple[str, str, int]
+
+_CODE_RE = re.compile(r"""
+    \s*(?:
+    (?P<comment>//.*|\#.*)
+  | (?P<string>'[^'\n]*'|"[^"\n]*")
+  | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<punct>\.\.|[(),;/])
+  | (?P<op>\S)
+    )""", re.VERBOSE)
+# Body of a /.../ data block up to the closing slash or the end of the line
+_DATA_BODY_RE = re.compile(r"""(?:'[^'\n]*'|"[^"\n]*"|[^/\n])*""")
+_DOLLAR_RE = re.compile(r'\$\s*(\w*)')
+
+_KEYWORDS = {
+    'set': 'set', 'sets': 'set',
+    'scalar': 'scalar', 'scalars': 'scalar',
+    'parameter': 'parameter', 'parameters': 'parameter', 'table': 'parameter',
+    'variable': 'variable', 'variables': 'variable',
+    'equation': 'equation', 'equations': 'equation',
+    'alias': 'alias',
+}
+# Words that may precede a declaration keyword (Positive Variable, Singleton Set, ...)
+_QUALIFIERS = {'singleton', 'positive', 'negative', 'nonnegative', 'free', 'binary', 'integer',
+               'sos1', 'sos2', 'semicont', 'semiint'}
+# Statements whose /.../ blocks are data but which declare nothing we index
+_DATA_STATEMENTS = {'model', 'models', 'file', 'files', 'acronym', 'acronyms'}
+_STATEMENTS = set(_KEYWORDS) | _QUALIFIERS | _DATA_STATEMENTS
+
+
+def tokenize(text: str, first_line: int = 1) -> List[Token]:
     """
-    Scan GAMS source files for symbol declarations.
-    
+    Split GAMS source into tokens in one pass.
+
     Args:
-        files: List of GAMS source files to scan
-        
+        text: Source text
+        first_line: Line number of the first line of text
+
     Returns:
-        List of symbol dictionaries with {type, name, file, line, dim}
+        List of (kind, text, line) tokens; every source line that carries code ends in an 'nl'
+        token, a dollar control line is one 'dollar' token holding the stripped line and the
+        body of a /.../ block in a declaration statement is one 'data' token
     """
-    symbols = []
-    processed_files = set()
-    
-    for file_path in files:
-        symbols.extend(_scan_file(Path(file_path), processed_files, depth=0))
-    
-    return symbols
+    tokens: List[Token] = []
+    append = tokens.append
+    match_code = _CODE_RE.match
+    in_text = False
+    data: Optional[List[str]] = None  # chunks of an open /.../ block
+    data_line = 0
+    at_start = True  # next word starts a statement
+    decl = False     # current statement may carry /.../ data
+    last = 'nl'
+    for lineno, line in enumerate(text.splitlines(), first_line):
+        first = line[:1]
+        if in_text:
+            if first == '$' and _DOLLAR_RE.match(line).group(1).lower() == 'offtext':
+                in_text = False
+            continue
+        if first == '*':
+            continue
+        if first == '$':
+            if _DOLLAR_RE.match(line).group(1).lower() == 'ontext':
+                in_text = True
+            else:
+                append(('dollar', line.strip(), lineno))
+            continue
+        line = line.rstrip()
+        pos, end = 0, len(line)
+        if data is not None:
+            body = _DATA_BODY_RE.match(line)
+            data.append(body.group(0))
+            if body.end() == end:
+                continue
+            append(('data', '\n'.join(data), data_line))
+            data, pos, last = None, body.end() + 1, 'data'
+        while pos < end:
+            m = match_code(line, pos)
+            kind = m.lastgroup
+            if kind == 'comment':
+                break
+            value = m.group(kind)
+            if kind == 'word':
+                if value.lower() in _STATEMENTS and (at_start or last == 'nl'):
+                    decl = True
+                elif at_start:
+                    decl = False
+                at_start = False
+            elif kind == 'punct':
+                if value == ';':
+                    at_start, decl = True, False
+                elif value == '/' and decl:
+                    body = _DATA_BODY_RE.match(line, m.end())
+                    if body.end() == end:
+                        data, data_line = [body.group(0)], lineno
+                        pos = end
+                        break
+                    append(('data', body.group(0), lineno))
+                    pos, last = body.end() + 1, 'data'
+                    continue
+            append((kind, value, lineno))
+            last = kind
+            pos = m.end()
+        if data is None and last != 'nl':
+            append(('nl', '', lineno))
+            last = 'nl'
+    if data is not None:
+        append(('data', '\n'.join(data), data_line))
+    return tokens
 
 
-def _scan_file(file_path: Path, processed_files: set, depth: int = 0) -> List[Dict]:
+def _parse(tokens: List[Token], file_path: Path) -> Scan:
     """
-    Recursively scan a single GAMS file and its includes.
-    
-    Args:
-        file_path: Path to GAMS file
-        processed_files: Set of already processed files to avoid cycles
-        depth: Current include depth (max 3)
-        
+    Collect the declarations of a token stream.
+
     Returns:
-        List of symbol dictionaries
+        (index entries in source order, dollar control lines as (number of entries declared
+        before the line, text, line), references of the other statements)
+    """
+    symbols: List[Dict] = []
+    directives: List[Tuple[int, str, int]] = []
+    statements = _Statements()
+    kind: Optional[str] = None   # symbol type of the current declaration, '' in other statements
+    table = False
+    qualified = False
+    state = 'name'               # name | named | after | domain | body (of a table)
+    entry: Optional[Dict] = None
+    has_data = False
+    domain: List[str] = []
+    group: Optional[List[Tuple[str, int]]] = None  # names inside alias parentheses
+    prev = 'nl'
+    for tok_kind, text, line in tokens:
+        if tok_kind == 'dollar':
+            directives.append((len(symbols), text, line))
+            continue
+        boundary, prev = prev == 'nl' or kind is None, tok_kind
+        if tok_kind == 'punct' and text == ';':
+            statements.end()
+            kind, entry, state, group, qualified = None, None, 'name', None, False
+            continue
+        if tok_kind == 'word':
+            low = text.lower()
+            if low in _KEYWORDS and (boundary or qualified):
+                kind, table, qualified = _KEYWORDS[low], low == 'table', False
+                state, entry = 'name', None
+                statements.end()
+                continue
+            if boundary and low in _QUALIFIERS:
+                kind, qualified = '', True
+                continue
+            if kind is None:
+                kind = ''
+        elif kind is None:
+            kind = ''
+        if not kind:
+            if tok_kind != 'nl' and not qualified:
+                statements.add((tok_kind, text, line))
+            continue
+
+        if kind == 'alias':
+            if text == '(' and tok_kind == 'punct':
+                group = []
+            elif text == ')' and group is not None:
+                for name, at in group[1:]:
+                    symbols.append(_symbol('alias', name, file_path, at, 1, [group[0][0]], None))
+                group = None
+            elif tok_kind == 'word' and group is not None:
+                group.append((text, line))
+            continue
+
+        if state == 'body':
+            continue
+        if state == 'domain':
+            if tok_kind == 'word' or text == '*':
+                domain.append(text)
+            elif text == ')':
+                entry['domain'], entry['dim'] = domain, len(domain)
+                state = 'after'
+            continue
+        if tok_kind == 'data':
+            if state == 'named':
+                state = 'after'
+            if entry is not None and not has_data:
+                has_data = True
+                if kind == 'set':
+                    elements = _set_elements(text)
+                    if elements is not None:
+                        entry['elements'] = elements
+            continue
+        if state == 'name':
+            if tok_kind == 'word':
+                entry, has_data = _symbol(kind, text, file_path, line, 0, [], None), False
+                symbols.append(entry)
+                state = 'named'
+            continue
+        if state == 'named':
+            state = 'after'
+            if text == '(' and tok_kind == 'punct':  # a domain only directly after the name
+                domain, state = [], 'domain'
+                continue
+        # state == 'after': description, data, then a separator
+        if tok_kind == 'nl' or (text == ',' and tok_kind == 'punct'):
+            state = 'body' if table and tok_kind == 'nl' else 'name'
+    return symbols, directives, statements.close()
+
+
+_CONTROLS = {'if', 'loop', 'while', 'for', 'repeat'}
+
+
+class _Statements:
+    """
+    References of the executable statements of a token stream (see _references). The
+    condition of an enclosing control structure (if / elseif, loop, while, for, repeat ...
+    until) is added to the reads of every statement in its body, however many there are.
     """
-    if depth > 3 or file_path in processed_files or not file_path.exists():
+
+    def __init__(self):
+        self.references: List[Dict] = []
+        self.tokens: List[Token] = []  # current statement, control headers left out
+        self.depth = 0
+        self.frames: List[Dict] = []   # open control structures, innermost last
+
+    def add(self, token: Token) -> None:
+        kind, text, _ = token
+        frame = self.frames[-1] if self.frames else None
+        if kind == 'punct' and text == '(':
+            if self.tokens and self.tokens[-1][0] == 'word' and self.tokens[-1][1].lower() in _CONTROLS:
+                control = self.tokens.pop()[1].lower()
+                self.end()
+                # header: the condition up to the first ',' ('until' collects repeat's condition)
+                self.frames.append({'depth': self.depth, 'condition': [], 'refs': [], 'header': control != 'repeat'})
+                self.depth += 1
+                return
+            self.depth += 1
+        elif kind == 'punct' and text == ')':
+            self.depth -= 1
+            if frame is not None and self.depth == frame['depth']:
+                self._close()
+                return
+        if frame is not None and self.depth == frame['depth'] + 1:
+            low = text.lower() if kind == 'word' else None
+            if kind == 'punct' and text == ',' and frame['header'] is True:
+                frame['header'] = False
+                return
+            if low in ('elseif', 'until'):
+                self.end()
+                frame['header'] = True if low == 'elseif' else 'until'
+                return
+            if low == 'else':
+                self.end()
+                return
+        if frame is not None and frame['header']:
+            frame['condition'].append(token)
+        else:
+            self.tokens.append(token)
+
+    def end(self) -> None:
+        """End the current statement (at ';' or where a declaration starts)."""
+        if self.tokens:
+            self._emit(_references(self.tokens))
+            self.tokens = []
+
+    def close(self) -> List[Dict]:
+        """References of the whole stream; control structures still open are closed."""
+        while self.frames:
+            self._close()
+        self.end()
+        return self.references
+
+    def _emit(self, refs: List[Dict]) -> None:
+        (self.frames[-1]['refs'] if self.frames else self.references).extend(refs)
+
+    def _close(self) -> None:
+        self.end()
+        frame = self.frames.pop()
+        condition = _words(frame['condition'])
+        for ref in frame['refs']:
+            ref['reads'] = list(dict.fromkeys(ref['reads'] + condition))
+        self._emit(frame['refs'])
+
+
+_RELATIONS = {'e', 'l', 'g', 'n', 'x', 'c', 'b'}  # =e=, =l=, ...
+_OBJECTIVE_SENSES = {'min', 'max', 'minimizing', 'maximizing'}
+_NAME_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+def _words(tokens: List[Token]) -> List[str]:
+    """Distinct identifiers of a statement, without attribute suffixes (x.l) and relation letters (=e=)."""
+    out = []
+    for i, (kind, text, _) in enumerate(tokens):
+        if kind != 'word':
+            continue
+        before = tokens[i - 1][1] if i else ''
+        if before == '.' or (before == '=' and text.lower() in _RELATIONS
+                             and i + 1 < len(tokens) and tokens[i + 1][1] == '='):
+            continue
+        out.append(text)
+    return list(dict.fromkeys(out))
+
+
+def _references(statement: List[Token]) -> List[Dict]:
+    """
+    What one executable statement writes and reads, names as written.
+
+    Returns:
+        [{"kind", "targets", "reads", "line"}]: kind "equation" (definition; targets holds the
+        equation), "assignment" (targets: the names left of '=' outside index lists, the
+        assigned symbol being the last declared one), "model" (targets: the model, reads: its
+        equation list) or "solve" (targets: the model, reads: the objective variable)
+    """
+    kind, first, line = statement[0]
+    first = first.lower() if kind == 'word' else ''
+    if first in ('model', 'models'):
+        out, name = [], None
+        for tok_kind, text, _ in statement[1:]:
+            if tok_kind == 'word':
+                name = text
+            elif tok_kind == 'data' and name is not None:
+                out.append({'kind': 'model', 'targets': [name], 'reads': _NAME_RE.findall(text), 'line': line})
+                name = None
+        return out
+    lowered = [t[1].lower() if t[0] == 'word' else None for t in statement]
+    if 'solve' in lowered:
+        at = lowered.index('solve')
+        rest = [t[1] for t in statement[at + 1:] if t[0] == 'word']
+        objective = [w for s, w in zip(rest, rest[1:]) if s.lower() in _OBJECTIVE_SENSES][:1]
+        return [{'kind': 'solve', 'targets': rest[:1], 'reads': objective, 'line': statement[at][2]}] if rest else []
+    if any(kind == 'punct' and text == '..' for kind, text, _ in statement):
+        if kind != 'word':
+            return []
+        return [{'kind': 'equation', 'targets': [statement[0][1]], 'reads': _words(statement[1:]), 'line': line}]
+    depth, best, best_depth = 0, None, None
+    depths = []
+    for i, (tok_kind, text, _) in enumerate(statement):
+        if text == '(' and tok_kind == 'punct':
+            depth += 1
+        elif text == ')' and tok_kind == 'punct':
+            depth -= 1
+        depths.append(depth)
+        if tok_kind == 'op' and text == '=' and (best_depth is None or depth < best_depth):
+            before = statement[i - 1][1] if i else ''
+            after = statement[i + 1][1] if i + 1 < len(statement) else ''
+            if before not in ('<', '>', '=', '!') and after != '=' and not (
+                    before.lower() in _RELATIONS and i > 1 and statement[i - 2][1] == '='):
+                best, best_depth = i, depth
+    if best is None:
         return []
-    
-    processed_files.add(file_path)
-    symbols = []
-    
+    targets = _words([t if d == best_depth else ('op', '', 0) for t, d in zip(statement[:best], depths[:best])])
+    return [{'kind': 'assignment', 'targets': targets, 'reads': _words(statement), 'line': line}]
+
+
+def _index_source(text: str, file_path: Path) -> Scan:
+    """Declarations, dollar control lines and statement references of one source file (see _parse)."""
+    return _parse(tokenize(text), file_path)
+
+
+def scan_sources(files: List[Union[str, Path]], loader: Optional[Loader] = None,
+                 include_dirs: Optional[Iterable[Union[str, Path]]] = None,
+                 max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Scan GAMS source files and everything they include for symbol declarations.
+
+    A symbol declared again later (Positive Variable x after Variable x(i)) keeps its first
+    entry; domain and set elements missing there are taken from the redeclaration.
+
+    Args:
+        files: List of GAMS source files to scan
+        loader: loader(path) returning the declarations and dollar control lines of one file
+            (see _parse), or None if it cannot be read; default reads and scans the file
+            (symbol_store.SymbolStore.load serves them from the persistent index)
+        include_dirs: Include directories searched for relative include targets (IDIR)
+        max_workers: Threads scanning include files concurrently
+
+    Returns:
+        List of symbol dictionaries with {type, name, file, line, dim, domain}
+    """
+    graph = build_include_graph([Path(f) for f in files], loader or _read_declarations,
+                                include_dirs=include_dirs, max_workers=max_workers)
+    return symbols_in_order(graph)
+
+
+def symbols_in_order(graph: IncludeGraph) -> List[Dict]:
+    """Declarations of an include graph in include order, redeclarations merged."""
+    return _merge_redeclarations([s for key, start, end in graph.order for s in graph.scans[key][0][start:end]])
+
+
+def _merge_redeclarations(symbols: List[Dict]) -> List[Dict]:
+    merged: Dict[str, Dict] = {}
+    out = []
+    for entry in symbols:
+        key = entry['name'].lower()
+        first = merged.get(key)
+        if first is None:
+            merged[key] = entry
+            out.append(entry)
+            continue
+        if not first.get('domain') and entry.get('domain'):
+            first['domain'], first['dim'] = entry['domain'], entry['dim']
+        if first['type'] == 'set' and 'elements' not in first and 'elements' in entry:
+            first['elements'] = entry['elements']
+    return out
+
+
+def _read_declarations(file_path: Path) -> Optional[Scan]:
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
     except (UnicodeDecodeError, OSError):
-        return []
-    
-    # Split into lines for processing
-    lines = content.splitlines()
-    
-    # Track multi-line symbol declarations
-    current_declaration = None
-    declaration_start_line = 0
-    
-    for line_num, line in enumerate(lines, 1):
-        line_stripped = line.strip()
-        
-        # Skip comments
-        if line_stripped.startswith('*') or line_stripped.startswith('//'):
-            continue
-            
-        # Process includes
-        include_match = re.search(r'\$include\s+["\']?([^"\';\s]+)["\']?', line, re.IGNORECASE)
-        if include_match:
-            include_file = file_path.parent / include_match.group(1)
-            symbols.extend(_scan_file(include_file, processed_files, depth + 1))
-            continue
-        
-        # Check if this line starts a new symbol declaration
-        new_declaration = _detect_symbol_declaration_start(line)
-        if new_declaration:
-            # If we have a pending declaration, process it
-            if current_declaration:
-                symbols.extend(_process_multi_line_declaration(current_declaration, file_path, declaration_start_line))
-            
-            # Start new declaration
-            current_declaration = {'type': new_declaration, 'lines': [line], 'complete': ';' in line}
-            declaration_start_line = line_num
-        elif current_declaration:
-            # Continue existing declaration
-            current_declaration['lines'].append(line)
-            if ';' in line:
-                current_declaration['complete'] = True
-        
-        # If declaration is complete, process it
-        if current_declaration and current_declaration['complete']:
-            symbols.extend(_process_multi_line_declaration(current_declaration, file_path, declaration_start_line))
-            current_declaration = None
-        
-        # Also try single-line processing for simple cases
-        symbols.extend(_extract_symbols_from_line(line, file_path, line_num))
-    
-    # Process any remaining declaration
-    if current_declaration:
-        symbols.extend(_process_multi_line_declaration(current_declaration, file_path, declaration_start_line))
-    
-    return symbols
+        return None
+    return _index_source(content, file_path)
 
 
-def _detect_symbol_declaration_start(line: str) -> Optional[str]:
-    """Detect if a line starts a symbol declaration block."""
-    line_lower = line.lower().strip()
-    
-    if re.match(r'\bsets?\s*$', line_lower):
-        return 'set'
-    elif re.match(r'\bset\s*$', line_lower):
-        return 'set' 
-    elif re.match(r'\bscalars?\s*$', line_lower):
-        return 'scalar'
-    elif re.match(r'\bscalar\s*$', line_lower):
-        return 'scalar'
-    elif re.match(r'\bparameters?\s*$', line_lower):
-        return 'parameter'
-    elif re.match(r'\bparameter\s*$', line_lower):
-        return 'parameter'
-    elif re.match(r'\bvariables?\s*$', line_lower):
-        return 'variable'
-    elif re.match(r'\bvariable\s*$', line_lower):
-        return 'variable'
-    elif re.match(r'\bequations?\s*$', line_lower):
-        return 'equation'
-    elif re.match(r'\bequation\s*$', line_lower):
-        return 'equation'
-    
-    return None
+def include_graph(main_path: Union[str, Path], include_dirs: Optional[Iterable[Union[str, Path]]] = None,
+                  max_workers: Optional[int] = None, use_cache: bool = False) -> IncludeGraph:
+    """
+    Resolved include graph of a model, with every file's scan in ``scans``
+    (IncludeGraph.to_dict() gives the graph as plain data).
 
+    Args:
+        main_path: Main .gms file
+        include_dirs: Include directories (IDIR)
+        max_workers: Threads scanning include files concurrently
+        use_cache: Serve unchanged files from the persistent index (symbol_store)
+    """
+    main_path = Path(main_path)
+    if use_cache:
+        from .symbol_store import model_graph
+        graph = model_graph(main_path.parent, main_path.name, include_dirs=include_dirs)
+        if graph is not None:
+            return graph
+    return build_include_graph([main_path], _read_declarations, include_dirs=include_dirs, max_workers=max_workers)
 
-def _process_multi_line_declaration(declaration: Dict, file_path: Path, start_line: int) -> List[Dict]:
-    """Process a multi-line symbol declaration."""
-    symbols = []
-    symbol_type = declaration['type']
-    
-    # Join all lines and extract symbols
-    full_text = ' '.join(declaration['lines'])
-    
-    # Remove the keyword from the beginning
-    patterns = [
-        r'\bsets?\s*',
-        r'\bset\s*', 
-        r'\bscalars?\s*',
-        r'\bscalar\s*',
-        r'\bparameters?\s*',
-        r'\bparameter\s*',
-        r'\bvariables?\s*',
-        r'\bvariable\s*',
-        r'\bequations?\s*',
-        r'\bequation\s*'
-    ]
-    
-    for pattern in patterns:
-        full_text = re.sub(pattern, '', full_text, flags=re.IGNORECASE)
-    
-    # Parse symbols from the remaining text
-    parsed_symbols = _parse_symbol_declarations(full_text, symbol_type)
-    
-    for name, dim in parsed_symbols:
-        symbols.append({
-            'type': symbol_type,
-            'name': name,
-            'file': str(file_path),
-            'line': start_line,
-            'dim': dim
-        })
-    
-    return symbols
+
+def references_in(graph: IncludeGraph) -> List[Dict]:
+    """Statement references (see _references) of every file of an include graph."""
+    return [ref for scanned in graph.scans.values() if scanned is not None for ref in scanned[2]]
 
 
 def _extract_symbols_from_line(line: str, file_path: Path, line_num: int) -> List[Dict]:
     """
     Extract symbol declarations from a single line of GAMS code.
     """
-    symbols = []
-    line_lower = line.lower().strip()
-    
-    # Skip comments
-    if line_lower.startswith('*') or line_lower.startswith('//'):
-        return symbols
-    
-    # Define patterns for each symbol type
-    patterns = {
-        'set': [r'\bsets?\s+', r'\bset\s+'],
-        'scalar': [r'\bscalars?\s+', r'\bscalar\s+'],
-        'parameter': [r'\bparameters?\s+', r'\bparameter\s+'],
-        'variable': [r'\bvariables?\s+', r'\bvariable\s+'],
-        'equation': [r'\bequations?\s+', r'\bequation\s+']
-    }
-    
-    for symbol_type, type_patterns in patterns.items():
-        for pattern in type_patterns:
-            match = re.search(pattern + r'(.+)', line, re.IGNORECASE)
-            if match:
-                # Extract everything after the keyword
-                symbols_text = match.group(1)
-                
-                # Parse symbols from this text
-                parsed_symbols = _parse_symbol_declarations(symbols_text, symbol_type)
-                
-                for name, dim in parsed_symbols:
-                    symbols.append({
-                        'type': symbol_type,
-                        'name': name,
-                        'file': str(file_path),
-                        'line': line_num,
-                        'dim': dim
-                    })
-                
-                # Only match first pattern found
-                return symbols
-    
-    return symbols
+    return _parse(tokenize(line, line_num), file_path)[0]
 
 
-def _parse_symbol_declarations(text: str, symbol_type: str) -> List[tuple]:
-    """
-    Parse symbol declarations from text after the keyword.
-    Returns list of (name, dimension) tuples.
-    """
-    symbols = []
-    
-    # First split by newlines to handle multi-line declarations
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    
-    for line in lines:
-        # Skip empty lines and comments
-        if not line or line.startswith('*') or line.startswith('//'):
-            continue
-            
-        # Remove quoted strings and value assignments
-        clean_line = re.sub(r"'[^']*'", '', line)
-        clean_line = re.sub(r'"[^"]*"', '', clean_line)
-        clean_line = re.sub(r'/[^/]*/', '', clean_line)
-        clean_line = re.sub(r';.*$', '', clean_line)
-        
-        # Split by commas but respect parentheses
-        parts = _split_respecting_parens(clean_line, ',')
-        
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-                
-            # Extract name and dimensions
-            if '(' in part:
-                name = part.split('(')[0].strip()
-                dims_part = part.split('(')[1].split(')')[0]
-                # Count dimensions
-                dim = len([d.strip() for d in dims_part.split(',') if d.strip()]) if dims_part.strip() else 0
-            else:
-                name = part.strip()
-                dim = 0
-            
-            # Validate name
-            if re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', name):
-                symbols.append((name, dim))
-    
-    return symbols
+def _symbol(symbol_type: str, name: str, file_path: Path, line: int, dim: int,
+            domain: List[str], elements: Optional[List[str]]) -> Dict:
+    """Index entry; 'domain' lists the declared domain sets, 'elements' the inline data of a set."""
+    entry = {'type': symbol_type, 'name': name, 'file': str(file_path), 'line': line, 'dim': dim, 'domain': domain}
+    if symbol_type == 'set' and elements is not None:
+        entry['elements'] = elements
+    return entry
 
 
-def _split_respecting_parens(text: str, delimiter: str) -> List[str]:
-    """Split text by delimiter but respect parentheses nesting."""
-    parts = []
-    current = ""
-    paren_count = 0
-    
-    for char in text:
-        if char == '(':
-            paren_count += 1
-        elif char == ')':
-            paren_count -= 1
-        elif char == delimiter and paren_count == 0:
-            if current.strip():
-                parts.append(current.strip())
-            current = ""
+_DATA_ITEM_RE = re.compile(r"""(?:'[^'\n]*'|"[^"\n]*"|[^,\n'"])+""")
+_LABEL_RE = re.compile(r"""'([^'\n]*)'|"([^"\n]*)"|(\S+)""")
+_RANGE_RE = re.compile(r'^(.*?)(\d+)\*(.*?)(\d+)$')
+
+
+def _set_elements(data: str) -> Optional[List[str]]:
+    """Element labels of inline set data ('a', 'b "text"', 'x1*x3'); None if not understood."""
+    elements = []
+    for item in _DATA_ITEM_RE.findall(data):
+        m = _LABEL_RE.search(item)
+        if m is None:
             continue
-        
-        current += char
-    
-    if current.strip():
-        parts.append(current.strip())
-    
-    return parts
+        if m.group(3) is None:
+            elements.append(m.group(1) if m.group(1) is not None else m.group(2))
+            continue
+        label = m.group(3)
+        if '(' in label or ')' in label:
+            return None
+        r = _RANGE_RE.match(label)
+        if r and r.group(1) == r.group(3) and int(r.group(2)) <= int(r.group(4)):
+            width = len(r.group(2)) if r.group(2).startswith('0') else 0
+            elements.extend(f"{r.group(1)}{n:0{width}d}" for n in range(int(r.group(2)), int(r.group(4)) + 1))
+        else:
+            elements.append(label)
+    return elements
 
 
 def save_index(index: List[Dict], path: Union[str, Path]) -> Path:
@@ -356,7 +569,8 @@ def fallback_to_gdx(gdx_path: Union[str, Path]) -> List[Dict]:
 
 
 def create_symbol_index(model_dir: Union[str, Path], main_file: str = "main.gms", 
-                       gdx_fallback: Optional[Union[str, Path]] = None) -> List[Dict]:
+                       gdx_fallback: Optional[Union[str, Path]] = None, use_cache: bool = True,
+                       include_dirs: Optional[Iterable[Union[str, Path]]] = None) -> List[Dict]:
     """
     Create comprehensive symbol index for a GAMS model.
     
@@ -364,6 +578,8 @@ def create_symbol_index(model_dir: Union[str, Path], main_file: str = "main.gms"
         model_dir: Directory containing GAMS model
         main_file: Main GAMS file to start scanning from
         gdx_fallback: Optional GDX file to use as fallback source
+        use_cache: Serve unchanged files from the persistent index (symbol_store)
+        include_dirs: Include directories (IDIR) searched for include files
         
     Returns:
         List of symbol dictionaries
@@ -373,7 +589,7 @@ def create_symbol_index(model_dir: Union[str, Path], main_file: str = "main.gms"
     
     # Try to scan source files first
     if main_path.exists():
-        symbols = scan_sources([main_path])
+        symbols = symbols_in_order(include_graph(main_path, include_dirs=include_dirs, use_cache=use_cache))
         if symbols:
             return symbols
     
@@ -0,0 +1,258 @@
+"""
+Persistent, incremental symbol index.
+
+The per-file results of symbol_indexer (declarations, dollar control lines and statement
+references) are kept in
+SQLite, keyed by a hash of the file contents; a (path, size, mtime) table maps files to their
+hashes, so an unchanged file is neither read nor hashed again. A file's own results do not
+depend on the files it includes: after an edit only the edited files are rescanned, and the
+include expansion is redone from stored rows. Each indexed model records the files it reached,
+which backs lookups by name, type and file (query_symbols).
+
+The database sits in SYMBOL_CACHE_DIR (GAMS_SYMBOL_CACHE via env.cache_dir); "off" scans
+every time.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .env import cache_dir
+from .provenance import _new_hasher
+from .include_graph import IncludeGraph, Scan, build_include_graph
+from .symbol_indexer import _index_source, _symbol, scan_sources, symbols_in_order
+
+SYMBOL_INDEX_VERSION = 4  # bump when scanning changes in a way that alters stored results
+SYMBOL_CACHE_DIR: Optional[Path] = cache_dir("GAMS_SYMBOL_CACHE", "symbols")
+STORE_FILENAME = "symbol_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scans (
+    digest TEXT PRIMARY KEY,
+    directives TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    digest TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    lname TEXT NOT NULL,
+    type TEXT NOT NULL,
+    line INTEGER,
+    dim INTEGER,
+    domain TEXT,
+    elements TEXT,
+    PRIMARY KEY (digest, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_symbols_lname ON symbols (lname);
+CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols (type);
+CREATE TABLE IF NOT EXISTS refs (
+    digest TEXT PRIMARY KEY,
+    refs TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS model_files (
+    model TEXT NOT NULL,
+    path TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (model, path)
+);
+"""
+
+class SymbolStore:
+    """
+    Connection to the symbol index database; ``load`` is a symbol_indexer loader.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _stored(self, digest: str, file_path: Path, symbols: bool = True) -> Optional[Scan]:
+        row = self._conn.execute("SELECT directives FROM scans WHERE digest = ?", [digest]).fetchone()
+        if row is None:
+            return None
+        directives = [tuple(d) for d in json.loads(row[0])]
+        if not symbols:
+            return [], directives, []
+        refs = self._conn.execute("SELECT refs FROM refs WHERE digest = ?", [digest]).fetchone()
+        if refs is None:
+            return None
+        rows = self._conn.execute(
+            "SELECT name, type, line, dim, domain, elements FROM symbols WHERE digest = ? ORDER BY seq", [digest])
+        return [_symbol(t, n, file_path, line, dim, json.loads(dom), json.loads(el) if el is not None else None)
+                for n, t, line, dim, dom, el in rows], directives, json.loads(refs[0])
+
+    def load(self, file_path: Path, symbols: bool = True) -> Optional[Scan]:
+        """
+        Declarations, dollar control lines and references of one file, scanning it only if it
+        changed. With symbols=False the declarations and references of an unchanged file are
+        not read back.
+        """
+        resolved = str(Path(file_path).resolve())
+        try:
+            st = os.stat(resolved)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?", [resolved]).fetchone()
+            if row is not None and (row[0], row[1]) == (st.st_size, st.st_mtime_ns):
+                stored = self._stored(row[2], file_path, symbols)
+                if stored is not None:
+                    return stored
+        try:
+            raw = Path(resolved).read_bytes()
+            content = raw.decode("utf-8")
+        except (UnicodeDecodeError, OSError):
+            return None
+        h = _new_hasher()
+        h.update(f"{SYMBOL_INDEX_VERSION}\0".encode("utf-8"))
+        h.update(raw)
+        digest = h.hexdigest()
+        with self._lock:
+            stored = self._stored(digest, file_path)  # same contents under another path or mtime
+        scanned = stored is None
+        if scanned:
+            stored = _index_source(content, file_path)  # outside the lock: files scan concurrently
+        with self._lock:
+            if scanned:
+                declared, directives, references = stored
+                self._conn.execute("INSERT OR REPLACE INTO scans (digest, directives) VALUES (?, ?)",
+                                   [digest, json.dumps(directives)])
+                self._conn.execute("INSERT OR REPLACE INTO refs (digest, refs) VALUES (?, ?)",
+                                   [digest, json.dumps(references)])
+                self._conn.execute("DELETE FROM symbols WHERE digest = ?", [digest])
+                self._conn.executemany(
+                    "INSERT INTO symbols (digest, seq, name, lname, type, line, dim, domain, elements) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(digest, i, s["name"], s["name"].lower(), s["type"], s["line"], s["dim"], json.dumps(s["domain"]),
+                      json.dumps(s["elements"]) if "elements" in s else None) for i, s in enumerate(declared)])
+            self._conn.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                               [resolved, st.st_size, st.st_mtime_ns, digest])
+            self._conn.commit()
+        return stored
+
+    def record_model(self, model: str, files: List[Path]) -> None:
+        """Remember the files a model reached, in scan order."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM model_files WHERE model = ?", [model])
+            self._conn.executemany("INSERT OR IGNORE INTO model_files (model, path, seq) VALUES (?, ?, ?)",
+                                   [(model, str(Path(f).resolve()), i) for i, f in enumerate(files)])
+
+    def query(self, model: str, name: Optional[str] = None, type: Optional[str] = None,
+              file: Optional[Union[str, Path]] = None) -> List[Dict[str, Any]]:
+        """Declarations of a recorded model matching all given filters, in scan order."""
+        clauses, params = ["m.model = ?"], [model]
+        if name is not None:
+            clauses.append("s.lname = ?"); params.append(str(name).lower())
+        if type is not None:
+            clauses.append("s.type = ?"); params.append(type)
+        if file is not None:
+            clauses.append("m.path = ?"); params.append(str(Path(file).resolve()))
+        sql = ("SELECT m.path, s.name, s.type, s.line, s.dim, s.domain, s.elements FROM model_files m "
+               "JOIN files f ON f.path = m.path JOIN symbols s ON s.digest = f.digest "
+               f"WHERE {' AND '.join(clauses)} ORDER BY m.seq, s.seq")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_symbol(t, n, p, line, dim, json.loads(dom), json.loads(el) if el is not None else None)
+                for p, n, t, line, dim, dom, el in rows]
+
+
+def open_store(cache_dir: Optional[Union[str, Path]] = None) -> Optional[SymbolStore]:
+    """SymbolStore in cache_dir (default SYMBOL_CACHE_DIR); None if disabled or not writable."""
+    root = Path(cache_dir) if cache_dir is not None else SYMBOL_CACHE_DIR
+    if root is None:
+        return None
+    try:
+        return SymbolStore(root / STORE_FILENAME)
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def _model_key(model_dir: Union[str, Path], main_file: str) -> str:
+    return str((Path(model_dir) / main_file).resolve())
+
+
+def _refresh(store: SymbolStore, model_dir: Union[str, Path], main_file: str, symbols: bool = True,
+             include_dirs: Optional[Iterable[Union[str, Path]]] = None) -> IncludeGraph:
+    graph = build_include_graph([Path(model_dir) / main_file], lambda path: store.load(path, symbols),
+                                include_dirs=include_dirs)
+    store.record_model(_model_key(model_dir, main_file),
+                       [Path(f) for f in graph.files if graph.scans.get(os.path.realpath(f)) is not None])
+    return graph
+
+
+def model_graph(model_dir: Union[str, Path], main_file: str = "main.gms",
+                cache_dir: Optional[Union[str, Path]] = None,
+                include_dirs: Optional[Iterable[Union[str, Path]]] = None) -> Optional[IncludeGraph]:
+    """
+    Include graph of a model with every file's scan, served from the persistent index.
+
+    Returns:
+        The IncludeGraph, or None when the store is disabled or unavailable
+    """
+    store = open_store(cache_dir)
+    if store is None:
+        return None
+    try:
+        return _refresh(store, model_dir, main_file, include_dirs=include_dirs)
+    except sqlite3.Error:
+        return None
+    finally:
+        store.close()
+
+
+def indexed_symbols(model_dir: Union[str, Path], main_file: str = "main.gms",
+                    cache_dir: Optional[Union[str, Path]] = None,
+                    include_dirs: Optional[Iterable[Union[str, Path]]] = None) -> Optional[List[Dict]]:
+    """
+    symbol_indexer.scan_sources of a model's main file through the persistent index.
+
+    Returns:
+        The symbol index, or None when the store is disabled or unavailable
+    """
+    graph = model_graph(model_dir, main_file, cache_dir, include_dirs)
+    return symbols_in_order(graph) if graph is not None else None
+
+
+def query_symbols(
+    model_dir: Union[str, Path],
+    main_file: str = "main.gms",
+    name: Optional[str] = None,
+    type: Optional[str] = None,
+    file: Optional[Union[str, Path]] = None,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Look up declarations of a model by name (case-insensitive), type and/or file.
+
+    The model is refreshed first, rescanning only changed files. Every declaration is
+    returned, redeclarations included, with resolved paths in 'file'. Without a store the
+    model is scanned and filtered in memory.
+    """
+    store = open_store(cache_dir)
+    if store is None:
+        file = str(Path(file).resolve()) if file is not None else None
+        return [s for s in scan_sources([Path(model_dir) / main_file])
+                if (name is None or s["name"].lower() == str(name).lower()) and (type is None or s["type"] == type)
+                and (file is None or str(Path(s["file"]).resolve()) == file)]
+    try:
+        _refresh(store, model_dir, main_file, symbols=False)
+        return store.query(_model_key(model_dir, main_file), name=name, type=type, file=file)
+    finally:
+        store.close()
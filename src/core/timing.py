@@ -0,0 +1,111 @@
+"""
+Per-phase timing for GAMS runs.
+
+PhaseTimer records wall-clock phases of run_gams_v49 (copy, scenario, patch build, GAMS, collection,
+hashing), emits one JSON log event per phase and produces the ``timings`` block stored in run.json.
+aggregate_timings summarises those blocks across a batch of runs.
+"""
+from __future__ import annotations
+import json
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+import pandas as pd
+
+from .listing_parser import parse_listing, solve_times
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimer:
+    """Accumulates high-resolution phase durations for one run."""
+
+    def __init__(self, label: Optional[str] = None):
+        self.label = label
+        self.phases: Dict[str, float] = {}
+        self.reported: Dict[str, Dict[str, float]] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as phase ``name`` (repeated phases accumulate)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float, source: str = "wall") -> None:
+        """
+        Record a phase duration.
+
+        Wall phases do not overlap and sum to roughly total_s; other sources (e.g. "listing" for
+        GAMS-reported compile/solve times) are kept separately because they overlap wall phases.
+        """
+        bucket = self.phases if source == "wall" else self.reported.setdefault(source, {})
+        bucket[name] = bucket.get(name, 0.0) + seconds
+        event = {"event": "run_phase", "run": self.label, "phase": name, "seconds": round(seconds, 6), "source": source}
+        logger.info(json.dumps(event))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Timings block for run.json: {"phases": {...}, <source>: {...}, "total_s": seconds}."""
+        out: Dict[str, Any] = {"phases": {k: round(v, 6) for k, v in self.phases.items()}}
+        for source, values in self.reported.items():
+            out[source] = {k: round(v, 6) for k, v in values.items()}
+        out["total_s"] = round(self.elapsed(), 6)
+        return out
+
+
+def listing_times(lst_path: Union[str, Path, None]) -> Dict[str, float]:
+    """
+    Read GAMS-reported times from a listing file.
+
+    Returns a dict with any of "compile", "generation", "solve" and "execution" seconds;
+    generation and solver resource usage are summed over all solves.
+    """
+    return solve_times(parse_listing(lst_path))
+
+
+def aggregate_timings(run_dirs: Iterable[Union[str, Path]]) -> pd.DataFrame:
+    """
+    Summarise per-phase timings across runs.
+
+    Args:
+        run_dirs: Run directories containing run.json with a ``timings`` block
+
+    Returns:
+        DataFrame with phase, runs, mean_s, median_s, p95_s, max_s, total_s and share
+        (fraction of the summed run wall time), slowest phase first. GAMS-reported times
+        appear as "listing:<name>" and overlap the "gams" wall phase.
+    """
+    rows = []
+    for run_dir in run_dirs:
+        try:
+            meta = json.loads((Path(run_dir) / "run.json").read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        timings = meta.get("timings") or {}
+        for phase, seconds in (timings.get("phases") or {}).items():
+            rows.append({"run": Path(run_dir).name, "phase": phase, "seconds": float(seconds)})
+        for phase, seconds in (timings.get("listing") or {}).items():
+            rows.append({"run": Path(run_dir).name, "phase": f"listing:{phase}", "seconds": float(seconds)})
+        if timings.get("total_s") is not None:
+            rows.append({"run": Path(run_dir).name, "phase": "total", "seconds": float(timings["total_s"])})
+    cols = ["phase", "runs", "mean_s", "median_s", "p95_s", "max_s", "total_s", "share"]
+    if not rows:
+        return pd.DataFrame(columns=cols)
+    df = pd.DataFrame(rows)
+    g = df.groupby("phase")["seconds"]
+    out = pd.DataFrame({
+        "runs": g.count(), "mean_s": g.mean(), "median_s": g.median(),
+        "p95_s": g.quantile(0.95), "max_s": g.max(), "total_s": g.sum(),
+    }).reset_index()
+    wall = out.loc[out["phase"] == "total", "total_s"].sum()
+    out["share"] = out["total_s"] / wall if wall else None
+    return out.sort_values("total_s", ascending=False)[cols].reset_index(drop=True)
@@ -0,0 +1,200 @@
+"""
+Warm starts from neighbouring solved runs.
+
+Every scenario run records its edit vector (each edited scalar / parameter record as a
+number) in run.json. For a new scenario, find_warm_start picks the solved run of the same
+model whose edit vector is closest, looking candidates up in the provenance index, and
+inject_loadpoint makes the temp copy of the main file load that run's raw.gdx with
+execute_loadpoint before its first solve. Only the levels and marginals of the model's
+variables and equations are loaded (loadpoint_symbols); parameters and sets in raw.gdx
+would otherwise overwrite the scenario just patched in. The source run and the iteration
+savings are recorded in run.json under warm_start.
+"""
+from __future__ import annotations
+import json
+import math
+import re
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+LOADPOINT_GDX = "_warmstart.gdx"
+_SOLVE_RE = re.compile(r"^\s*solve\s", re.IGNORECASE)
+
+
+def edit_vector(scenario: Any) -> Dict[str, float]:
+    """Numeric edits of a scenario_merg.Scenario as {"Scalar": v, "Param[A,B]": v}."""
+    edits = scenario.edits if hasattr(scenario, "edits") else scenario
+    vector: Dict[str, float] = {}
+    for s in edits.get("scalars") or []:
+        try:
+            vector[s["name"]] = float(s["value"])
+        except (TypeError, ValueError):
+            continue
+    for p in edits.get("parameters") or []:
+        for u in p.get("updates") or []:
+            try:
+                vector[f"{p['name']}[{','.join(str(k) for k in u['key'])}]"] = float(u["value"])
+            except (TypeError, ValueError):
+                continue
+    return vector
+
+
+def edit_distance(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """
+    Distance between two edit vectors: root of summed squared relative differences
+    (|x - y| / max(|x|, |y|)); an edit present in only one vector counts as 1.
+    """
+    total = 0.0
+    for k in set(a) | set(b):
+        if k not in a or k not in b:
+            total += 1.0
+            continue
+        scale = max(abs(a[k]), abs(b[k]))
+        total += ((a[k] - b[k]) / scale) ** 2 if scale else 0.0
+    return math.sqrt(total)
+
+
+def total_iterations(meta: Dict[str, Any]) -> Optional[int]:
+    """Solver iterations summed over all solves of a run (None if the listing had none)."""
+    counts = [s.get("iterations") for s in (meta.get("solve_stats") or {}).get("solves") or []]
+    counts = [c for c in counts if c is not None]
+    return sum(counts) if counts else None
+
+
+def find_warm_start(
+    vector: Dict[str, float],
+    runs_root: Union[str, Path, None] = None,
+    model_hash: Optional[str] = None,
+    candidates: Optional[Iterable[Union[str, Path]]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Nearest solved run to an edit vector.
+
+    Args:
+        vector: Edit vector of the new scenario
+        runs_root: Runs root whose provenance index is searched (used when candidates is not given)
+        model_hash: Only consider runs of this model
+        candidates: Run directories to search instead of runs_root (their run.json is read)
+
+    Returns:
+        {"run_dir", "run_id", "distance", "meta"} for the closest run with a raw.gdx and a
+        recorded edit vector, or None
+    """
+    if candidates is None:
+        root = Path(runs_root or "runs")
+        if not root.exists():
+            return None
+        from .run_index import query_edit_vectors, sync_index
+        sync_index(root)
+        ranked = sorted((edit_distance(vector, r["edit_vector"]), r["run_name"], r["run_dir"])
+                        for r in query_edit_vectors(root, model_hash=model_hash))
+        for distance, _, run_dir in ranked:
+            if (Path(run_dir) / "raw.gdx").exists():
+                return {**source_run(run_dir), "distance": distance}
+        return None
+    best = None
+    for run_dir in candidates:
+        run_dir = Path(run_dir)
+        if not (run_dir / "raw.gdx").exists():
+            continue
+        try:
+            meta = json.loads((run_dir / "run.json").read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if meta.get("edit_vector") is None or (model_hash and meta.get("model_hash") != model_hash):
+            continue
+        d = edit_distance(vector, meta["edit_vector"])
+        if best is None or (d, run_dir.name) < (best["distance"], Path(best["run_dir"]).name):
+            best = {"run_dir": str(run_dir), "run_id": meta.get("run_id"), "distance": d, "meta": meta}
+    return best
+
+
+def source_run(run_dir: Union[str, Path], vector: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Warm-start source for an explicitly chosen run directory (must contain raw.gdx)."""
+    run_dir = Path(run_dir)
+    if not (run_dir / "raw.gdx").exists():
+        raise FileNotFoundError(f"Warm-start source has no raw.gdx: {run_dir}")
+    try:
+        meta = json.loads((run_dir / "run.json").read_text(encoding="utf-8"))
+    except Exception:
+        meta = {}
+    distance = edit_distance(vector, meta["edit_vector"]) if vector is not None and meta.get("edit_vector") is not None else None
+    return {"run_dir": str(run_dir), "run_id": meta.get("run_id"), "distance": distance, "meta": meta}
+
+
+def loadpoint_symbols(model_dir: Union[str, Path], main_file: str, source_run_dir: Union[str, Path, None] = None) -> List[str]:
+    """
+    Variables and equations of a model (from its symbol index) to load from a source run,
+    restricted to the symbols the source run holds when its results can be listed.
+    """
+    from .symbol_indexer import create_symbol_index
+    names = [s["name"] for s in create_symbol_index(model_dir, main_file) if s["type"] in ("variable", "equation")]
+    names = list(dict.fromkeys(names))
+    if source_run_dir is not None:
+        try:
+            from .compare import list_symbols
+            present = {n.lower() for n in list_symbols([source_run_dir])}
+        except Exception:
+            return names
+        names = [n for n in names if n.lower() in present]
+    return names
+
+
+def inject_loadpoint(temp_dir: Union[str, Path], main_gms_name: str, source_gdx: Union[str, Path],
+                     symbols: Iterable[str]) -> bool:
+    """
+    Copy source_gdx into the temp workspace and load the given symbols (variables and
+    equations, see loadpoint_symbols) from it before the first solve of the main file.
+    Returns False (main file untouched) when the main file has no solve statement or no
+    symbols are given.
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return False
+    main = Path(temp_dir) / main_gms_name
+    lines = main.read_text(encoding="utf-8", errors="ignore").splitlines()
+    first, in_text = None, False
+    for i, line in enumerate(lines):
+        lower = line.strip().lower()
+        if lower.startswith(("$ontext", "$offtext")):
+            in_text = lower.startswith("$ontext")
+        elif not in_text and _SOLVE_RE.match(line):
+            first = i
+            break
+    if first is None:
+        return False
+    shutil.copy2(source_gdx, Path(temp_dir) / LOADPOINT_GDX)
+    lines[first:first] = ["* Warm start from a neighbouring solved run",
+                          f"execute_loadpoint '{LOADPOINT_GDX}', {', '.join(symbols)};"]
+    main.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return True
+
+
+def warm_start_record(source: Dict[str, Any], meta: Dict[str, Any], injected: bool) -> Dict[str, Any]:
+    """
+    warm_start block for run.json. The reference iteration count is the source run's cold
+    count (carried along when the source was itself warm-started).
+    """
+    src_meta = source.get("meta") or {}
+    reference = (src_meta.get("warm_start") or {}).get("reference_iterations") or total_iterations(src_meta)
+    iterations = total_iterations(meta)
+    saved = reference - iterations if injected and reference is not None and iterations is not None else None
+    return {
+        "source_run": source.get("run_id"), "source_run_dir": source.get("run_dir"),
+        "distance": None if source.get("distance") is None else round(source["distance"], 6), "applied": injected,
+        "iterations": iterations, "reference_iterations": reference, "iterations_saved": saved,
+    }
+
+
+def warm_start_summary(run_dirs: Iterable[Union[str, Path]]) -> List[Dict[str, Any]]:
+    """warm_start blocks of the given runs (runs without one are skipped)."""
+    out = []
+    for run_dir in run_dirs:
+        try:
+            meta = json.loads((Path(run_dir) / "run.json").read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if meta.get("warm_start"):
+            out.append({"run": Path(run_dir).name, **meta["warm_start"]})
+    return out
@@ -0,0 +1,22 @@
+"""
+Shared fixtures: keep the on-disk caches of every test in its own temporary folder
+"""
+import pytest
+
+import src.core.patch_cache as patch_cache
+import src.core.preflight as preflight
+import src.core.symbol_store as symbol_store
+
+_CACHES = (
+    (patch_cache, "PATCH_CACHE_DIR", "GAMS_PATCH_CACHE", "patches"),
+    (preflight, "PREFLIGHT_CACHE_DIR", "GAMS_PREFLIGHT_CACHE", "preflight"),
+    (symbol_store, "SYMBOL_CACHE_DIR", "GAMS_SYMBOL_CACHE", "symbols"),
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Point the patch, preflight and symbol caches (and child processes) at tmp_path."""
+    for module, attribute, env_var, name in _CACHES:
+        monkeypatch.setattr(module, attribute, tmp_path / "cache" / name)
+        monkeypatch.setenv(env_var, str(tmp_path / "cache" / name))
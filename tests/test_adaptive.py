@@ -0,0 +1,65 @@
+"""
+Tests for adaptive sweep refinement (adaptive.py)
+"""
+import numpy as np
+import pytest
+
+from src.core.adaptive import adaptive_sweep
+
+
+def _point(scen):
+    return scen.meta["sweep"]["point"]
+
+
+class TestAdaptiveSweep:
+
+    def test_brackets_step_with_few_solves(self):
+        spec = {"id": "s", "axes": [{"scalar": "x", "uniform": [0, 10]}]}
+        calls = []
+
+        def evaluate(scenarios):
+            calls.append(len(scenarios))
+            return [{"cost": float(_point(s)["x"] > 3.7)} for s in scenarios]
+
+        df = adaptive_sweep(spec, evaluate, budget=100, batch=1, min_step=1 / 64)
+        xs = sorted(df["x"])
+        below = max(x for x in xs if x <= 3.7)
+        above = min(x for x in xs if x > 3.7)
+        assert above - below <= 10 / 64 + 1e-9
+        # a uniform grid at this resolution needs 65 solves
+        assert len(df) <= 13
+        assert calls[0] == 3 and sum(calls) == len(df)
+        assert df["stage"].tolist()[:3] == [0, 0, 0]
+
+    def test_refines_near_regime_change_within_budget(self):
+        spec = {"id": "s", "axes": [{"scalar": "x", "uniform": [0, 1]}, {"parameter": "cap", "key": ["A"], "linspace": {"start": 0, "stop": 1, "num": 33}}]}
+
+        def evaluate(scenarios):
+            out = []
+            for s in scenarios:
+                p = _point(s)
+                out.append({"cost": 1.0 + 0.001 * p["x"], "binding": int(p["x"] + p["cap[A]"] > 1.2), "run_dir": s.id})
+            return out
+
+        df = adaptive_sweep(spec, evaluate, budget=40, batch=4, regime=["binding"], tolerance=0.01, kpis=["cost"])
+        assert len(df) == 40 and df["scenario"].is_unique
+        assert set(df["cap[A]"]) <= set(np.linspace(0, 1, 33))
+        dist = (df["x"] + df["cap[A]"] - 1.2).abs()
+        assert dist[df["stage"] > 0].mean() < dist[df["stage"] == 0].mean() / 3
+
+    def test_flat_response_and_failed_points(self):
+        spec = {"id": "s", "axes": [{"scalar": "x", "uniform": [0, 1]}], "adaptive": {"initial": 5, "budget": 30}}
+        df = adaptive_sweep(spec, lambda scenarios: [{"cost": 1.0} for _ in scenarios])
+        assert len(df) == 5
+
+        # failed solves (no KPI values) next to solved ones are refined like a regime change
+        df = adaptive_sweep(spec, lambda scenarios: [{} if _point(s)["x"] > 0.6 else {"cost": 1.0} for s in scenarios],
+                            batch=1, min_step=1 / 32)
+        xs = sorted(df["x"])
+        assert min(x for x in xs if x > 0.6) - max(x for x in xs if x <= 0.6) <= 1 / 32 + 1e-9
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            adaptive_sweep({"id": "s", "axes": [{"scalar": "x", "normal": [0, 1]}]}, lambda s: [{} for _ in s])
+        with pytest.raises(ValueError):
+            adaptive_sweep({"id": "s", "axes": [{"scalar": "x", "uniform": [0, 1]}]}, lambda s: [])
@@ -0,0 +1,214 @@
+"""
+Tests for the SQL-pushdown run comparison (compare.py)
+"""
+import json
+import tempfile
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from src.core.compare import (
+    compare_matrix,
+    compare_symbol,
+    export_comparison,
+    export_matrix,
+    impacted_between,
+    list_symbols,
+    load_diff_summary,
+    load_tolerances,
+    precompute_diff_summary,
+    resolve_tolerance,
+    run_diff_summary,
+)
+from src.core.gdx_io_merg import to_duckdb
+from src.core.run_index import get_baseline_run, set_baseline_run
+
+
+def _write_run(run_dir: Path, x: dict, y: float) -> Path:
+    run_dir.mkdir()
+    values = {
+        "x": pd.DataFrame({"key1": [k[0] for k in x], "key2": [k[1] for k in x], "value": list(x.values())}),
+        "z": pd.DataFrame({"value": [y]}),
+    }
+    to_duckdb(values, run_dir / "results.duckdb", kinds={"x": "variable", "z": "variable"},
+              run_meta={"run_id": run_dir.name})
+    return run_dir
+
+
+class TestCompareSymbol:
+
+    def test_inner_and_outer_join(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = _write_run(Path(tmpdir) / "run_a", {("i1", "j1"): 10.0, ("i1", "j2"): 0.0, ("i2", "j1"): 5.0}, 1.0)
+            b = _write_run(Path(tmpdir) / "run_b", {("i1", "j1"): 12.0, ("i1", "j2"): 3.0, ("i3", "j1"): 7.0}, 2.0)
+
+            assert list_symbols([a, b]) == ["x", "z"]
+
+            page, total = compare_symbol(a, b, "x")
+            assert total == 2
+            assert list(page.columns) == ["key1", "key2", "value_A", "value_B", "delta", "pct_delta"]
+            first = page.iloc[0]
+            assert (first["key1"], first["key2"], first["delta"]) == ("i1", "j1", 2.0)
+            assert round(first["pct_delta"], 6) == 0.2
+            assert pd.isna(page.iloc[1]["pct_delta"])  # value_A == 0
+
+            page, total = compare_symbol(a, b, "x", how="outer", sort="abs_delta")
+            assert total == 4
+            assert page.iloc[0]["delta"] == 3.0
+            assert page["value_A"].isna().sum() == 1 and page["value_B"].isna().sum() == 1
+
+            scalar, total = compare_symbol(a, b, "z")
+            assert total == 1 and list(scalar.columns) == ["value_A", "value_B", "delta", "pct_delta"]
+
+    def test_paging_and_export(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            keys = {(f"i{n:03d}", "j"): float(n) for n in range(250)}
+            a = _write_run(Path(tmpdir) / "run_a", keys, 1.0)
+            b = _write_run(Path(tmpdir) / "run_b", {k: v * 2 for k, v in keys.items()}, 1.0)
+
+            page, total = compare_symbol(a, b, "x", offset=100, limit=50)
+            assert total == 250 and len(page) == 50
+            assert page.iloc[0]["key1"] == "i100"
+
+            out = export_comparison(a, b, "x", Path(tmpdir) / "x.csv")
+            assert len(pd.read_csv(out)) == 250
+            out = export_comparison(a, b, "x", Path(tmpdir) / "x.parquet")
+            assert len(pd.read_parquet(out)) == 250
+
+    def test_parquet_source(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = _write_run(Path(tmpdir) / "run_a", {("i1", "j1"): 1.0}, 1.0)
+            b = Path(tmpdir) / "run_b"
+            b.mkdir()
+            df = pd.DataFrame({"run_id": ["b"], "symbol": ["x"], "kind": ["variable"], "dim": [2],
+                               "key1": ["i1"], "key2": ["j1"], **{f"key{i}": [None] for i in range(3, 8)},
+                               "value": [4.0], "text": [None]})
+            df.to_parquet(b / "symbol_values.parquet")
+            page, total = compare_symbol(a, b, "x")
+            assert total == 1 and page.iloc[0]["delta"] == 3.0
+
+
+class TestCompareMatrix:
+
+    def test_pivot_with_baseline(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs = [
+                _write_run(Path(tmpdir) / "base", {("i1", "j1"): 1.0, ("i2", "j1"): 2.0}, 1.0),
+                _write_run(Path(tmpdir) / "s1", {("i1", "j1"): 1.5, ("i2", "j1"): 2.0}, 1.0),
+                _write_run(Path(tmpdir) / "s2", {("i1", "j1"): 1.0, ("i3", "j1"): 9.0}, 1.0),
+            ]
+            df, total = compare_matrix(runs, "x", baseline="base")
+            assert total == 3
+            assert list(df.columns) == ["key1", "key2", "base", "s1", "s2", "delta_s1", "delta_s2"]
+            row = df.set_index("key1").loc["i1"]
+            assert (row["base"], row["s1"], row["delta_s1"], row["delta_s2"]) == (1.0, 1.5, 0.5, 0.0)
+            assert pd.isna(df.set_index("key1").loc["i3", "base"])
+
+            df, _ = compare_matrix(runs, "x", baseline="base", sort="max_abs_delta", limit=1)
+            assert df.iloc[0]["key1"] == "i1"
+
+            out = export_matrix(runs, "x", Path(tmpdir) / "x.parquet", baseline="base")
+            assert len(pd.read_parquet(out)) == 3
+
+            scalar, total = compare_matrix(runs, "z")
+            assert total == 1 and list(scalar.columns) == ["base", "s1", "s2"]
+
+
+class TestRunDiffSummary:
+
+    def test_summary_across_symbols(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = _write_run(Path(tmpdir) / "run_a", {("i1", "j1"): 10.0, ("i1", "j2"): 1.0, ("i2", "j1"): 5.0}, 1.0)
+            b = _write_run(Path(tmpdir) / "run_b", {("i1", "j1"): 14.0, ("i1", "j2"): 0.5, ("i3", "j1"): 7.0}, 1.0)
+            con = duckdb.connect(str(a / "results.duckdb"), read_only=True)
+            assert con.execute("SELECT count(*) FROM symbol_hashes").fetchone()[0] == 2
+            con.close()
+
+            summary = run_diff_summary(a, b, top_k=1)
+            symbols = summary["symbols"].set_index("symbol")
+            assert symbols.loc["z", "status"] == "identical" and summary["identical"] == 1
+            x = symbols.loc["x"]
+            assert x["status"] == "changed"
+            assert (x["changed"], x["added"], x["removed"]) == (2, 1, 1)
+            assert x["max_abs_delta"] == 4.0 and x["max_rel_delta"] == 0.5
+            top = summary["top"]
+            assert len(top) == 1 and (top.iloc[0]["key1"], top.iloc[0]["key2"]) == ("i1", "j1")
+
+    def test_precompute_against_baseline(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = _write_run(Path(tmpdir) / "run_a", {("i1", "j1"): 1.0}, 1.0)
+            b = _write_run(Path(tmpdir) / "run_b", {("i1", "j1"): 2.0}, 1.0)
+            assert precompute_diff_summary(b) is None  # no baseline designated
+
+            set_baseline_run(tmpdir, "run_a")
+            assert get_baseline_run(tmpdir) == "run_a"
+            assert precompute_diff_summary(a) is None
+            out = precompute_diff_summary(b)
+            assert json.loads(out.read_text())["baseline"] == "run_a"
+
+            summary = load_diff_summary(a, b, top_k=5)
+            assert summary["top"].iloc[0]["delta"] == 1.0
+
+    def test_check_against_impacted_symbols(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = _write_run(Path(tmpdir) / "run_a", {("i1", "j1"): 1.0}, 1.0)
+            b = _write_run(Path(tmpdir) / "run_b", {("i1", "j1"): 2.0}, 3.0)
+            assert impacted_between(a, b) is None  # no run.json
+            for run_dir, impacted in ((a, []), (b, ["Z"])):
+                (run_dir / "run.json").write_text(json.dumps(
+                    {"model_hash": "m", "main_file": "main.gms", "options": {},
+                     "impact": {"changed": impacted, "impacted": impacted}}))
+            assert impacted_between(a, b) == {"Z"}
+
+            # x differs although outside the impact: it is still diffed, and flagged
+            summary = run_diff_summary(a, b, symbols=impacted_between(a, b))
+            table = summary["symbols"].set_index("symbol")
+            assert (table.loc["z", "status"], table.loc["x", "status"]) == ("changed", "changed")
+            assert (table.loc["z", "impacted"], table.loc["x", "impacted"]) == (True, False)
+            assert table.loc["x", "changed"] == 1
+            assert summary["unexpected"] == ["x"]
+            assert set(summary["top"]["symbol"]) == {"x", "z"}
+            assert "unexpected" not in run_diff_summary(a, b)
+
+            set_baseline_run(tmpdir, "run_a")
+            precompute_diff_summary(b)
+            cached = load_diff_summary(a, b, symbols={"z"})
+            assert list(cached["symbols"]["status"]) == ["changed", "changed"]
+            assert cached["unexpected"] == ["x"]
+            assert load_diff_summary(a, b, symbols={"x", "z"})["unexpected"] == []
+
+
+class TestToleranceDiff:
+
+    def test_changes_only_with_tolerances(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = _write_run(Path(tmpdir) / "run_a", {("i1", "j1"): 100.0, ("i2", "j1"): 1.0, ("i3", "j1"): 5.0}, 1.0)
+            b = _write_run(Path(tmpdir) / "run_b", {("i1", "j1"): 100.0 + 1e-9, ("i2", "j1"): 1.5, ("i3", "j1"): 5.0}, 1.0)
+
+            page, total = compare_symbol(a, b, "x", changes_only=True)
+            assert total == 2
+            page, total = compare_symbol(a, b, "x", changes_only=True, rtol=1e-6)
+            assert total == 1 and page.iloc[0]["key1"] == "i2"
+            page, total = compare_symbol(a, b, "x", changes_only=True, rtol=1e-6,
+                                         symbol_tolerances={"x": {"atol": 1.0}})
+            assert total == 0
+
+            # identical content hashes: early exit with an empty page
+            page, total = compare_symbol(a, b, "z", changes_only=True)
+            assert total == 0 and list(page.columns) == ["value_A", "value_B", "delta", "pct_delta"]
+
+            summary = run_diff_summary(a, b, rtol=1e-6)
+            x = summary["symbols"].set_index("symbol").loc["x"]
+            assert x["changed"] == 1 and x["max_abs_delta"] == 0.5
+            summary = run_diff_summary(a, b, symbol_tolerances={"x": {"atol": 1.0}})
+            assert summary["identical"] == 2 and summary["top"].empty
+
+    def test_load_tolerances(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "tol.yaml"
+            path.write_text("atol: 1.0e-6\nsymbols:\n  x: {rtol: 0.01}\n")
+            tol = load_tolerances(path)
+            assert tol == {"atol": 1e-6, "rtol": 0.0, "symbol_tolerances": {"x": {"rtol": 0.01}}}
+            assert resolve_tolerance("x", **tol) == (1e-6, 0.01)
+            assert resolve_tolerance("y", **tol) == (1e-6, 0.0)
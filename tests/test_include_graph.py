@@ -0,0 +1,66 @@
+"""
+Tests for include graph resolution (include_graph.py)
+"""
+import tempfile
+import threading
+from pathlib import Path
+
+from src.core.include_graph import build_include_graph, parse_include
+from src.core.symbol_indexer import _read_declarations, scan_sources
+
+
+def _write(path: Path, text: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+class TestParseInclude:
+
+    def test_directive_forms(self):
+        assert parse_include("$include data.inc") == {"kind": "include", "target": "data.inc", "conditional": False}
+        assert parse_include('$batInclude "my file.inc" a b')["target"] == "my file.inc"
+        assert parse_include("$libinclude rank")["kind"] == "libinclude"
+        assert parse_include('$if exist "x.inc" $include x.inc') == {"kind": "include", "target": "x.inc", "conditional": True}
+        assert parse_include("$gdxin patch.gdx") is None
+
+
+class TestIncludeGraph:
+
+    def test_deep_nesting_and_search_path(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for level in range(8):
+                nxt = f"$include sub/level{level + 1}.inc\n" if level < 7 else ""
+                _write(root / "model" / "sub" / f"level{level}.inc", f"Scalar s{level};\n{nxt}")
+            _write(root / "model" / "main.gms", "Set i;\n$include sub/level0.inc\n$batinclude shared.inc x\nScalar last;\n")
+            _write(root / "idir" / "shared.inc", "Parameter shared;\n")
+            _write(root / "home" / "inclib" / "lib.gms", "Scalar fromlib;\n")
+            _write(root / "model" / "sub" / "level7.inc", "Scalar s7;\n$libinclude lib\n")
+            threads = set()
+
+            def loader(path):
+                threads.add(threading.get_ident())
+                return _read_declarations(path)
+
+            graph = build_include_graph([root / "model" / "main.gms"], loader, include_dirs=[root / "idir"],
+                                        gams_home=str(root / "home"), max_workers=4)
+            assert len(graph.files) == 11 and not graph.unresolved and not graph.cycles
+            names = [s["name"] for key, start, end in graph.order for s in graph.scans[key][0][start:end]]
+            assert names == ["i"] + [f"s{n}" for n in range(8)] + ["fromlib", "shared", "last"]
+            assert threads
+
+    def test_cycles_and_missing(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            main = _write(root / "main.gms", "Set i;\n$include a.inc\n$include a.inc\n$include missing.inc\n"
+                                             "$if exist opt.inc $include opt.inc\n")
+            _write(root / "a.inc", "Scalar a;\n$include b.inc\n")
+            _write(root / "b.inc", "Scalar b;\n$include a.inc\n")
+            graph = build_include_graph([main], _read_declarations)
+            assert graph.cycles == [[str(root / "a.inc"), str(root / "b.inc"), str(root / "a.inc")]]
+            assert [e["target"] for e in graph.unresolved] == ["missing.inc"]
+            data = graph.to_dict()
+            assert data["files"] == [str(main), str(root / "a.inc"), str(root / "b.inc")]
+            assert sum(e["cycle"] for e in data["edges"]) == 1
+            assert [s["name"] for s in scan_sources([main])] == ["i", "a", "b"]
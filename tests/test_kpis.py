@@ -0,0 +1,195 @@
+"""
+Tests for the compiled KPI engine (kpis.py)
+"""
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.core.gdx_io_merg import to_duckdb
+import src.core.kpis as kpis_module
+from src.core.kpis import extract_kpis, extract_kpis_many, kpi_definition_hash
+from src.core.provenance import write_run_json
+from src.core.run_index import get_kpi_values
+
+
+def _write_run(run_dir: Path, scale: float = 1.0) -> Path:
+    run_dir.mkdir()
+    values = {
+        "obj": pd.DataFrame({"value": [42.0 * scale]}),
+        "demand": pd.DataFrame({"key1": ["A", "A", "B", "B"], "key2": ["2025", "2030", "2025", "2030"],
+                                "value": [10.0 * scale, 20.0, 30.0, 40.0]}),
+        "weight": pd.DataFrame({"key1": ["A", "A", "B", "B"], "key2": ["2025", "2030", "2025", "2030"],
+                                "value": [1.0, 1.0, 3.0, 0.0]}),
+        "price": pd.DataFrame({"key1": ["A", "B"], "value": [2.0, 0.5]}),
+    }
+    marginals = {"balance": pd.DataFrame({"key1": ["A", "B"], "marginal": [2.0 * scale, -1.0]})}
+    to_duckdb(values, run_dir / "results.duckdb", symbol_marginals=marginals, run_meta={"run_id": run_dir.name})
+    return run_dir
+
+
+class TestExtractKpis:
+
+    def test_aggregates_in_one_query(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run = _write_run(Path(tmpdir) / "run_a")
+            spec = {"kpis": [
+                {"name": "Obj", "symbol": "obj"},
+                {"name": "Demand2025", "symbol": "demand", "where": {"key2": "2025"}, "agg": "sum"},
+                {"name": "DemandAB", "symbol": "demand", "where": {"key1": ["A", "B"], "key2": 2030}, "agg": "mean"},
+                {"name": "DemandMin", "symbol": "demand", "agg": "min"},
+                {"name": "DemandMax", "symbol": "demand", "agg": "max"},
+                {"name": "DemandCount", "symbol": "demand", "where": {"key1": "A"}, "agg": "count"},
+                {"name": "DemandW", "symbol": "demand", "agg": "wmean", "weight": "weight"},
+                {"name": "Missing", "symbol": "nope"},
+                {"name": "MissingCount", "symbol": "nope", "agg": "count"},
+                {"name": "IgnoredFilter", "symbol": "obj", "where": {"region": "X"}},
+            ]}
+            df = extract_kpis(run, spec)
+            values = dict(zip(df["name"], df["value"]))
+            assert list(df["name"]) == [k["name"] for k in spec["kpis"]]
+            assert values["Obj"] == 42.0
+            assert values["Demand2025"] == 40.0
+            assert values["DemandAB"] == 30.0
+            assert (values["DemandMin"], values["DemandMax"], values["DemandCount"]) == (10.0, 40.0, 2)
+            assert values["DemandW"] == (10 * 1 + 20 * 1 + 30 * 3) / 5.0
+            assert values["Missing"] is None and values["MissingCount"] == 0
+            assert values["IgnoredFilter"] == 42.0
+
+    def test_invalid_requests(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run = _write_run(Path(tmpdir) / "run_a")
+            with pytest.raises(ValueError):
+                extract_kpis(run, [{"name": "X", "symbol": "obj", "agg": "median"}])
+            with pytest.raises(ValueError):
+                extract_kpis(run, [{"name": "X", "symbol": "obj", "agg": "wmean"}])
+            assert extract_kpis(run, []).empty
+            missing = extract_kpis(Path(tmpdir) / "nothing", [{"name": "X", "symbol": "obj"}])
+            assert missing["value"].tolist() == [None]
+
+
+class TestDerivedKpis:
+
+    SPEC = [
+        {"name": "Cost", "product": ["weight", "demand"], "agg": "sum"},
+        {"name": "Share", "ratio": ["DemandA", "Demand"]},
+        {"name": "Demand", "symbol": "demand.l"},
+        {"name": "DemandA", "symbol": "demand", "where": {"key1": "A"}},
+        {"name": "Shadow", "symbol": "balance.m", "agg": "max"},
+        {"name": "Binding", "symbol": "balance.m", "where_value": {"op": "!=", "value": 0}, "agg": "count"},
+        {"name": "Big", "symbol": "demand", "where_value": {"op": ">=", "value": 30}, "agg": "count"},
+        {"name": "HighShare", "threshold": {"kpi": "Share", "op": ">", "value": 0.25}},
+        {"name": "NoDenominator", "ratio": ["Demand", "Zero"]},
+        {"name": "Zero", "symbol": "weight", "where": {"key1": "B", "key2": "2030"}},
+    ]
+
+    def test_expressions_marginals_and_thresholds(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run = _write_run(Path(tmpdir) / "run_a")
+            df = extract_kpis(run, self.SPEC)
+            values = dict(zip(df["name"], df["value"]))
+            assert list(df["name"]) == [k["name"] for k in self.SPEC]
+            assert values["Cost"] == 10 * 1 + 20 * 1 + 30 * 3 + 40 * 0
+            assert values["Share"] == 30.0 / 100.0
+            assert (values["Shadow"], values["Binding"], values["Big"]) == (2.0, 2, 2)
+            assert values["HighShare"] == 1.0
+            assert values["NoDenominator"] is None
+
+    def test_product_of_different_dimensions(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run = _write_run(Path(tmpdir) / "run_a")
+            df = extract_kpis(run, [
+                {"name": "Revenue", "product": ["price", "demand"]},
+                {"name": "Reversed", "product": ["demand", "price"]},
+                {"name": "Revenue2030", "product": ["demand", "price"], "where": {"key2": "2030"}},
+                {"name": "Scaled", "product": ["obj", "price"]},
+            ])
+            values = dict(zip(df["name"], df["value"]))
+            assert values["Revenue"] == values["Reversed"] == 2.0 * (10 + 20) + 0.5 * (30 + 40)
+            assert values["Revenue2030"] == 2.0 * 20 + 0.5 * 40
+            assert values["Scaled"] == 42.0 * 2.5
+
+    def test_derived_in_matrix(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_dirs = [_write_run(Path(tmpdir) / f"run_{i}", scale=s) for i, s in enumerate([1.0, 0.1])]
+            df = extract_kpis_many(self.SPEC, run_dirs + [Path(tmpdir) / "missing"])
+            assert list(df.columns) == ["run", "run_dir", *[k["name"] for k in self.SPEC]]
+            assert df["HighShare"].tolist()[:2] == [1.0, 0.0]
+            assert df["Shadow"].tolist()[:2] == [2.0, 0.2]
+            assert pd.isna(df["HighShare"].iloc[2])
+            # derived KPIs are recomputed from cached inputs
+            again = extract_kpis_many(self.SPEC, run_dirs)
+            assert again["Share"].tolist() == df["Share"].tolist()[:2]
+
+    def test_invalid_derived(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run = _write_run(Path(tmpdir) / "run_a")
+            with pytest.raises(ValueError):
+                extract_kpis(run, [{"name": "R", "ratio": ["Obj", "Nope"]}, {"name": "Obj", "symbol": "obj"}])
+            with pytest.raises(ValueError):
+                extract_kpis(run, [{"name": "A", "ratio": ["B", "B"]}, {"name": "B", "ratio": ["A", "A"]}])
+            with pytest.raises(ValueError):
+                extract_kpis(run, [{"name": "P", "product": ["obj"]}])
+            with pytest.raises(ValueError):
+                extract_kpis(run, [{"name": "T", "symbol": "obj", "where_value": {"op": "~", "value": 1}}])
+
+
+class TestExtractKpisMany:
+
+    def test_matrix_from_dirs_and_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs_root = Path(tmpdir)
+            run_dirs = []
+            for i, scen in enumerate(["Base", "High", "High"]):
+                run_dir = _write_run(runs_root / f"run_{i}", scale=i + 1)
+                write_run_json(run_dir, {"run_id": f"r{i}", "scenario_id": scen,
+                                         "timestamp": f"2025-08-1{i}T00:00:00Z"})
+                run_dirs.append(run_dir)
+            spec = [{"name": "Obj", "symbol": "obj"}, {"name": "DemandA", "symbol": "demand", "where": {"key1": "A"}}]
+
+            df = extract_kpis_many(spec, run_dirs + [runs_root / "missing"], max_workers=2)
+            assert list(df.columns) == ["run", "run_dir", "Obj", "DemandA"]
+            assert df["Obj"].tolist()[:3] == [42.0, 84.0, 126.0]
+            assert df["DemandA"].tolist()[:3] == [30.0, 40.0, 50.0]
+            assert pd.isna(df["Obj"].iloc[3])
+
+            df = extract_kpis_many(spec, runs_root=runs_root, scenario_id="High")
+            assert df["run"].tolist() == ["run_2", "run_1"]
+            with pytest.raises(ValueError):
+                extract_kpis_many(spec)
+
+
+class TestKpiCache:
+
+    def test_cache_hit_and_invalidation(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs_root = Path(tmpdir)
+            run = _write_run(runs_root / "run_a")
+            spec = [{"name": "Obj", "symbol": "obj"}, {"name": "DemandA", "symbol": "demand", "where": {"key1": "A"}}]
+            assert extract_kpis_many(spec, [run])["Obj"].tolist() == [42.0]
+            assert len(get_kpi_values(runs_root, [kpi_definition_hash(k) for k in spec])) == 2
+
+            # served from the cache: the engine is not called; renaming a KPI keeps its cache entry
+            monkeypatch.setattr(kpis_module, "_run_kpis", lambda *a, **k: pytest.fail("recomputed"))
+            renamed = [{"name": "Objective", "symbol": "obj"}, spec[1]]
+            df = extract_kpis_many(renamed, [run])
+            assert (df["Objective"].tolist(), df["DemandA"].tolist()) == ([42.0], [30.0])
+            monkeypatch.undo()
+
+            # a changed definition is computed, the unchanged one still comes from the cache
+            calls = []
+            real = kpis_module._run_kpis
+            monkeypatch.setattr(kpis_module, "_run_kpis", lambda d, reqs, *a: calls.append(reqs) or real(d, reqs, *a))
+            df = extract_kpis_many([spec[0], {"name": "DemandA", "symbol": "demand", "where": {"key1": "B"}}], [run])
+            assert df["DemandA"].tolist() == [70.0]
+            assert [[r["name"] for r in c] for c in calls] == [["DemandA"]]
+
+            # re-ingesting the run invalidates its entries
+            (run / "results.duckdb").unlink()
+            run.rmdir()
+            _write_run(run, scale=2.0)
+            calls.clear()
+            assert extract_kpis_many(spec, [run])["Obj"].tolist() == [84.0]
+            assert len(calls) == 1
+            assert extract_kpis_many(spec, [run], cache=False)["Obj"].tolist() == [84.0]
@@ -0,0 +1,153 @@
+"""
+Tests for the GAMS listing parser (listing_parser.py)
+"""
+import tempfile
+from pathlib import Path
+
+from src.core.listing_parser import COMPILE_ERROR_FIELDS, SOLVE_STAT_FIELDS, parse_compile_errors, parse_listing, solve_times
+from src.core.provenance import write_run_json
+from src.core.run_index import query_solve_stats
+
+LISTING = """\
+COMPILATION TIME     =        0.031 SECONDS      3 MB  49.6.1 55d34574 WEX-WEI
+Model Statistics    SOLVE toy Using LP From line 43
+
+
+MODEL STATISTICS
+
+BLOCKS OF EQUATIONS           3     SINGLE EQUATIONS            3
+BLOCKS OF VARIABLES           3     SINGLE VARIABLES            3
+NON ZERO ELEMENTS             5
+
+
+GENERATION TIME      =        0.016 SECONDS      4 MB  49.6.1 55d34574 WEX-WEI
+
+               S O L V E      S U M M A R Y
+
+     MODEL   toy                 OBJECTIVE  z
+     TYPE    LP                  DIRECTION  MAXIMIZE
+     SOLVER  CPLEX               FROM LINE  43
+
+**** SOLVER STATUS     1 Normal Completion
+**** MODEL STATUS      1 Optimal
+**** OBJECTIVE VALUE               50.0000
+
+ RESOURCE USAGE, LIMIT          0.250 10000000000.000
+ ITERATION COUNT, LIMIT         4    2147483647
+
+MODEL STATISTICS
+
+BLOCKS OF EQUATIONS           2     SINGLE EQUATIONS           10
+BLOCKS OF VARIABLES           2     SINGLE VARIABLES           12  2 projected
+NON ZERO ELEMENTS            30     DISCRETE VARIABLES          6
+
+GENERATION TIME      =        0.004 SECONDS      5 MB  49.6.1 55d34574 WEX-WEI
+
+               S O L V E      S U M M A R Y
+
+     MODEL   mip                 OBJECTIVE  cost
+     TYPE    MIP                 DIRECTION  MINIMIZE
+     SOLVER  CPLEX               FROM LINE  60
+
+**** SOLVER STATUS     3 Resource Interrupt
+**** MODEL STATUS      8 Integer Solution
+**** OBJECTIVE VALUE              123.5000
+
+ RESOURCE USAGE, LIMIT          0.050        0.050
+ ITERATION COUNT, LIMIT        17    2147483647
+**** 1 ERROR(S)   2 WARNING(S)
+EXECUTION TIME       =        0.266 SECONDS      6 MB  49.6.1 55d34574 WEX-WEI
+"""
+
+COMPILE_ERRORS = """\
+C o m p i l a t i o n
+
+
+   1  Set i / a, b /;
+   2  Parameter p(i);
+   3  p(j) = 1 + ;
+****    $120     $119,148
+   4  INCLUDE    C:\\m\\eq.inc
+   5  e.. x =e= q;
+****            $140
+**** LINE      1 INCLUDE     C:\\m\\eq.inc
+
+Error Messages
+
+
+119  Number (primary) expected
+120  Unknown identifier entered as set
+140  Unknown symbol
+148  Dimension different - The symbol is referenced with more/less
+        indices as declared
+
+**** 4 ERROR(S)   0 WARNING(S)
+"""
+
+
+class TestParseListing:
+
+    def test_parse_solves(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            lst = Path(tmpdir) / "main.lst"
+            lst.write_text(LISTING)
+            stats = parse_listing(lst)
+
+        assert stats["compile_s"] == 0.031
+        assert stats["execution_s"] == 0.266
+        assert stats["memory_mb"] == 6
+        assert (stats["errors"], stats["warnings"]) == (1, 2)
+        first, second = stats["solves"]
+        assert set(first) == set(SOLVE_STAT_FIELDS)
+        assert first["model"] == "toy" and first["model_type"] == "LP" and first["direction"] == "MAXIMIZE"
+        assert first["single_equations"] == 3 and first["non_zero_elements"] == 5
+        assert first["discrete_variables"] is None
+        assert first["solver_status"] == 1 and first["model_status_text"] == "Optimal"
+        assert first["objective_value"] == 50.0 and first["iterations"] == 4
+        assert second["single_variables"] == 12 and second["discrete_variables"] == 6
+        assert second["solver_status_text"] == "Resource Interrupt" and second["model_status"] == 8
+        assert second["from_line"] == 60 and second["resource_limit_s"] == 0.05
+
+        times = solve_times(stats)
+        assert round(times["generation"], 6) == 0.02
+        assert round(times["solve"], 6) == 0.3
+
+    def test_missing_listing(self):
+        stats = parse_listing(Path("does/not/exist.lst"))
+        assert stats["solves"] == [] and stats["errors"] == 0
+
+    def test_solve_stats_indexed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs_root = Path(tmpdir)
+            lst = runs_root / "main.lst"
+            lst.write_text(LISTING)
+            run_dir = runs_root / "run_a"
+            run_dir.mkdir()
+            meta = {"run_id": "a", "scenario_id": "S", "timestamp": "2025-08-10T10:00:00Z",
+                    "solve_stats": parse_listing(lst)}
+            write_run_json(run_dir, meta)
+            write_run_json(run_dir, meta)  # re-indexing replaces rather than duplicates
+
+            rows = query_solve_stats(runs_root, scenario_id="S")
+            assert [(r["solve_index"], r["model"]) for r in rows] == [(0, "toy"), (1, "mip")]
+            assert rows[1]["model_status"] == 8 and rows[1]["run_name"] == "run_a"
+            assert query_solve_stats(runs_root, scenario_id="other") == []
+
+    def test_compile_errors(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            lst = Path(tmpdir) / "main.lst"
+            lst.write_text(COMPILE_ERRORS)
+            diags = parse_compile_errors(lst)
+            assert parse_listing(lst)["errors"] == 4
+
+        assert [d["code"] for d in diags] == [120, 119, 148, 140]
+        assert set(diags[0]) == set(COMPILE_ERROR_FIELDS)
+        assert (diags[0]["line"], diags[0]["column"], diags[0]["file"]) == (3, 3, None)
+        assert diags[0]["message"] == "Unknown identifier entered as set" and diags[0]["source"] == "p(j) = 1 + ;"
+        assert diags[2]["column"] == diags[1]["column"] == 12
+        assert diags[2]["message"].endswith("more/less indices as declared")
+        # errors inside an include report the include's own line
+        assert (diags[3]["line"], diags[3]["listing_line"], diags[3]["file"]) == (1, 5, "C:\\m\\eq.inc")
+
+        assert parse_compile_errors(Path("does/not/exist.lst")) == []
+        assert parse_compile_errors(None) == []
@@ -0,0 +1,140 @@
+"""
+Tests for patch table reading, domain resolution and patch building (patch_builder.py)
+"""
+import gzip
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.core.patch_builder as patch_builder
+import src.core.patch_cache as patch_cache
+from src.core.patch_builder import build_patch_gdx, needs_declared_domains, read_records, resolve_domain
+from src.core.symbol_indexer import create_symbol_index
+
+MODEL = """Sets r / north, south /, t / 2025, 2030 /;
+Set active(r);
+Parameter demand(r, t), price(r);
+"""
+
+
+class TestReadRecords:
+
+    def test_csv_chunks_and_parquet_agree(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            df = pd.DataFrame({"region": ["A", "B", "A", "C", "B"], "year": [2025, 2025, 2030, 2030, 2035],
+                               "value": [1.0, 2.0, 3.0, 4.0, 5.0], "text": ["", "", "", "", ""]})
+            df.to_csv(root / "demand.csv", index=False)
+            df.to_parquet(root / "demand.parquet")
+            with gzip.open(root / "demand.csv.gz", "wt") as f:
+                df.to_csv(f, index=False)
+
+            whole = read_records(root / "demand.csv")
+            assert list(whole.columns) == ["region", "year", "value"]
+            assert isinstance(whole["region"].dtype, pd.CategoricalDtype)
+            assert whole["year"].astype(str).tolist() == ["2025", "2025", "2030", "2030", "2035"]
+            assert whole["value"].dtype == np.float64
+            for other in (read_records(root / "demand.csv", chunk_rows=2), read_records(root / "demand.parquet"),
+                          read_records(root / "demand.csv.gz")):
+                assert other.astype({"region": str, "year": str}).equals(whole.astype({"region": str, "year": str}))
+
+    def test_value_column_fallback_and_missing(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "cost.csv"
+            path.write_text("key1,cost\nA,12\nNA,\n", encoding="utf-8")
+            records = read_records(path)
+            assert list(records.columns) == ["key1", "cost"]
+            assert records["key1"].tolist() == ["A", "NA"]  # labels are never parsed as missing
+            assert records["cost"].iloc[0] == 12.0 and np.isnan(records["cost"].iloc[1])
+            with pytest.raises(FileNotFoundError):
+                read_records(Path(tmpdir) / "nope.csv")
+
+
+class TestResolveDomain:
+
+    def test_scenario_then_index_then_universe(self):
+        index = [{"name": "Demand", "type": "parameter", "dim": 2, "domain": ["r", "t"]}]
+        assert resolve_domain("demand", 2, {"file": "d.csv", "domain": ["i", "j"]}, index) == ["i", "j"]
+        assert resolve_domain("demand", 2, "d.csv", index) == ["r", "t"]
+        assert resolve_domain("other", 2, "o.csv", index) == ["*", "*"]
+        with pytest.raises(ValueError):
+            resolve_domain("demand", 3, "d.csv", index)
+
+
+def _scenario(root: Path):
+    (root / "model").mkdir()
+    (root / "model" / "main.gms").write_text(MODEL, encoding="utf-8")
+    pd.DataFrame({"region": ["north", "south"], "year": [2025, 2030], "value": [1.5, 2.5]}).to_csv(
+        root / "demand.csv", index=False)
+    pd.DataFrame({"region": ["north"], "value": [9.0]}).to_parquet(root / "price.parquet")
+    return {"scalars": {"cap": 4}, "sets": {"active": {"add": ["north"]}},
+            "parameters": {"demand": "demand.csv", "price": {"file": "price.parquet", "domain": ["*"]}}}
+
+
+class _RecordingTransfer:
+    """Stand-in for gams.transfer recording the symbols written to each container."""
+
+    def __init__(self):
+        self.written = {}
+
+    def Container(self):
+        database = SimpleNamespace(symbols={})
+        database.write = lambda path: self._write(database, path)
+        return database
+
+    def _write(self, database, path):
+        self.written[str(path)] = database.symbols
+        Path(path).write_bytes(b"gdx")
+
+    def Set(self, database, name, domain=None, records=None):
+        database.symbols[name] = ("set", domain, records)
+
+    def Parameter(self, database, name, domain=None, records=None):
+        database.symbols[name] = ("parameter", domain, records)
+
+
+class TestBuildPatch:
+
+    def test_declared_domains_needed(self):
+        assert not needs_declared_domains({"scalars": {"cap": 1}, "parameters": {"p": 3}})
+        assert needs_declared_domains({"parameters": {"p": "p.csv"}})
+        assert not needs_declared_domains({"parameters": {"p": {"file": "p.csv", "domain": ["i"]}}})
+        assert needs_declared_domains({"sets": {"s": {"add": ["a"]}}})
+
+    def test_build_with_index_domains(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            edits = _scenario(root)
+            transfer = _RecordingTransfer()
+            monkeypatch.setattr(patch_builder, "_import_transfer", lambda: transfer)
+            monkeypatch.setattr(patch_cache, "PATCH_CACHE_DIR", root / "cache")
+            index = create_symbol_index(root / "model", use_cache=False)
+            out = build_patch_gdx(edits, root, root / "ws" / "patch.gdx", symbol_index=index)
+            assert out.read_bytes() == b"gdx"
+            symbols = next(iter(transfer.written.values()))
+            assert symbols["cap"][0] == "parameter" and symbols["cap"][2] == 4.0
+            assert symbols["active"][:2] == ("set", ["r"])
+            kind, domain, records = symbols["demand"]
+            assert domain == ["r", "t"] and records["value"].tolist() == [1.5, 2.5]
+            assert symbols["price"][1] == ["*"]  # the scenario's own domain wins
+
+            build_patch_gdx(edits, root, root / "ws2" / "patch.gdx", symbol_index=index)
+            assert len(transfer.written) == 1  # same edits, tables and domains: served from the cache
+
+    def test_round_trip_through_gams_transfer(self, monkeypatch):
+        gt = pytest.importorskip("gams.transfer")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            edits = _scenario(root)
+            monkeypatch.setattr(patch_cache, "PATCH_CACHE_DIR", None)
+            out = build_patch_gdx(edits, root, root / "patch.gdx",
+                                  symbol_index=create_symbol_index(root / "model", use_cache=False))
+            container = gt.Container()
+            container.read(str(out))
+            assert container["demand"].domain_names == ["r", "t"]
+            assert container["demand"].records["value"].tolist() == [1.5, 2.5]
+            assert container["cap"].records["value"].tolist() == [4.0]
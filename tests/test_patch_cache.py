@@ -0,0 +1,93 @@
+"""
+Tests for the content-addressed patch cache (patch_cache.py)
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import src.core.patch_cache as patch_cache
+import src.core.scenario_merg as scenario_merg
+from src.core.env import CACHE_ROOT, cache_dir
+from src.core.patch_cache import cached_patch, patch_key
+from src.core.provenance import hash_file
+from src.core.scenario_merg import apply_scenario_to_temp_workspace, scenario_from_dict
+
+
+class TestPatchKey:
+
+    def test_key_follows_edits_and_file_contents(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv = Path(tmpdir) / "cost.csv"
+            csv.write_text("key1,value\nA,1\n", encoding="utf-8")
+            edits = {"scalars": {"Cap": 1}, "parameters": {"cost": "cost.csv"}}
+            key = patch_key("b", edits, [csv])
+            assert key == patch_key("b", {"parameters": {"cost": "cost.csv"}, "scalars": {"Cap": 1}}, [csv])
+            assert key != patch_key("other", edits, [csv])
+            assert key != patch_key("b", {**edits, "scalars": {"Cap": 2}}, [csv])
+            csv.write_text("key1,value\nA,2\n", encoding="utf-8")
+            os.utime(csv, ns=(1, 1))
+            assert key != patch_key("b", edits, [csv])
+
+
+class TestCacheDir:
+
+    def test_env_setting_default_and_off(self, monkeypatch):
+        monkeypatch.delenv("GAMS_TEST_CACHE", raising=False)
+        assert cache_dir("GAMS_TEST_CACHE", "things") == CACHE_ROOT / "things"
+        monkeypatch.setenv("GAMS_TEST_CACHE", "~/elsewhere")
+        assert cache_dir("GAMS_TEST_CACHE", "things") == Path("~/elsewhere").expanduser()
+        for off in ("off", "OFF", "0", "false"):
+            monkeypatch.setenv("GAMS_TEST_CACHE", off)
+            assert cache_dir("GAMS_TEST_CACHE", "things") is None
+
+
+class TestCachedPatch:
+
+    def test_build_once_then_link(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            builds = []
+
+            def build(path):
+                builds.append(path)
+                path.write_bytes(b"patch-bytes")
+
+            first, digest, hit = cached_patch("k1", build, root / "ws1" / "patch.gdx", cache_dir=root / "cache")
+            assert not hit and digest == hash_file(first) and first.read_bytes() == b"patch-bytes"
+            second, digest2, hit2 = cached_patch("k1", build, root / "ws2" / "patch.gdx", cache_dir=root / "cache")
+            assert hit2 and digest2 == digest and len(builds) == 1
+            assert second.stat().st_ino == (root / "cache" / "k1.gdx").stat().st_ino
+            assert sorted(p.name for p in (root / "cache").iterdir()) == ["k1.gdx", "k1.json"]
+
+    def test_failed_build_leaves_no_entry(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+
+            def build(path):
+                path.write_bytes(b"partial")
+                raise RuntimeError("transfer failed")
+
+            try:
+                cached_patch("k", build, root / "patch.gdx", cache_dir=root / "cache")
+            except RuntimeError:
+                pass
+            assert list((root / "cache").iterdir()) == []
+
+            monkeypatch.setattr(patch_cache, "PATCH_CACHE_DIR", None)
+            dest, digest, hit = cached_patch("k", lambda p: p.write_bytes(b"x"), root / "direct.gdx")
+            assert not hit and digest == hash_file(dest)
+
+    def test_scenario_rerun_hits_cache(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            monkeypatch.setattr(patch_cache, "PATCH_CACHE_DIR", root / "cache")
+            writes = []
+            monkeypatch.setattr(scenario_merg, "_write_patch_gdx", lambda scen, path: writes.append(path) or path.write_bytes(b"gdx"))
+            scen = scenario_from_dict({"id": "s", "edits": {"scalars": [{"name": "Cap", "value": 3}]}})
+            infos = []
+            for ws in ("ws1", "ws2"):
+                (root / ws).mkdir()
+                (root / ws / "main.gms").write_text("Scalar Cap / 1 /;\n", encoding="utf-8")
+                infos.append(apply_scenario_to_temp_workspace(root / ws, root, "main.gms", scen))
+            assert [i["patch_cache"] for i in infos] == ["miss", "hit"] and len(writes) == 1
+            assert infos[0]["patch_hash"] == infos[1]["patch_hash"] == hash_file(root / "ws2" / "patch.gdx")
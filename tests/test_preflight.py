@@ -0,0 +1,116 @@
+"""
+Tests for the compile-only preflight (preflight.py)
+"""
+import tempfile
+from pathlib import Path
+
+import src.core.preflight as preflight_module
+from src.core.preflight import format_diagnostics, preflight, preflight_batch
+from src.core.scenario_merg import scenario_from_dict
+
+CLEAN = "C o m p i l a t i o n\n\n\n   1  Scalar a / 1 /;\n\n\nCOMPILATION TIME     =        0.010 SECONDS      3 MB\n"
+BROKEN = "   1  Scalar a / 1 /;\n   2  e.. x =e= q;\n****            $140\n\nError Messages\n\n\n140  Unknown symbol\n\n**** 1 ERROR(S)   0 WARNING(S)\n"
+
+
+def _model(root: Path) -> Path:
+    """Model folder under root; equation includes live next to the scenarios, in root/scenario."""
+    model = root / "model"
+    model.mkdir()
+    (root / "scenario" / "eq").mkdir(parents=True)
+    (model / "main.gms").write_text("Scalar a / 1 /;\n$if exist eq/extra.inc $include eq/extra.inc\n", encoding="utf-8")
+    (model / "main.lst").write_text("stale listing", encoding="utf-8")
+    (root / "scenario" / "eq" / "good.inc").write_text("* fine\n", encoding="utf-8")
+    (root / "scenario" / "eq" / "bad.inc").write_text("e.. x =e= q;\n", encoding="utf-8")
+    return model
+
+
+def _includes(root: Path, rels) -> dict:
+    return {rel: root / "scenario" / rel for rel in rels}
+
+
+class FakeGams:
+    """Writes a listing; broken when an include in the workspace references q."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, workspace, main_name, options):
+        self.calls.append(dict(options))
+        bad = any("q;" in p.read_text() for p in workspace.rglob("*.inc"))
+        (workspace / "main.lst").write_text(BROKEN if bad else CLEAN, encoding="utf-8")
+        if bad:
+            raise RuntimeError("GAMS returned 2")
+
+
+def _scen(sid, includes):
+    return scenario_from_dict({"id": sid, "edits": {"equations": {"includes": includes}}})
+
+
+class TestPreflight:
+
+    def test_compile_once_then_cached(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            model = _model(root)
+            gams = FakeGams()
+            first = preflight(model, "main.gms", includes=_includes(root, ["eq/good.inc"]), cache_dir=root / "cache",
+                              compile_fn=gams)
+            assert first["ok"] and not first["cached"] and first["compile_s"] == 0.01
+            assert gams.calls == [{"action": "c"}]
+            again = preflight(model, "main.gms", includes=_includes(root, ["eq/good.inc"]), cache_dir=root / "cache",
+                              compile_fn=gams, listing_dir=root / "run")
+            assert again["cached"] and again["key"] == first["key"] and len(gams.calls) == 1
+            assert (root / "run" / "main.lst").read_text() == CLEAN
+            # the model folder is untouched (its listing is not linked into the workspace)
+            assert (model / "main.lst").read_text() == "stale listing"
+
+            (root / "scenario" / "eq" / "good.inc").write_text("* changed\n", encoding="utf-8")
+            assert not preflight(model, "main.gms", includes=_includes(root, ["eq/good.inc"]), cache_dir=root / "cache",
+                                 compile_fn=gams)["cached"]
+
+    def test_batch_fails_fast_with_diagnostics(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            model = _model(root)
+            monkeypatch.setattr(preflight_module, "scenario_includes",
+                                lambda scen, model_dir: _includes(root, scen.edits["equations"]["includes"]))
+            gams = FakeGams()
+            scenarios = [_scen(f"ok{i}", ["eq/good.inc"]) for i in range(40)] + [_scen("broken", ["eq/bad.inc"])]
+            results = preflight_batch(model, "main.gms", scenarios, cache_dir=root / "cache", compile_fn=gams)
+            assert len(gams.calls) == 2
+            assert [name for name, r in results.items() if not r["ok"]] == ["broken"]
+            diag = results["broken"]["diagnostics"][0]
+            assert (diag["code"], diag["message"], diag["line"]) == (140, "Unknown symbol", 2)
+            assert format_diagnostics(results["broken"]) == ["main:2:11: error 140: Unknown symbol"]
+
+    def test_missing_listing_not_cached(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            model = _model(root)
+
+            def no_gams(workspace, main_name, options):
+                raise FileNotFoundError("GAMS executable not found")
+
+            result = preflight(model, "main.gms", cache_dir=root / "cache", compile_fn=no_gams)
+            assert not result["ok"] and "not found" in result["error"]
+            assert not any((root / "cache").glob("*.json"))
+
+    def test_compile_writes_never_reach_the_model(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            model = _model(root)
+            (model / "data.inc").write_text("a = 1;\n", encoding="utf-8")
+            (model / "data.csv").write_text("i,value\na,1\n", encoding="utf-8")
+
+            def echo_gams(workspace, main_name, options):
+                # as $onecho > data.inc or a $call tool rewriting an input in place would
+                with open(workspace / "data.inc", "w", encoding="utf-8") as f:
+                    f.write("a = 2;\n")
+                with open(workspace / main_name, "a", encoding="utf-8") as f:
+                    f.write("* touched\n")
+                assert (workspace / "data.csv").stat().st_nlink == 2  # data is still linked
+                (workspace / "main.lst").write_text(CLEAN, encoding="utf-8")
+
+            assert preflight(model, "main.gms", cache_dir=root / "cache", compile_fn=echo_gams)["ok"]
+            assert (model / "data.inc").read_text() == "a = 1;\n"
+            assert "touched" not in (model / "main.gms").read_text()
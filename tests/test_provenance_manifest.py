@@ -0,0 +1,127 @@
+"""
+Tests for the Merkle model manifest in provenance.py
+"""
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src.core.provenance import (
+    build_run_meta,
+    compute_model_hash,
+    compute_model_manifest,
+    diff_manifests,
+    hash_file,
+    write_run_json,
+)
+from src.core.provenance_integration import diff_run_models, format_model_diff
+
+
+def _make_model(root: Path) -> None:
+    (root / "data").mkdir(parents=True)
+    (root / "runs").mkdir()
+    (root / "main.gms").write_text("Set i / A, B /;")
+    (root / "data" / "demand.gdx").write_bytes(b"\x00\x01demand")
+    (root / "data" / "cost.csv").write_text("i,value\nA,1\n")
+    (root / "runs" / "ignored.txt").write_text("run output")
+
+
+class TestModelManifest:
+
+    def test_manifest_structure_and_exclusions(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _make_model(root)
+            manifest = compute_model_manifest(root)
+
+            assert set(manifest["files"]) == {"main.gms"}
+            assert set(manifest["dirs"]) == {"data"}
+            assert set(manifest["dirs"]["data"]["files"]) == {"cost.csv", "demand.gdx"}
+            assert compute_model_hash(root) == manifest["hash"]
+
+    def test_root_hash_changes_with_content(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _make_model(root)
+            before = compute_model_hash(root)
+            (root / "runs" / "ignored.txt").write_text("other output")
+            assert compute_model_hash(root) == before
+            (root / "data" / "demand.gdx").write_bytes(b"changed")
+            assert compute_model_hash(root) != before
+
+    def test_diff_reports_changed_added_removed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _make_model(root)
+            a = compute_model_manifest(root)
+            (root / "data" / "demand.gdx").write_bytes(b"changed")
+            (root / "data" / "cost.csv").unlink()
+            (root / "inc").mkdir()
+            (root / "inc" / "extra.inc").write_text("* extra")
+            b = compute_model_manifest(root)
+
+            diff = diff_manifests(a, b)
+            assert diff == {"added": ["inc/extra.inc"], "removed": ["data/cost.csv"], "changed": ["data/demand.gdx"]}
+            assert diff_manifests(a, a) == {"added": [], "removed": [], "changed": []}
+
+    def test_diff_run_models_from_run_json(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / "model"
+            _make_model(root)
+            run_a = Path(tmpdir) / "run_a"; run_a.mkdir()
+            run_b = Path(tmpdir) / "run_b"; run_b.mkdir()
+            write_run_json(run_a, build_run_meta(work_dir=str(root), main_file="main.gms"))
+            (root / "data" / "demand.gdx").write_bytes(b"changed")
+            write_run_json(run_b, build_run_meta(work_dir=str(root), main_file="main.gms"))
+
+            meta_b = json.loads((run_b / "run.json").read_text())
+            assert meta_b["model_hash"] == meta_b["model_manifest"]["hash"]
+
+            diff = diff_run_models(run_a, run_b)
+            assert diff["changed"] == ["data/demand.gdx"]
+            assert format_model_diff(diff) == "only data/demand.gdx changed"
+
+    def test_diff_run_models_without_manifest(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_dir = Path(tmpdir)
+            write_run_json(run_dir, {"run_id": "legacy", "model_hash": "abc"})
+            assert diff_run_models(run_dir, run_dir) is None
+            assert format_model_diff(None) == "model manifest not available"
+
+
+class TestFileHashing:
+
+    def test_chunked_hash_matches_whole_file_hash(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            big = Path(tmpdir) / "big.gdx"
+            data = bytes(range(256)) * 20000  # ~5 MB, spans several chunks
+            big.write_bytes(data)
+            assert hash_file(big) == hashlib.sha256(data).hexdigest()
+            assert hash_file(big, "blake2b") == hashlib.blake2b(data).hexdigest()
+
+    def test_manifest_algorithm_and_size(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _make_model(root)
+            sha = compute_model_manifest(root)
+            blake = compute_model_manifest(root, algorithm="blake2b", max_workers=2)
+            assert sha["algorithm"] == "sha256" and blake["algorithm"] == "blake2b"
+            assert blake["file_count"] == 3
+            assert blake["total_bytes"] == sum(p.stat().st_size for p in root.rglob("*") if p.is_file() and "runs" not in p.parts)
+            with pytest.raises(ValueError):
+                diff_manifests(sha, blake)
+
+    def test_run_meta_reports_hash_throughput(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / "model"
+            _make_model(root)
+            patch = Path(tmpdir) / "patch.gdx"
+            patch.write_bytes(b"patch")
+            meta = build_run_meta(work_dir=str(root), main_file="main.gms", patch_path=patch)
+            hashing = meta["timings"]["hashing"]
+            assert meta["patch_hash"] == hashlib.sha256(b"patch").hexdigest()
+            assert hashing["files"] == 4
+            assert hashing["bytes"] == meta["model_manifest"]["total_bytes"] + 5
+            assert hashing["seconds"] >= 0
@@ -0,0 +1,87 @@
+"""
+Tests for the provenance index (run_index.py)
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from src.core.provenance import write_run_json
+from src.core.run_index import (
+    distinct_values,
+    index_path,
+    list_run_names,
+    query_runs,
+    rebuild_index,
+    sync_index,
+)
+
+
+def _meta(run_id: str, scenario: str, model_hash: str, timestamp: str, lo: int = 2) -> dict:
+    return {
+        "run_id": run_id,
+        "timestamp": timestamp,
+        "scenario_id": scenario,
+        "model_hash": model_hash,
+        "patch_hash": f"patch-{run_id}",
+        "main_file": "main.gms",
+        "options": {"Lo": lo},
+        "timings": {"total_s": 1.5},
+    }
+
+
+class TestRunIndex:
+
+    def test_write_run_json_updates_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs_root = Path(tmpdir)
+            for i, (scen, mh, ts) in enumerate([
+                ("BaselineA", "hashX", "2025-08-10T10:00:00Z"),
+                ("BaselineA", "hashY", "2025-08-12T10:00:00Z"),
+                ("TestScenarioB", "hashX", "2025-08-14T10:00:00Z"),
+            ]):
+                run_dir = runs_root / f"run_{i}"
+                run_dir.mkdir()
+                write_run_json(run_dir, _meta(f"r{i}", scen, mh, ts, lo=i))
+
+            assert index_path(runs_root).exists()
+            rows = query_runs(runs_root)
+            assert [r["run_name"] for r in rows] == ["run_2", "run_1", "run_0"]
+            assert rows[0]["options"] == {"Lo": 2}
+            assert rows[0]["duration_s"] == 1.5
+            assert rows[0]["status"] == "completed"
+
+            rows = query_runs(runs_root, scenario_id="BaselineA", model_hash="hashX", since="2025-08-01")
+            assert [r["run_id"] for r in rows] == ["r0"]
+            assert [r["run_id"] for r in query_runs(runs_root, until="2025-08-11")] == ["r0"]
+            assert [r["run_id"] for r in query_runs(runs_root, options={"Lo": 1})] == ["r1"]
+            assert distinct_values(runs_root, "scenario_id") == ["BaselineA", "TestScenarioB"]
+
+    def test_rebuild_index_backfills_existing_runs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs_root = Path(tmpdir)
+            for i in range(3):
+                run_dir = runs_root / f"run_{i}"
+                run_dir.mkdir()
+                (run_dir / "run.json").write_text(json.dumps(_meta(f"r{i}", "S", "h", f"2025-08-1{i}T00:00:00Z")))
+            (runs_root / "not_a_run").mkdir()
+
+            assert list_run_names(runs_root) == ["run_2", "run_1", "run_0"]
+            assert rebuild_index(runs_root) == 3
+            assert len(query_runs(runs_root, limit=2)) == 2
+
+    def test_old_folders_next_to_an_indexed_run(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            runs_root = Path(tmpdir)
+            for i in range(2):
+                run_dir = runs_root / f"old_{i}"
+                run_dir.mkdir()
+                (run_dir / "run.json").write_text(json.dumps(_meta(f"o{i}", "S", "h", f"2025-08-1{i}T00:00:00Z")))
+            (runs_root / "new").mkdir()
+            write_run_json(runs_root / "new", _meta("n", "S", "h", "2025-08-20T00:00:00Z"))
+            assert [r["run_name"] for r in query_runs(runs_root)] == ["new"]
+
+            assert list_run_names(runs_root) == ["new", "old_1", "old_0"]
+            assert sync_index(runs_root) == 0
+
+    def test_list_run_names_missing_root(self):
+        assert list_run_names(Path("does/not/exist")) == []
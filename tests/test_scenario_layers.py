@@ -0,0 +1,113 @@
+"""
+Tests for scenario inheritance (extends) and layered patches (scenario_merg.py)
+"""
+import tempfile
+from pathlib import Path
+
+import pytest
+import yaml
+
+import src.core.patch_cache as patch_cache
+import src.core.scenario_merg as scenario_merg
+from src.core.scenario_merg import (
+    _layer_plan, apply_scenario_to_temp_workspace, load_scenario, scenario_from_dict,
+)
+
+BASE = {
+    "id": "base",
+    "edits": {
+        "scalars": [{"name": "Cap", "value": 10}],
+        "parameters": [{"name": "cost", "updates": [{"key": ["A"], "value": 1.0}, {"key": ["B"], "value": 2.0}]}],
+        "sets": [{"name": "tech", "add": ["solar", "wind"], "remove": []}],
+    },
+    "meta": {"author": "test", "tag": "base"},
+}
+
+
+def _write(folder: Path, name: str, data) -> Path:
+    path = folder / name
+    path.write_text(yaml.safe_dump(data), encoding="utf-8")
+    return path
+
+
+class TestMergeEdits:
+
+    def test_delta_overrides_and_extends_base(self):
+        base = scenario_from_dict(BASE)
+        child = scenario_from_dict({"id": "child", "edits": {
+            "scalars": [{"name": "Cap", "value": 12}, {"name": "Budget", "value": 5}],
+            "parameters": [{"name": "cost", "updates": [{"key": ["B"], "value": 3.0}, {"key": ["C"], "value": 4.0}]}],
+            "sets": [{"name": "tech", "add": ["hydro"], "remove": ["wind"]}],
+        }, "meta": {"tag": "child"}}, base=base)
+        assert child.extends == "base" and len(child.layers) == 2
+        assert child.edits["scalars"] == [{"name": "Cap", "value": 12}, {"name": "Budget", "value": 5}]
+        assert [u["value"] for u in child.edits["parameters"][0]["updates"]] == [1.0, 3.0, 4.0]
+        assert child.edits["sets"] == [{"name": "tech", "add": ["solar", "hydro"], "remove": ["wind"]}]
+        assert child.meta == {"author": "test", "tag": "child"}
+        # base untouched
+        assert base.edits["scalars"] == [{"name": "Cap", "value": 10}]
+
+    def test_extends_resolution_and_cycles(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write(root, "baseline_file.yaml", BASE)  # found by id, not file name
+            _write(root, "mid.yaml", {"id": "mid", "extends": "base", "edits": {"scalars": [{"name": "Cap", "value": 11}]}})
+            leaf = _write(root, "leaf.yaml", {"id": "leaf", "extends": "mid", "edits": {"scalars": [{"name": "Budget", "value": 1}]}})
+            scen = load_scenario(leaf)
+            assert len(scen.layers) == 3 and scen.extends == "mid"
+            assert scen.edits["scalars"] == [{"name": "Cap", "value": 11}, {"name": "Budget", "value": 1}]
+
+            _write(root, "x.yaml", {"id": "x", "extends": "y", "edits": {}})
+            _write(root, "y.yaml", {"id": "y", "extends": "x", "edits": {}})
+            with pytest.raises(ValueError):
+                load_scenario(root / "x.yaml")
+            _write(root, "orphan.yaml", {"id": "orphan", "extends": "missing", "edits": {}})
+            with pytest.raises(FileNotFoundError):
+                load_scenario(root / "orphan.yaml")
+
+
+class TestLayerPlan:
+
+    def test_modes(self):
+        base = scenario_from_dict(BASE)
+        child = scenario_from_dict({"id": "c", "edits": {
+            "parameters": [{"name": "cost", "updates": [{"key": ["B"], "value": 3.0}]}, {"name": "demand", "updates": [{"key": ["A"], "value": 1}]}],
+            "sets": [{"name": "tech", "add": ["hydro"], "remove": []}],
+        }}, base=base)
+        (base_edits, base_modes), (edits, modes) = _layer_plan(child.layers)
+        assert base_edits["scalars"] == BASE["edits"]["scalars"]
+        assert base_modes == {"Cap": "R", "cost": "R", "tech": "R"}
+        assert modes == {"cost": "M", "demand": "R", "tech": "M"}
+        assert edits["sets"] == [{"name": "tech", "add": ["hydro"], "remove": []}]
+
+        # removing a base element rewrites the set with its effective elements
+        removal = scenario_from_dict({"id": "r", "edits": {"sets": [{"name": "tech", "add": [], "remove": ["solar"]}]}}, base=base)
+        (_, _), (edits, modes) = _layer_plan(removal.layers)
+        assert modes == {"tech": "R"} and edits["sets"] == [{"name": "tech", "add": ["wind"], "remove": []}]
+
+
+class TestLayeredApply:
+
+    def test_variants_share_base_patch(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            monkeypatch.setattr(patch_cache, "PATCH_CACHE_DIR", root / "cache")
+            writes = []
+            monkeypatch.setattr(scenario_merg, "_write_patch_gdx", lambda edits, path: writes.append(edits) or path.write_bytes(repr(edits).encode()))
+            base = scenario_from_dict(BASE)
+            infos = []
+            for cap in (11, 12):
+                ws = root / f"ws{cap}"
+                ws.mkdir()
+                (ws / "main.gms").write_text("Set i;\n$gdxin old.gdx\n$load x\nParameter Benefit(i);\nSolve m using lp min z;\n", encoding="utf-8")
+                child = scenario_from_dict({"id": f"c{cap}", "edits": {"scalars": [{"name": "Cap", "value": cap}]}}, base=base)
+                infos.append(apply_scenario_to_temp_workspace(ws, root, "main.gms", child))
+            assert [i["patch_cache"] for i in infos] == ["miss", "partial"]
+            assert len(writes) == 3  # base layer built once
+            assert [Path(p).name for p in infos[1]["patches"]] == ["patch_0.gdx", "patch_1.gdx"]
+            assert infos[0]["patch_hash"] != infos[1]["patch_hash"]
+            main = (root / "ws12" / "main.gms").read_text(encoding="utf-8")
+            assert "$gdxin old.gdx" not in main
+            assert "$if exist patch_1.gdx $load Cap" in main
+            assert main.index("patch_0.gdx $load Cap, cost, tech") < main.index("patch_1.gdx $load Cap")
+            assert main.index("$offMulti") < main.index("Solve")
@@ -0,0 +1,126 @@
+"""
+Tests for scenario validation against the symbol index (scenario_validation.py)
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+from src.core.scenario_merg import scenario_from_dict
+from src.core.scenario_validation import (
+    ScenarioValidationError, SymbolCatalog, catalog_for_model, ensure_valid, validate_scenario, validate_scenarios,
+)
+from src.core.symbol_indexer import scan_sources
+
+MODEL = """\
+Sets
+    i   "catchments" / A, B /
+    t   years / y2020*y2022 /;
+Alias (i, ip);
+Set active(i) / A /;
+Scalar Cap "capacity" / 10 /;
+Parameters
+    cost(i)      "unit cost"
+    flow(i, ip, t);
+Variable z;
+"""
+
+
+def _catalog(tmpdir) -> SymbolCatalog:
+    main = Path(tmpdir) / "main.gms"
+    main.write_text(MODEL, encoding="utf-8")
+    return catalog_for_model(tmpdir, "main.gms")
+
+
+def _scen(edits, sid="s"):
+    return scenario_from_dict({"id": sid, "edits": edits})
+
+
+class TestIndexDomains:
+
+    def test_domains_and_elements_indexed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            main = Path(tmpdir) / "main.gms"
+            main.write_text(MODEL, encoding="utf-8")
+            by_name = {s["name"]: s for s in scan_sources([main])}
+        assert by_name["i"]["elements"] == ["A", "B"]
+        assert by_name["t"]["elements"] == ["y2020", "y2021", "y2022"]
+        assert by_name["flow"]["domain"] == ["i", "ip", "t"]
+        assert (by_name["ip"]["type"], by_name["ip"]["domain"]) == ("alias", ["i"])
+        assert by_name["active"]["domain"] == ["i"] and by_name["active"]["elements"] == ["A"]
+
+
+class TestValidation:
+
+    def test_valid_scenario(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            catalog = _catalog(tmpdir)
+            scen = _scen({
+                "scalars": [{"name": "cap", "value": 5}],
+                "parameters": [{"name": "flow", "updates": [{"key": ["a", "B", "y2021"], "value": 1}]}],
+                "sets": [{"name": "active", "add": ["B"], "remove": []}],
+            })
+            assert validate_scenario(scen, catalog) == []
+
+    def test_reports_each_kind_of_mistake(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            catalog = _catalog(tmpdir)
+            scen = _scen({
+                "scalars": [{"name": "Capp", "value": 5}, {"name": "cost", "value": 1}],
+                "parameters": [
+                    {"name": "cost", "updates": [{"key": ["A", "B"], "value": 1}, {"key": ["C"], "value": 1}]},
+                    {"name": "z", "updates": [{"key": [], "value": 1}]},
+                ],
+                "sets": [{"name": "active", "add": ["D"], "remove": []}],
+            })
+            issues = validate_scenario(scen, catalog)
+            messages = [i["message"] for i in issues]
+            assert messages == [
+                "Unknown symbol 'Capp'",
+                "'cost' is a 1-dimensional parameter, not a scalar",
+                "cost: key ['A', 'B'] has 2 entries, expected 1",
+                "cost: 'C' is not an element of i",
+                "'z' is a variable, not a parameter",
+                "active: 'D' is not an element of i",
+            ]
+            assert all(i["scenario"] == "s" for i in issues)
+
+    def test_scenario_set_edits_extend_domains(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            catalog = _catalog(tmpdir)
+            scen = _scen({
+                "parameters": [{"name": "flow", "updates": [{"key": ["C", "C", "y2020"], "value": 1}]}],
+                "sets": [{"name": "i", "add": ["C"], "remove": ["B"]}],
+            })
+            assert validate_scenario(scen, catalog) == []
+            scen = _scen({
+                "parameters": [{"name": "cost", "updates": [{"key": ["B"], "value": 1}]}],
+                "sets": [{"name": "i", "add": [], "remove": ["B"]}],
+            })
+            assert [i["message"] for i in validate_scenario(scen, catalog)] == ["cost: 'B' is not an element of i"]
+
+    def test_bulk_validation_is_fast(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            catalog = _catalog(tmpdir)
+            base = _scen({"parameters": [{"name": "flow", "updates": [
+                {"key": [a, b, t], "value": 1} for a in "AB" for b in "AB" for t in ("y2020", "y2021", "y2022")] * 50}]}, "base")
+            variants = [scenario_from_dict({"id": f"v{n}", "edits": {"scalars": [{"name": "Cap", "value": n}]}}, base=base)
+                        for n in range(5000)]
+            variants.append(scenario_from_dict({"id": "bad", "edits": {"scalars": [{"name": "Capp", "value": 1}]}}, base=base))
+            t0 = time.perf_counter()
+            issues = validate_scenarios(variants, catalog)
+            assert time.perf_counter() - t0 < 1.0
+            assert list(issues) == ["bad"]
+            with pytest.raises(ScenarioValidationError) as err:
+                ensure_valid(variants, catalog)
+            assert err.value.issues["bad"][0]["symbol"] == "Capp"
+
+    def test_catalog_cached_until_source_changes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            first = _catalog(tmpdir)
+            assert catalog_for_model(tmpdir, "main.gms") is first
+            main = Path(tmpdir) / "main.gms"
+            main.write_text(MODEL + "Scalar Extra / 1 /;\n", encoding="utf-8")
+            second = catalog_for_model(tmpdir, "main.gms")
+            assert second is not first and second.kind("extra") == "scalar"
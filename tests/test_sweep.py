@@ -0,0 +1,97 @@
+"""
+Tests for matrix sweep expansion (sweep.py)
+"""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+from src.core.sweep import count_points, iter_points, iter_scenarios, load_matrix, scenario_for_point
+
+BASE = {
+    "id": "BaselineA",
+    "edits": {
+        "scalars": [{"name": "CapacityLimit", "value": 15.0}],
+        "parameters": [{"name": "CostByCatchment", "updates": [{"key": ["A"], "value": 8.0}, {"key": ["B"], "value": 25.0}]}],
+    },
+    "meta": {"author": "test"},
+}
+
+
+def _spec(**kw):
+    spec = {
+        "id": "sweep",
+        "base": BASE,
+        "axes": [
+            {"scalar": "CapacityLimit", "range": {"start": 5, "stop": 15, "step": 5}},
+            {"parameter": "CostByCatchment", "key": ["A"], "values": [1.0, 2.0]},
+        ],
+    }
+    spec.update(kw)
+    return spec
+
+
+class TestSweepExpansion:
+
+    def test_grid_scenarios(self):
+        spec = _spec()
+        assert count_points(spec) == 6
+        scenarios = list(iter_scenarios(spec))
+        assert len(scenarios) == 6 and len({s.id for s in scenarios}) == 6
+        first = scenarios[0]
+        assert first.edits["scalars"] == [{"name": "CapacityLimit", "value": 5.0}]
+        assert first.edits["parameters"][0]["updates"] == [{"key": ["A"], "value": 1.0}, {"key": ["B"], "value": 25.0}]
+        assert first.meta["author"] == "test"
+        assert first.meta["sweep"] == {"id": "sweep", "index": 0, "point": {"CapacityLimit": 5.0, "CostByCatchment[A]": 1.0}}
+        # base edits are not mutated and IDs are stable
+        assert BASE["edits"]["scalars"][0]["value"] == 15.0
+        assert [s.id for s in iter_scenarios(spec)] == [s.id for s in scenarios]
+        assert scenario_for_point(spec, first.meta["sweep"]["point"]).id == first.id
+
+    def test_new_symbols_and_no_base(self):
+        spec = {"id": "s", "axes": [{"parameter": "demand", "key": ["A", 2030], "linspace": {"start": 0, "stop": 1, "num": 3}}]}
+        scenarios = list(iter_scenarios(spec))
+        assert [s.edits["parameters"][0]["updates"][0]["value"] for s in scenarios] == [0.0, 0.5, 1.0]
+        assert scenarios[0].edits["parameters"][0]["updates"][0]["key"] == ["A", "2030"]
+
+    def test_random_and_lhs(self):
+        spec = _spec(method="lhs", samples=20, seed=3, axes=[
+            {"scalar": "CapacityLimit", "uniform": [0, 10]},
+            {"scalar": "Budget", "loguniform": [1, 100]},
+            {"scalar": "Shock", "normal": [0, 1]},
+        ])
+        points = list(iter_points(spec))
+        assert points == list(iter_points(spec))
+        cap = np.array([p["CapacityLimit"] for p in points])
+        # exactly one sample per stratum
+        assert sorted((cap // 0.5).astype(int).tolist()) == list(range(20))
+        assert all(1 <= p["Budget"] <= 100 for p in points)
+
+        spec["method"] = "random"
+        points = list(iter_points(spec))
+        assert len(points) == 20 and points != list(iter_points({**spec, "seed": 4}))
+
+    def test_invalid_specs(self):
+        with pytest.raises(ValueError):
+            list(iter_points(_spec(axes=[{"scalar": "x", "uniform": [0, 1]}])))  # grid needs discrete axes
+        with pytest.raises(ValueError):
+            list(iter_points(_spec(method="lhs")))  # samples missing
+        with pytest.raises(ValueError):
+            list(iter_points(_spec(axes=[{"parameter": "p", "values": [1]}])))  # key missing
+        with pytest.raises(ValueError):
+            list(iter_points(_spec(axes=[{"scalar": "x", "values": [1], "uniform": [0, 1]}])))
+        with pytest.raises(ValueError):
+            list(iter_scenarios(_spec(id="bad id")))
+
+    def test_load_matrix_resolves_base(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "base.yaml").write_text(yaml.safe_dump(BASE), encoding="utf-8")
+            (root / "sub").mkdir()
+            spec = _spec(base="../base.yaml")
+            (root / "sub" / "matrix.yaml").write_text(yaml.safe_dump(spec), encoding="utf-8")
+            scenarios = list(iter_scenarios(load_matrix(root / "sub" / "matrix.yaml")))
+            assert len(scenarios) == 6
+            assert scenarios[0].edits["parameters"][0]["updates"][1]["value"] == 25.0
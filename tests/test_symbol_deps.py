@@ -0,0 +1,111 @@
+"""
+Tests for the symbol dependency graph (symbol_deps.py) and statement references
+"""
+import tempfile
+from pathlib import Path
+
+import src.core.symbol_store as symbol_store
+from src.core.symbol_deps import DependencyGraph, dependency_graph, scenario_impact
+from src.core.symbol_indexer import _index_source
+
+MODEL = """Set i / a, b /;
+Alias (i, j);
+Scalar CapacityLimit / 10 /, Rate / 2 /;
+Parameter Benefit(i) / a 1, b 2 /, Cost(i), Report(i);
+Cost(i) = Rate * 3;
+Variable z, x(i);
+Equations obj, cap;
+obj.. z =e= sum(i, (Benefit(i) - Cost(i)) * x(i));
+cap.. sum(i, x(i)) =l= CapacityLimit;
+Model toy / all /;
+Solve toy using lp maximizing z;
+Report(i)$(x.l(i) > 0) = x.l(i);
+"""
+
+
+def _graph(text: str = MODEL) -> DependencyGraph:
+    symbols, _, references = _index_source(text, Path("main.gms"))
+    return DependencyGraph(symbols, references)
+
+
+class TestReferences:
+
+    def test_statement_kinds(self):
+        _, _, refs = _index_source(MODEL, Path("main.gms"))
+        by_kind = {(r["kind"], r["targets"][0]): r for r in refs}
+        assert by_kind[("assignment", "Cost")]["reads"] == ["Cost", "i", "Rate"]
+        assert set(by_kind[("equation", "cap")]["reads"]) == {"sum", "i", "x", "CapacityLimit"}
+        assert "e" not in by_kind[("equation", "obj")]["reads"]
+        assert by_kind[("model", "toy")]["reads"] == ["all"]
+        assert by_kind[("solve", "toy")]["reads"] == ["z"]
+        assert by_kind[("assignment", "Report")]["targets"] == ["Report"]
+        assert "l" not in by_kind[("assignment", "Report")]["reads"]
+
+    def test_comparisons_are_not_assignments(self):
+        _, _, refs = _index_source("Scalar a, b;\nif(a >= b, display a;);\nb = a;\n", Path("m.gms"))
+        assert [(r["kind"], r["targets"]) for r in refs] == [("assignment", ["b"])]
+
+    def test_control_conditions_reach_every_statement(self):
+        text = ("Scalar cap1, flag, r, w;\nParameter p(i), q(i);\n"
+                "if(cap1 > 3, p(i) = 2; q(i) = 3;);\n"
+                "loop(i$(w > 0), p(i) = 1; if(flag = 1, r = 2; elseif r > 0, r = 3; else q(i) = 4;););\n"
+                "repeat(r = r + 1; until r > w);\nw = 1;\n")
+        _, _, refs = _index_source(text, Path("m.gms"))
+        reads = [(r["targets"][0], r["reads"]) for r in refs]
+        assert reads[:2] == [("p", ["p", "i", "cap1"]), ("q", ["q", "i", "cap1"])]
+        assert reads[2] == ("p", ["p", "i", "w"])
+        assert {"flag", "w"} <= set(reads[3][1]) and {"flag", "r", "w"} <= set(reads[4][1])
+        assert {"flag", "r", "w"} <= set(reads[5][1]) and reads[5][0] == "q"
+        assert reads[6] == ("r", ["r", "w"])
+        assert reads[7] == ("w", ["w"])
+
+
+class TestImpact:
+
+    def test_capacity_limit_reaches_solution(self):
+        impacted = _graph().impacted(["capacitylimit"])
+        assert impacted == {"CapacityLimit", "cap", "toy", "obj", "x", "z", "Report"}
+
+    def test_assignment_chain_and_unaffected_inputs(self):
+        graph = _graph()
+        assert {"Cost", "obj", "x"} <= graph.impacted(["Rate"])
+        assert "Rate" not in graph.impacted(["Benefit"])
+        assert graph.impacted(["i"]) >= {"j", "Benefit", "Cost", "x"}
+        assert graph.impacted(["unknown"]) == set()
+
+    def test_if_body_with_several_statements(self):
+        graph = _graph("Set i / a /;\nScalar cap1;\nParameter p(i), q(i), r(i);\n"
+                       "if(cap1 > 3, p(i) = 2; q(i) = 3;);\nr(i) = q(i);\n")
+        assert graph.impacted(["cap1"]) == {"cap1", "p", "q", "r"}
+
+    def test_loop_body_with_several_statements(self):
+        graph = _graph("Set i / a, b /;\nParameter flag(i), a(i), b(i), c(i);\n"
+                       "loop(i$(flag(i)),\n  a(i) = 1;\n  b(i) = 2;\n);\nc(i) = 0;\n")
+        assert graph.impacted(["flag"]) == {"flag", "a", "b"}
+
+    def test_conditional_solve(self):
+        graph = _graph(MODEL.replace("Solve toy using lp maximizing z;",
+                                     "Scalar runIt / 1 /;\nif(runIt, Solve toy using lp maximizing z;);"))
+        assert {"toy", "x", "z", "Report"} <= graph.impacted(["runIt"])
+
+    def test_scenario_impact(self):
+        graph = _graph()
+        edits = {"scalars": [{"name": "Rate", "value": 3}], "parameters": [], "sets": [],
+                 "equations": {"includes": []}}
+        impact = scenario_impact(graph, edits)
+        assert impact["changed"] == ["Rate"]
+        assert "CapacityLimit" not in impact["impacted"] and "Cost" in impact["impacted"]
+        edits["equations"]["includes"] = ["extra.inc"]
+        assert scenario_impact(graph, edits) is None
+
+    def test_model_with_includes(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = Path(tmpdir) / "model"
+            model.mkdir()
+            head, tail = MODEL.split("Model toy")
+            (model / "main.gms").write_text(head + "$include extra.inc\nModel toy" + tail, encoding="utf-8")
+            (model / "extra.inc").write_text("Equation floor;\nfloor.. x('a') =g= Rate;\n", encoding="utf-8")
+            monkeypatch.setattr(symbol_store, "SYMBOL_CACHE_DIR", Path(tmpdir) / "cache")
+            graph = dependency_graph(model)
+            assert {"floor", "toy", "z"} <= graph.impacted(["Rate"])
+            assert "floor" in graph.to_dict()["toy"]["reads"]
@@ -14,6 +14,7 @@ from src.core.symbol_indexer import (
     save_index, 
     fallback_to_gdx,
     create_symbol_index,
+    tokenize,
     _extract_symbols_from_line
 )
 
@@ -192,4 +193,70 @@ Equations
             if toy_gdx.exists():
                 symbols = create_symbol_index(temp_path, "main.gms", str(toy_gdx))
                 # Should find some symbols from GDX
-                assert len(symbols) >= 0  # May be empty if GDX read fails
\ No newline at end of file
+                assert len(symbols) >= 0  # May be empty if GDX read fails
+
+
+class TestLexer:
+
+    SOURCE = """$onText
+Set fake / a /;
+$offText
+Set t "years; 2020/2030" /
+   y2020*y2022
+* comment inside data
+   'z z' "quoted label"
+/;
+Parameter p(t) 'cost / unit' # Set hidden;
+  / y2020 1 /
+  q  // Parameter gone
+Scalar r; Set s(t,*) "pairs" / y2020.a /
+Table tab(t, s) "table"
+        a    b
+  y2020 1    2 ;
+r = 4 / 2 ;
+Positive Variable v;
+Variable v(t);
+Model m / all /;
+"""
+
+    def test_tokens(self):
+        """Data blocks only in declarations; comments and $onText blocks dropped"""
+        tokens = tokenize(self.SOURCE)
+        data = [(text, line) for kind, text, line in tokens if kind == 'data']
+        assert data[0][1] == 4 and 'y2020*y2022' in data[0][0] and 'comment' not in data[0][0]
+        assert [text for text, _ in data[1:]] == [' y2020 1 ', ' y2020.a ', ' all ']
+        words = {text for kind, text, _ in tokens if kind == 'word'}
+        assert not {'fake', 'hidden', 'gone'} & words
+        assert ('punct', '/', 16) in tokens  # division, not data
+        assert ('string', '"years; 2020/2030"', 4) in tokens
+
+    def test_declarations_counted_once(self):
+        """Multi-symbol, multi-line declarations; redeclarations merged"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "m.gms"
+            path.write_text(self.SOURCE, encoding="utf-8")
+            symbols = {s['name']: s for s in scan_sources([path])}
+            assert list(symbols) == ['t', 'p', 'q', 'r', 's', 'tab', 'v']
+            assert symbols['t']['elements'] == ['y2020', 'y2021', 'y2022', 'z z']
+            assert symbols['q']['line'] == 11 and symbols['q']['type'] == 'parameter'
+            assert symbols['s']['domain'] == ['t', '*'] and symbols['s']['elements'] == ['y2020.a']
+            assert symbols['tab']['type'] == 'parameter' and symbols['tab']['dim'] == 2
+            assert symbols['v']['dim'] == 1 and symbols['v']['line'] == 17
+
+    def test_toy_model_variable_not_duplicated(self):
+        """Positive Variable x does not add a second x"""
+        toy_model_path = Path("toy_model/main.gms")
+        if not toy_model_path.exists():
+            pytest.skip("toy_model/main.gms not found")
+        names = [s['name'] for s in scan_sources([toy_model_path])]
+        assert names.count('x') == 1
+
+    def test_parentheses_in_unquoted_descriptions(self):
+        """Only '(' right after the name opens a domain"""
+        source = ("Scalar budget total budget (M EUR) / 10 /;\n"
+                  "Variable z total cost (objective), x (i) activity (units);\n"
+                  "Parameter d(i) demand (t);\n")
+        symbols = {s["name"]: s for s in _extract_symbols_from_line(source, Path("m.gms"), 1)}
+        assert (symbols['budget']['dim'], symbols['budget']['domain']) == (0, [])
+        assert symbols['z']['dim'] == 0
+        assert symbols['x']['domain'] == ['i'] and symbols['d']['domain'] == ['i']
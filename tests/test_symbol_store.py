@@ -0,0 +1,89 @@
+"""
+Tests for the persistent symbol index (symbol_store.py)
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import src.core.symbol_store as symbol_store
+from src.core.symbol_store import indexed_symbols, open_store, query_symbols
+
+MAIN = """Set i / a, b /;
+$include data.inc
+Variable z;
+"""
+DATA = """Parameter cost(i) / a 1 /;
+Scalar cap / 3 /;
+"""
+
+
+def _model(root: Path) -> Path:
+    model = root / "model"
+    model.mkdir()
+    (model / "main.gms").write_text(MAIN, encoding="utf-8")
+    (model / "data.inc").write_text(DATA, encoding="utf-8")
+    return model
+
+
+def _count_scans(monkeypatch):
+    scanned = []
+    real = symbol_store._index_source
+    monkeypatch.setattr(symbol_store, "_index_source", lambda text, path: scanned.append(Path(path).name) or real(text, path))
+    return scanned
+
+
+class TestIncrementalIndex:
+
+    def test_only_changed_files_rescanned(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            model = _model(root)
+            scanned = _count_scans(monkeypatch)
+            first = indexed_symbols(model, "main.gms", cache_dir=root / "cache")
+            assert [s["name"] for s in first] == ["i", "cost", "cap", "z"]
+            assert first[0]["elements"] == ["a", "b"] and first[1]["domain"] == ["i"]
+            assert sorted(scanned) == ["data.inc", "main.gms"]
+
+            scanned.clear()
+            assert indexed_symbols(model, "main.gms", cache_dir=root / "cache") == first
+            assert scanned == []
+
+            (model / "data.inc").write_text(DATA + "Scalar budget;\n", encoding="utf-8")
+            os.utime(model / "data.inc", ns=(1, 1))
+            third = indexed_symbols(model, "main.gms", cache_dir=root / "cache")
+            assert scanned == ["data.inc"]
+            assert [s["name"] for s in third] == ["i", "cost", "cap", "budget", "z"]
+
+    def test_same_contents_elsewhere_not_rescanned(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            model = _model(root)
+            indexed_symbols(model, "main.gms", cache_dir=root / "cache")
+            copy = root / "copy"
+            copy.mkdir()
+            for name in ("main.gms", "data.inc"):
+                (copy / name).write_text((model / name).read_text(encoding="utf-8"), encoding="utf-8")
+            scanned = _count_scans(monkeypatch)
+            symbols = indexed_symbols(copy, "main.gms", cache_dir=root / "cache")
+            assert scanned == [] and symbols[1]["file"] == str(copy / "data.inc")
+
+
+class TestQuery:
+
+    def test_lookups(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            model = _model(root)
+            cache = root / "cache"
+            assert [s["name"] for s in query_symbols(model, name="COST", cache_dir=cache)] == ["cost"]
+            assert [s["name"] for s in query_symbols(model, type="scalar", cache_dir=cache)] == ["cap"]
+            in_data = query_symbols(model, file=model / "data.inc", cache_dir=cache)
+            assert [s["name"] for s in in_data] == ["cost", "cap"]
+            assert in_data[0]["file"] == str((model / "data.inc").resolve()) and in_data[0]["line"] == 1
+
+    def test_disabled_store(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = _model(Path(tmpdir))
+            monkeypatch.setattr(symbol_store, "SYMBOL_CACHE_DIR", None)
+            assert open_store() is None and indexed_symbols(model) is None
+            assert [s["name"] for s in query_symbols(model, type="set")] == ["i"]
@@ -0,0 +1,84 @@
+"""
+Tests for per-phase run timing (timing.py)
+"""
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from src.core.provenance_integration import record_run_phase
+from src.core.timing import PhaseTimer, aggregate_timings, listing_times
+
+LISTING = """\
+COMPILATION TIME     =        0.031 SECONDS      3 MB  49.6.1 55d34574 WEX-WEI
+GENERATION TIME      =        0.016 SECONDS      4 MB  49.6.1 55d34574 WEX-WEI
+ RESOURCE USAGE, LIMIT          0.250 10000000000.000
+ ITERATION COUNT, LIMIT         0    2147483647
+GENERATION TIME      =        0.004 SECONDS      4 MB  49.6.1 55d34574 WEX-WEI
+ RESOURCE USAGE, LIMIT          0.050 10000000000.000
+EXECUTION TIME       =        0.266 SECONDS      4 MB  49.6.1 55d34574 WEX-WEI
+"""
+
+
+class TestPhaseTimer:
+
+    def test_phases_accumulate_and_listing_kept_separate(self):
+        timer = PhaseTimer("run_x")
+        with timer.phase("copy"):
+            time.sleep(0.01)
+        with timer.phase("copy"):
+            pass
+        timer.add("solve", 1.25, source="listing")
+        out = timer.as_dict()
+
+        assert set(out["phases"]) == {"copy"}
+        assert out["phases"]["copy"] >= 0.01
+        assert out["listing"] == {"solve": 1.25}
+        assert out["total_s"] >= out["phases"]["copy"]
+
+    def test_listing_times(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            lst = Path(tmpdir) / "main.lst"
+            lst.write_text(LISTING)
+            times = listing_times(lst)
+            assert times["compile"] == 0.031
+            assert round(times["generation"], 6) == 0.02
+            assert round(times["solve"], 6) == 0.3
+            assert times["execution"] == 0.266
+        assert listing_times(None) == {}
+
+
+class TestAggregateTimings:
+
+    def test_aggregate_over_runs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_dirs = []
+            for i, (copy_s, gams_s) in enumerate([(1.0, 3.0), (2.0, 5.0)]):
+                run_dir = Path(tmpdir) / f"run_{i}"
+                run_dir.mkdir()
+                timings = {"phases": {"copy": copy_s, "gams": gams_s}, "listing": {"solve": gams_s / 2},
+                           "total_s": copy_s + gams_s}
+                (run_dir / "run.json").write_text(json.dumps({"run_id": f"r{i}", "timings": timings}))
+                run_dirs.append(run_dir)
+            run_dirs.append(Path(tmpdir) / "missing")
+
+            df = aggregate_timings(run_dirs).set_index("phase")
+            assert df.loc["gams", "runs"] == 2
+            assert df.loc["gams", "mean_s"] == 4.0
+            assert df.loc["copy", "max_s"] == 2.0
+            assert df.loc["listing:solve", "total_s"] == 4.0
+            assert round(df.loc["gams", "share"], 6) == round(8.0 / 11.0, 6)
+
+    def test_aggregate_empty(self):
+        assert aggregate_timings([]).empty
+
+    def test_record_run_phase(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_dir = Path(tmpdir) / "run_a"
+            run_dir.mkdir()
+            assert record_run_phase(run_dir, "export_excel", 1.0) is False
+            (run_dir / "run.json").write_text(json.dumps({"run_id": "a", "timings": {"phases": {"copy": 0.5}}}))
+            assert record_run_phase(run_dir, "export_excel", 1.0) is True
+            assert record_run_phase(run_dir, "export_excel", 0.5) is True
+            phases = json.loads((run_dir / "run.json").read_text())["timings"]["phases"]
+            assert phases == {"copy": 0.5, "export_excel": 1.5}
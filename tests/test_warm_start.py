@@ -0,0 +1,121 @@
+"""
+Tests for warm starts from neighbouring runs (warm_start.py)
+"""
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from src.core.provenance import write_run_json
+from src.core.scenario_merg import ensure_autoload_include, scenario_from_dict
+from src.core.warm_start import (
+    LOADPOINT_GDX, edit_distance, edit_vector, find_warm_start, inject_loadpoint, loadpoint_symbols,
+    warm_start_record,
+)
+
+TOY_MODEL = Path(__file__).resolve().parents[1] / "toy_model"
+
+
+def _write_run(run_dir: Path, vector, model_hash="m1", iterations=None, gdx=True, **extra) -> Path:
+    run_dir.mkdir(parents=True)
+    meta = {"run_id": run_dir.name, "model_hash": model_hash, "edit_vector": vector, **extra}
+    if iterations is not None:
+        meta["solve_stats"] = {"solves": [{"iterations": iterations}]}
+    (run_dir / "run.json").write_text(json.dumps(meta), encoding="utf-8")
+    if gdx:
+        (run_dir / "raw.gdx").write_bytes(b"gdx")
+    return run_dir
+
+
+class TestWarmStart:
+
+    def test_edit_vector_and_distance(self):
+        scen = scenario_from_dict({"id": "s", "edits": {
+            "scalars": [{"name": "Cap", "value": 10}],
+            "parameters": [{"name": "cost", "updates": [{"key": ["A", 2030], "value": 2.5}]}],
+        }})
+        vector = edit_vector(scen)
+        assert vector == {"Cap": 10.0, "cost[A,2030]": 2.5}
+        assert edit_distance(vector, vector) == 0.0
+        assert edit_distance({"Cap": 10.0}, {"Cap": 5.0}) == 0.5
+        assert edit_distance({"Cap": 10.0}, {"Other": 1.0}) == 2 ** 0.5
+
+    def test_find_nearest_run_of_same_model(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_run(root / "run_far", {"Cap": 20.0})
+            near = _write_run(root / "run_near", {"Cap": 11.0})
+            _write_run(root / "run_no_gdx", {"Cap": 10.0}, gdx=False)
+            _write_run(root / "run_other_model", {"Cap": 10.0}, model_hash="m2")
+            best = find_warm_start({"Cap": 10.0}, root, model_hash="m1")
+            assert best["run_dir"] == str(near) and round(best["distance"], 6) == round(1 / 11, 6)
+            assert find_warm_start({"Cap": 10.0}, root / "missing") is None
+
+    def test_candidates_come_from_the_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            far = _write_run(root / "run_far", {"Cap": 20.0})
+            assert find_warm_start({"Cap": 10.0}, root, model_hash="m1")["run_dir"] == str(far)
+            # runs written since are indexed by write_run_json; the others' run.json is not read
+            far.joinpath("run.json").write_text("not json", encoding="utf-8")
+            near = root / "run_near"
+            near.mkdir()
+            (near / "raw.gdx").write_bytes(b"gdx")
+            write_run_json(near, {"run_id": "run_near", "model_hash": "m1", "edit_vector": {"Cap": 11.0}})
+            best = find_warm_start({"Cap": 10.0}, root, model_hash="m1")
+            assert best["run_dir"] == str(near.resolve()) and best["meta"]["run_id"] == "run_near"
+
+    def test_runs_made_before_the_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            old = _write_run(root / "run_old", {"Cap": 11.0})
+            new = root / "run_new"
+            new.mkdir()
+            (new / "raw.gdx").write_bytes(b"gdx")
+            write_run_json(new, {"run_id": "run_new", "model_hash": "m1", "edit_vector": {"Cap": 20.0}})
+            assert find_warm_start({"Cap": 10.0}, root, model_hash="m1")["run_dir"] == str(old.resolve())
+
+    def test_inject_before_first_solve(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            src = _write_run(root / "src", {})
+            work = root / "work"
+            work.mkdir()
+            (work / "main.gms").write_text(
+                "Variable z;\n$ontext\nsolve m using lp minimizing z;\n$offtext\n  Solve m using nlp minimizing z;\nsolve m2 using lp max z;\n",
+                encoding="utf-8")
+            assert not inject_loadpoint(work, "main.gms", src / "raw.gdx", [])
+            assert inject_loadpoint(work, "main.gms", src / "raw.gdx", ["z"])
+            lines = (work / "main.gms").read_text(encoding="utf-8").splitlines()
+            assert lines[5] == f"execute_loadpoint '{LOADPOINT_GDX}', z;" and lines[6].strip().startswith("Solve")
+            assert (work / LOADPOINT_GDX).exists()
+
+            (work / "nosolve.gms").write_text("Scalar a /1/;\n", encoding="utf-8")
+            assert not inject_loadpoint(work, "nosolve.gms", src / "raw.gdx", ["z"])
+
+    def test_patched_parameters_survive_the_warm_start(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            src = _write_run(root / "src", {})
+            work = root / "work"
+            shutil.copytree(TOY_MODEL, work, ignore=shutil.ignore_patterns("*.gdx", "*.lst", "*.log", "*.lxi"))
+            ensure_autoload_include(work / "main.gms", ["CapacityLimit"])
+            symbols = loadpoint_symbols(work, "main.gms")
+            assert {"x", "z", "obj", "cap"} <= set(symbols)
+            assert inject_loadpoint(work, "main.gms", src / "raw.gdx", symbols)
+            text = (work / "main.gms").read_text(encoding="utf-8")
+            loadpoint = next(line for line in text.splitlines() if line.startswith("execute_loadpoint"))
+            # the source run's raw.gdx also holds CapacityLimit, Benefit, ...: only variables and
+            # equations are loaded, so the scenario's patched values stay in effect for the solve
+            for parameter in ("CapacityLimit", "CostByCatchment", "Benefit", "ActiveCatchments", "i"):
+                assert parameter not in loadpoint.replace(",", " ").split()
+            assert text.index("$if exist patch.gdx $load CapacityLimit") < text.index(loadpoint)
+
+    def test_iteration_savings(self):
+        cold = {"run_dir": "runs/a", "run_id": "a", "distance": 0.1, "meta": {"solve_stats": {"solves": [{"iterations": 400}]}}}
+        record = warm_start_record(cold, {"solve_stats": {"solves": [{"iterations": 60}, {"iterations": 40}]}}, True)
+        assert (record["reference_iterations"], record["iterations"], record["iterations_saved"]) == (400, 100, 300)
+        # a warm-started source passes on its cold reference
+        warm = {"run_id": "b", "distance": 0.1, "meta": {"warm_start": record, "solve_stats": {"solves": [{"iterations": 100}]}}}
+        assert warm_start_record(warm, {"solve_stats": {"solves": [{"iterations": 90}]}}, True)["iterations_saved"] == 310
+        assert warm_start_record(cold, {}, False)["iterations_saved"] is None
@@ -16,7 +16,10 @@ This file lists KPI requests. Each item:
 - name: column name in the summary
 - symbol: symbol name from your results
 - where: optional filters on key1..key7 (string or list of strings)
-- agg: sum|mean (default: sum)
+- agg: sum|mean|min|max|count|wmean (default: sum); wmean needs weight: <symbol>
+- product: [symbol_a, symbol_b] instead of symbol, for per-key products such as Benefit*x
+- ratio: [kpi_a, kpi_b] or threshold: {kpi, op, value} to derive KPIs from other KPIs
+- <symbol>.m reads marginals; where_value: {op, value} filters records by value
 Adjust 'symbol' names and filters to your model.
 """
 
@@ -1,72 +1,39 @@
 from __future__ import annotations
+import argparse
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-import pandas as pd
+import sys
+import yaml
 
-try:
-    import duckdb  # type: ignore
-except Exception:
-    duckdb = None
+# Ensure <repo>/src is on sys.path so 'core.*' imports resolve
+THIS = Path(__file__).resolve()
+REPO = THIS.parents[1]          # .../<repo>
+SRC = REPO / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
 
-def _load_symbol_values(run_dir: Path) -> pd.DataFrame:
-    db = run_dir / "results.duckdb"
-    if duckdb and db.exists():
-        con = duckdb.connect(str(db))
-        df = con.execute("SELECT * FROM symbol_values").fetchdf()
-        con.close()
-        return df
-    # Fallback: try raw.gdx via project reader if available
-    try:
-        from core.gdx_io_merg import read_gdx_transfer_full
-        vals, _, _ = read_gdx_transfer_full(str(run_dir / "raw.gdx"))
-        frames = []
-        for name, df in (vals or {}).items():
-            if "value" in df.columns:
-                df = df.copy()
-                df.insert(0, "symbol", name)
-                frames.append(df)
-        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
-    except Exception:
-        return pd.DataFrame()
+# KPI extraction lives in core.kpis (one compiled DuckDB query per run); re-exported here
+# so existing scripts keep importing tools.kpis.
+from core.kpis import AGGREGATES, extract_kpis, extract_kpis_many, normalize_kpis
 
-def _norm7(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    for i in range(1,8):
-        c = f"key{i}"
-        if c not in df.columns:
-            df[c] = None
-    cols = ["symbol"] + [f"key{i}" for i in range(1,8)] + ["value"]
-    return df[[c for c in cols if c in df.columns]]
+__all__ = ["AGGREGATES", "extract_kpis", "extract_kpis_many", "normalize_kpis"]
 
-def extract_kpis(run_dir: str | Path, requests: List[Dict[str, Any]]) -> pd.DataFrame:
-    """Compute KPI rows for a run.
-    requests: list of {name, symbol, where: {key1: 'A' or ['A','B'], ...}, agg: 'sum'|'mean'}
-    Returns DataFrame with columns: name, value
-    """
-    run_dir = Path(run_dir)
-    df = _load_symbol_values(run_dir)
-    if df.empty:
-        return pd.DataFrame(columns=["name","value"])
-    df = _norm7(df)
-    out = []
-    for req in requests:
-        name = req["name"]; symbol = req["symbol"]
-        r = df[df["symbol"] == symbol]
-        where = req.get("where") or {}
-        for k, v in where.items():
-            if k not in r.columns:  # ignore unknown filters
-                continue
-            if isinstance(v, list):
-                r = r[r[k].isin([str(x) for x in v])]
-            else:
-                r = r[r[k] == str(v)]
-        if r.empty:
-            val = None
-        else:
-            agg = (req.get("agg") or "sum").lower()
-            if agg == "mean":
-                val = r["value"].mean()
-            else:
-                val = r["value"].sum()
-        out.append({"name": name, "value": val})
-    return pd.DataFrame(out)
\ No newline at end of file
+def main():
+    ap = argparse.ArgumentParser(description="Extract a run x KPI matrix for runs selected from the provenance index")
+    ap.add_argument("--kpis", required=True, help="KPI YAML (list or 'kpis:' document)")
+    ap.add_argument("--runs", default="runs", help="Runs root folder (default: runs)")
+    ap.add_argument("--scenario", help="Only runs of this scenario_id")
+    ap.add_argument("--model-hash", help="Only runs whose model hash starts with this")
+    ap.add_argument("--since", help="Only runs at or after this ISO timestamp")
+    ap.add_argument("--workers", type=int, help="Parallel threads")
+    ap.add_argument("--no-cache", action="store_true", help="Recompute instead of using cached KPI values")
+    ap.add_argument("--out", default="kpi_matrix.csv", help="Output CSV")
+    args = ap.parse_args()
+
+    kpis = normalize_kpis(yaml.safe_load(Path(args.kpis).read_text(encoding="utf-8")))
+    df = extract_kpis_many(kpis, runs_root=args.runs, max_workers=args.workers, scenario_id=args.scenario,
+                           model_hash=args.model_hash, since=args.since, cache=not args.no_cache)
+    df.to_csv(args.out, index=False)
+    print(f"Wrote {args.out} ({len(df)} runs x {len(kpis)} KPIs)")
+
+if __name__ == "__main__":
+    main()
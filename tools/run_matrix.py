@@ -7,19 +7,142 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from src.core.adaptive import adaptive_sweep
+from src.core.kpis import extract_kpis_many
 from src.core.model_runner_merg import run_gams
+from src.core.preflight import format_diagnostics, preflight_batch
+from src.core.scenario_merg import load_scenario
+from src.core.scenario_validation import catalog_for_model, validate_scenarios
+from src.core.sweep import count_points, iter_scenarios, load_matrix
+from src.core.timing import aggregate_timings
+from src.core.warm_start import warm_start_summary
 
 def main():
     ap = argparse.ArgumentParser(description="Run a batch of scenarios")
     ap.add_argument("--model", required=True, help="Model folder")
     ap.add_argument("--main", required=True, help="Main .gms file (e.g., main.gms)")
     ap.add_argument("--gdx-out", required=True, help="Expected output GDX filename")
-    ap.add_argument("--scenarios", required=True, help="Folder containing scenario YAMLs or a YAML list file")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--scenarios", help="Folder containing scenario YAMLs or a YAML list file")
+    src.add_argument("--matrix", help="matrix.yaml sweep spec (base scenario + axes), expanded without writing YAMLs")
+    ap.add_argument("--dry-run", action="store_true", help="List the scenario IDs (and sweep points) without running")
+    ap.add_argument("--adaptive", action="store_true", help="With --matrix: refine the sweep where KPIs change most (uses the 'adaptive' block)")
+    ap.add_argument("--kpis", help="KPI YAML evaluated after each solve (required with --adaptive)")
+    ap.add_argument("--budget", type=int, help="With --adaptive: total number of solves")
+    ap.add_argument("--warm-start", action="store_true", help="Start each solve from the nearest solved run of the same model")
+    ap.add_argument("--no-preflight", action="store_true", help="Skip the symbol check and compile-only check of the batch before the first run")
     ap.add_argument("--keep-temp", action="store_true", help="Keep temp workspaces")
     args = ap.parse_args()
+    warm = "auto" if args.warm_start else None
 
+    if args.adaptive:
+        if not args.matrix or not args.kpis:
+            ap.error("--adaptive needs --matrix and --kpis")
+        _preflight(args, _matrix_probe(load_matrix(args.matrix)))
+        run_adaptive(args)
+        return
+
+    if args.matrix:
+        spec = load_matrix(args.matrix)
+        print(f"Sweep {spec['id']}: {count_points(spec)} scenarios ({spec.get('method') or 'grid'})")
+        if not args.dry_run:
+            _preflight(args, _matrix_probe(spec))
+        jobs = ((scen.id, {"scenario": scen}, scen.meta["sweep"]["point"]) for scen in iter_scenarios(spec))
+    else:
+        paths = _scenario_paths(Path(args.scenarios))
+        if not args.dry_run:
+            _preflight(args, paths)
+        jobs = ((sp.stem, {"scenario_yaml": str(sp)}, None) for sp in paths)
+
+    runs = []
+    for name, scen_kw, point in jobs:
+        if args.dry_run:
+            print(f"{name}  {json.dumps(point)}")
+            continue
+        print(f"Running {name} ...")
+        gdx = run_gams(args.model, args.main, args.gdx_out, options={}, keep_temp=args.keep_temp, warm_start=warm, **scen_kw)
+        run = {"scenario": name, "gdx": str(gdx), "run_dir": str(Path(gdx).parent)}
+        if point is not None:
+            run["point"] = point
+        runs.append(run)
+    if args.dry_run:
+        return
+
+    out = Path("runs") / "matrix_summary.json"
+    out.write_text(json.dumps(runs, indent=2), encoding="utf-8")
+    timings_out = out.with_name("matrix_timings.csv")
+    aggregate_timings([r["run_dir"] for r in runs]).to_csv(timings_out, index=False)
+    print(f"Wrote {out} and {timings_out}")
+    _print_warm_starts([r["run_dir"] for r in runs])
+
+def run_adaptive(args) -> None:
+    spec = load_matrix(args.matrix)
+    kpis = yaml.safe_load(Path(args.kpis).read_text(encoding="utf-8"))
+
+    def evaluate(scenarios):
+        results, run_dirs = [], []
+        for scen in scenarios:
+            print(f"Running {scen.id} {json.dumps(scen.meta['sweep']['point'])} ...")
+            try:
+                gdx = run_gams(args.model, args.main, args.gdx_out, options={}, keep_temp=args.keep_temp,
+                               scenario=scen, warm_start="auto" if args.warm_start else None)
+                run_dirs.append(Path(gdx).parent)
+                results.append({"run_dir": str(Path(gdx).parent)})
+            except Exception as e:  # a failed point is kept (no KPIs) and drives refinement around it
+                print(f"  failed: {e}", file=sys.stderr)
+                results.append({"error": str(e)})
+        values = extract_kpis_many(kpis, run_dirs).drop(columns=["run"]) if run_dirs else None
+        by_dir = {} if values is None else {row["run_dir"]: row for row in values.to_dict("records")}
+        return [{**by_dir.get(r.get("run_dir"), {}), **r} for r in results]
+
+    options = {"budget": args.budget} if args.budget else {}
+    df = adaptive_sweep(spec, evaluate, **options)
+    out = Path("runs") / f"adaptive_{spec['id']}.csv"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out, index=False)
+    print(f"{len(df)} solves in {int(df['stage'].max()) + 1 if len(df) else 0} rounds; wrote {out}")
+    _print_warm_starts(df["run_dir"].dropna().tolist() if "run_dir" in df.columns else [])
+
+def _matrix_probe(spec) -> list:
+    # sweep axes only touch scalars and parameter records: every point compiles like the first
+    first = next(iter_scenarios(spec), None)
+    return [first] if first is not None else []
+
+def _preflight(args, scenarios) -> None:
+    """
+    Check the batch before any run: scenario edits against the model's symbol index, then a
+    compile of model + equation includes once per distinct include set. Exits 2 on errors.
+    """
+    if args.no_preflight or not scenarios:
+        return
+    scenarios = [s if hasattr(s, "edits") else load_scenario(s) for s in scenarios]
+    invalid = validate_scenarios(scenarios, catalog_for_model(args.model, args.main))
+    for name, issues in invalid.items():
+        print(f"  {name}:", file=sys.stderr)
+        for issue in issues:
+            print(f"    {issue['message']}", file=sys.stderr)
+    if invalid:
+        print(f"Preflight: {len(invalid)} scenario(s) reference unknown symbols or elements", file=sys.stderr)
+        sys.exit(2)
+    results = preflight_batch(args.model, args.main, scenarios)
+    failed = {name: r for name, r in results.items() if not r["ok"]}
+    compiled = {r["key"]: r for r in results.values()}
+    print(f"Preflight: {len(compiled)} compile(s), {sum(r['cached'] for r in compiled.values())} cached, {len(failed)} scenario(s) failing")
+    for name, r in failed.items():
+        print(f"  {name}:", file=sys.stderr)
+        for line in format_diagnostics(r):
+            print(f"    {line}", file=sys.stderr)
+    if failed:
+        sys.exit(2)
+
+def _print_warm_starts(run_dirs: list) -> None:
+    warm = [w for w in warm_start_summary(run_dirs) if w.get("applied")]
+    saved = [w["iterations_saved"] for w in warm if w.get("iterations_saved") is not None]
+    if warm:
+        print(f"Warm-started {len(warm)} runs; iterations saved: {sum(saved)}")
+
+def _scenario_paths(scen_arg: Path) -> list:
     scen_paths = []
-    scen_arg = Path(args.scenarios)
     if scen_arg.is_dir():
         scen_paths = sorted([p for p in scen_arg.glob("*.yaml")])
     else:
@@ -27,16 +150,7 @@ def main():
         if not isinstance(data, list):
             print("List YAML must be a list of file paths", file=sys.stderr); sys.exit(2)
         scen_paths = [Path(p) for p in data]
-
-    runs = []
-    for sp in scen_paths:
-        print(f"Running {sp.name} ...")
-        gdx = run_gams(args.model, args.main, args.gdx_out, options={}, keep_temp=args.keep_temp, scenario_yaml=str(sp))
-        runs.append({"scenario": sp.stem, "gdx": str(gdx), "run_dir": str(Path(gdx).parent)})
-
-    out = Path("runs") / "matrix_summary.json"
-    out.write_text(json.dumps(runs, indent=2), encoding="utf-8")
-    print(f"Wrote {out}")
+    return scen_paths
 
 if __name__ == "__main__":
     main()
@@ -5,7 +5,8 @@ import yaml
 import pandas as pd
 
 from core.model_runner_merg import run_gams
-from tools.kpis import extract_kpis
+from core.timing import aggregate_timings
+from tools.kpis import extract_kpis_many, normalize_kpis
 
 def main():
     ap = argparse.ArgumentParser(description="Run a batch of scenarios and extract KPIs")
@@ -13,7 +14,7 @@ def main():
     ap.add_argument("--main", required=True)
     ap.add_argument("--gdx-out", required=True)
     ap.add_argument("--scenarios", required=True, help="Folder with *.yaml or a YAML list file")
-    ap.add_argument("--kpis", help="KPI preset YAML (list of {name, symbol, where?, agg?})")
+    ap.add_argument("--kpis", help="KPI preset YAML (list of {name, symbol, where?, agg?} or a 'kpis:' document)")
     ap.add_argument("--keep-temp", action="store_true")
     args = ap.parse_args()
 
@@ -29,28 +30,31 @@ def main():
 
     kpis = None
     if args.kpis:
-        kpis = yaml.safe_load(Path(args.kpis).read_text(encoding="utf-8"))
-        if not isinstance(kpis, list):
-            raise SystemExit("--kpis YAML must be a list")
+        try:
+            kpis = normalize_kpis(yaml.safe_load(Path(args.kpis).read_text(encoding="utf-8")))
+        except ValueError as e:
+            raise SystemExit(f"--kpis: {e}")
 
     rows = []
     for sp in scen_paths:
         print(f"Running {sp.name} ...")
         gdx = run_gams(args.model, args.main, args.gdx_out, options={"Lo":2}, keep_temp=args.keep_temp, scenario_yaml=str(sp))
         run_dir = Path(gdx).parent
-        row = {"scenario": sp.stem, "run_dir": str(run_dir), "gdx": str(gdx)}
-        if kpis:
-            df = extract_kpis(run_dir, kpis)
-            for _, r in df.iterrows():
-                row[r["name"]] = r["value"]
-        rows.append(row)
+        rows.append({"scenario": sp.stem, "run_dir": str(run_dir), "gdx": str(gdx)})
+
+    if kpis and rows:
+        # one compiled KPI pass over all runs, evaluated in parallel
+        matrix = extract_kpis_many(kpis, [r["run_dir"] for r in rows])
+        for row, values in zip(rows, matrix.drop(columns=["run", "run_dir"]).to_dict(orient="records")):
+            row.update(values)
 
     out_dir = Path("runs")
     out_dir.mkdir(exist_ok=True, parents=True)
     df_all = pd.DataFrame(rows)
-    (out_dir / "matrix_summary.json").write_text(json.dumps(rows, indent=2), encoding="utf-8"))
+    (out_dir / "matrix_summary.json").write_text(json.dumps(rows, indent=2), encoding="utf-8")
     df_all.to_csv(out_dir / "matrix_summary.csv", index=False)
-    print(f"Wrote {out_dir/'matrix_summary.csv'} and matrix_summary.json")
+    aggregate_timings([r["run_dir"] for r in rows]).to_csv(out_dir / "matrix_timings.csv", index=False)
+    print(f"Wrote {out_dir/'matrix_summary.csv'}, matrix_summary.json and matrix_timings.csv")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+from __future__ import annotations
+import argparse, json
+from pathlib import Path
+import sys
+
+# Ensure <repo>/src is on sys.path so 'core.*' imports resolve
+THIS = Path(__file__).resolve()
+REPO = THIS.parents[1]          # .../<repo>
+SRC = REPO / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+import pandas as pd
+
+from core.listing_parser import find_listing, parse_listing
+from core.provenance import write_run_json
+from core.run_index import query_solve_stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Backfill and export solver statistics parsed from run listings")
+    ap.add_argument("--runs", default="runs", help="Runs root folder (default: runs)")
+    ap.add_argument("--force", action="store_true", help="Re-parse runs that already have solve_stats")
+    ap.add_argument("--scenario", help="Only export runs of this scenario_id")
+    ap.add_argument("--out", help="Write the solve statistics catalog to this CSV")
+    args = ap.parse_args()
+
+    runs_root = Path(args.runs)
+    updated = 0
+    for run_json in sorted(runs_root.glob("*/run.json")):
+        try:
+            meta = json.loads(run_json.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if "solve_stats" in meta and not args.force:
+            continue
+        lst = find_listing(run_json.parent)
+        if lst is None:
+            continue
+        meta["solve_stats"] = parse_listing(lst)
+        write_run_json(run_json.parent, meta, runs_root)
+        updated += 1
+    print(f"Parsed listings for {updated} run(s)")
+
+    rows = query_solve_stats(runs_root, scenario_id=args.scenario)
+    print(f"{len(rows)} solve(s) in catalog")
+    if args.out:
+        pd.DataFrame(rows).to_csv(args.out, index=False)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()